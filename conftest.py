@@ -13,13 +13,18 @@ behavior is unchanged (no marker, no probe).
 
 Service host/port can be overridden via environment variables for non-default
 setups; otherwise localhost defaults are used.
+
+It also provides the session-scoped ``client`` fixture: one FastAPI
+``TestClient`` (and one app lifespan) shared by every API test.
 """
 from __future__ import annotations
 
 import os
 import socket
+from collections.abc import Iterator
 
 import pytest
+from fastapi.testclient import TestClient
 
 # name -> (host_env, port_env, host_default, port_default)
 _INTEGRATION_SERVICES: dict[str, tuple[str, str, str, int]] = {
@@ -62,3 +67,13 @@ def pytest_collection_modifyitems(items):
     skip = pytest.mark.skip(reason=reason)
     for item in integration:
         item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def client() -> Iterator[TestClient]:
+    """A TestClient over the app, entered once per session."""
+    # Imported here, not at collection: test modules set env before the app is loaded.
+    from local_llm_bot.app.api import app
+
+    with TestClient(app) as c:
+        yield c
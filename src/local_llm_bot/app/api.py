@@ -1,4 +1,46 @@
-# Version: 1.20.4
+# Version: 1.20.19
+# Changelog: 1.20.19 — /ask starts the generation-model warmup only for models not in _warm_models,
+#   and records a model there once its warmup succeeds; the task is cancelled if retrieval raises.
+# Changelog: 1.20.18 — /ask's semantic-cache partition includes index_stamp() of the corpus index, so a
+#   re-ingest or document delete stops matching answers cached against the old index.
+# Changelog: 1.20.17 — /ask's semantic-cache query embedding runs in a worker thread (asyncio.to_thread)
+#   like retrieval and generation; it was a blocking Ollama call on the event loop.
+# Changelog: 1.20.16 — Corpus rename/delete drop the Qdrant collection through
+#   qdrant_store.delete_collection, so the store's cache of ensured collections forgets it.
+# Changelog: 1.20.15 — _get_repo_root() is functools.cache'd: every corpus/model endpoint calls it.
+# Changelog: 1.20.14 — _get_corpus_size walks the corpus with os.scandir and sums cached
+#   DirEntry.stat() sizes instead of os.walk + os.path.exists + os.path.getsize per file.
+# Changelog: 1.20.13 — DELETE of a corpus file also appends an empty doc_chunk_map.jsonl entry for it,
+#   which removes the doc from the docmap (last entry per doc wins).
+# Changelog: 1.20.12 — Document counts and the covered-entity list stream index.jsonl through
+#   index_jsonl.iter_jsonl instead of materializing every row with read_jsonl.
+# Changelog: 1.20.11 — DELETE of a corpus file tombstones its index.jsonl rows
+#   (index_jsonl.mark_doc_deleted), so the lexical fallback, document counts and covered-entity
+#   list stop reporting a deleted file. Compaction happens at the next ingest.
+# Changelog: 1.20.10 — /ask overlaps generation-model warmup with retrieval: an ollama_warmup task
+#   (empty-prompt load, keep_alive 10m) starts before retrieve() and is awaited just before
+#   generation, so a cold model load is hidden behind retrieval instead of following it.
+# Changelog: 1.20.9 — DELETE of a corpus file also removes its chunks from the sqlite-vec mirror
+#   (vectorstore/sqlite_vec_store) when AISTUDIO_VECTORSTORE=sqlite_vec, so deleted files stop
+#   surfacing in vec0 KNN results.
+# Changelog: 1.20.8 — /ask, /debug/retrieve and /prewarm no longer block the event loop: retrieve()
+#   and the Ollama generation run via asyncio.to_thread, so concurrent requests (and /health) are
+#   served while a long generation is in flight. ollama_client 1.6.0 pools the Ollama HTTP clients.
+# Changelog: 1.20.7 — Query-embedding micro-batching (_QueryEmbedBatcher). /ask and /debug/retrieve
+#   await the batcher before retrieve(): queries arriving within CONFIG.rag.query_batch_max_wait_ms
+#   (up to query_batch_size) are embedded in one ollama_client.prime_query_embeddings call off the
+#   event loop, which seeds the embedding LRU that the vector stores' query() reads. retrieve()
+#   itself is untouched — its filter/quota/hybrid logic is per-query — so only the embedding round
+#   trip is amortized. Off by default (max_wait_ms = 0).
+# Changelog: 1.20.6 — Semantic answer cache in front of /ask (app/semantic_cache.py), opt-in via
+#   CONFIG.rag.semantic_cache_threshold. After the retrieval knobs are resolved, the expanded
+#   retrieval query is embedded (the same embedding the vector query reuses via the embed LRU) and
+#   a stored AskResponse is returned when a prior query in the SAME partition (corpus, model,
+#   resolved entity filter, scope, top_k, alpha, min_score, keywords, temperature, context flag) is
+#   at least that similar. Follow-ups with conversation history are never cached. /debug/cache
+#   reports it under "semantic".
+# Changelog: 1.20.5 — GET /debug/cache reports the ollama_client embedding + generation LRU caches
+#   (size, hits, misses, hit rate, average miss latency).
 # Changelog: 1.20.4 — AIStudio_1058: /config now reports the resolved num_ctx. It was readable
 #   nowhere: /debug/prompt returns num_ctx_set, a boolean that has been unconditionally true since
 #   _958, so two runs at different context windows were indistinguishable from their artifacts.
@@ -287,8 +329,9 @@ import re
 import shutil
 import sys
 import time
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime as _dt
+from functools import cache
 from pathlib import Path
 from typing import Annotated, Any
 
@@ -299,15 +342,28 @@ from fastapi.responses import FileResponse
 from pydantic import BaseModel
 
 from local_llm_bot.app.config import CONFIG
-from local_llm_bot.app.ingest.index_jsonl import read_jsonl
+from local_llm_bot.app.ingest.index_jsonl import (
+    append_docmap_entry,
+    index_stamp,
+    iter_jsonl,
+    mark_doc_deleted,
+)
 from local_llm_bot.app.ingest.loaders import SUPPORTED_EXTS
-from local_llm_bot.app.ollama_client import build_generate_kwargs, ollama_generate
+from local_llm_bot.app.ollama_client import (
+    build_generate_kwargs,
+    cache_stats,
+    embed_query_with_cache,
+    ollama_generate,
+    ollama_warmup,
+    prime_query_embeddings,
+)
 from local_llm_bot.app.rag_core import (
     RetrievedDoc,
     _detect_entities,
     _resolve_entity_filter_tokens,
     retrieve,
 )
+from local_llm_bot.app.semantic_cache import SemanticCache
 from local_llm_bot.app.utils.corpus_paths import corpus_exists, corpus_paths, list_corpora
 from local_llm_bot.app.utils.repo_root import find_repo_root
 
@@ -1271,7 +1327,7 @@ def _corpus_covered_entities(corpus_name: str, limit: int = 25) -> list[str]:
         if not idx.exists():
             return []
         firms: set[str] = set()
-        for row in read_jsonl(idx):
+        for row in iter_jsonl(idx):
             meta = row.get("metadata") if isinstance(row.get("metadata"), dict) else {}
             f = (row.get("firm") or meta.get("firm") or "").strip()
             if f:
@@ -1299,10 +1355,94 @@ async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+# Semantic /ask cache — created on first use from CONFIG.rag; None while the feature is off.
+_SEMANTIC_CACHE: SemanticCache | None = None
+
+
+def _semantic_cache() -> SemanticCache | None:
+    global _SEMANTIC_CACHE
+    threshold = CONFIG.rag.semantic_cache_threshold
+    if threshold is None:
+        return None
+    if _SEMANTIC_CACHE is None:
+        _SEMANTIC_CACHE = SemanticCache(threshold=threshold, ttl_s=CONFIG.rag.semantic_cache_ttl_s)
+    return _SEMANTIC_CACHE
+
+
+class _QueryEmbedBatcher:
+    """Collects concurrent query texts and embeds each batch in a single Ollama call.
+
+    Requests await `prime(text)`; a worker task drains the queue until `batch_size` items or
+    `max_wait_ms` elapse, then runs prime_query_embeddings in a thread. Afterwards the request's own
+    embed_query_with_cache() lookup (inside retrieve) is a cache hit. Bound to the running event loop
+    and rebuilt if the loop changes (each TestClient runs its own).
+    """
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[tuple[str, asyncio.Future[None]]] | None = None
+        self._worker: asyncio.Task[None] | None = None
+
+    async def prime(self, text: str) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._queue is None:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue))
+        fut: asyncio.Future[None] = loop.create_future()
+        await self._queue.put((text, fut))
+        await fut
+
+    async def _run(self, queue: asyncio.Queue[tuple[str, asyncio.Future[None]]]) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + CONFIG.rag.query_batch_max_wait_ms / 1000.0
+            while len(batch) < CONFIG.rag.query_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+                except TimeoutError:
+                    break
+            try:
+                await asyncio.to_thread(
+                    prime_query_embeddings,
+                    model=CONFIG.rag.default_embed_model,
+                    texts=[text for text, _ in batch],
+                )
+            except Exception as e:
+                # Not fatal: retrieve() embeds on its own and surfaces any real Ollama error.
+                print(f"query embed batch failed ({len(batch)} queries): {e}")
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_result(None)
+
+
+_QUERY_EMBED_BATCHER = _QueryEmbedBatcher()
+
+
+async def _prime_query_embedding(text: str) -> None:
+    """Route a query through the micro-batcher when batching is enabled; no-op otherwise."""
+    if CONFIG.rag.query_batch_max_wait_ms > 0:
+        await _QUERY_EMBED_BATCHER.prime(text)
+
+
 # Track which models are currently loaded in Ollama memory
 _warm_models: set[str] = set()
 
 
+async def _warm_generation_model(model: str) -> None:
+    """Best-effort ollama_warmup — a failure here must not fail /ask (generation will report it)."""
+    try:
+        await ollama_warmup(model=model)
+    except Exception as e:
+        print(f"[ask] model warmup skipped: {e}")
+    else:
+        _warm_models.add(model)
+
+
 @app.post("/prewarm")
 async def prewarm(model_id: str | None = None) -> dict[str, str]:
     """
@@ -1314,7 +1454,7 @@ async def prewarm(model_id: str | None = None) -> dict[str, str]:
     if model in _warm_models:
         return {"status": "already_warm", "model": model}
     try:
-        ollama_generate(model=model, prompt="hi", system="")
+        await asyncio.to_thread(ollama_generate, model=model, prompt="hi", system="")
         _warm_models.add(model)
         return {"status": "warm", "model": model}
     except Exception as e:
@@ -1332,8 +1472,9 @@ def _require_corpus(corpus: str) -> None:
         )
 
 
+@cache
 def _get_repo_root() -> Path:
-    """Get repository root directory"""
+    """Get repository root directory (fixed for the process, so cached)"""
     return find_repo_root(Path(__file__))
 
 
@@ -1347,10 +1488,9 @@ def _get_corpus_document_count(corpus_name: str) -> int:
         if not index_file.exists():
             return 0
 
-        rows = read_jsonl(index_file)
-        # Count unique document IDs
+        # Count unique document IDs (streamed — no row list held)
         doc_ids = set()
-        for row in rows:
+        for row in iter_jsonl(index_file):
             doc_id = row.get("doc_id", "")
             if doc_id:
                 doc_ids.add(doc_id)
@@ -1371,12 +1511,18 @@ def _get_corpus_size(corpus_name: str) -> int:
         if not corpus_dir.exists():
             return 0
 
+        # os.scandir walk: entry types come from the directory listing and DirEntry.stat() is
+        # one (cached) stat per file — os.walk + exists + getsize cost two or three.
         total_size = 0
-        for dirpath, _dirnames, filenames in os.walk(corpus_dir):
-            for f in filenames:
-                fp = os.path.join(dirpath, f)
-                if os.path.exists(fp):
-                    total_size += os.path.getsize(fp)
+        stack = [str(corpus_dir)]
+        while stack:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        with suppress(OSError):  # removed mid-walk
+                            total_size += entry.stat().st_size
 
         return total_size
     except Exception as e:
@@ -1513,7 +1659,51 @@ async def ask(req: AskRequest) -> AskResponse:
     # AIStudio_941: resolve timeout — per-request → corpus default_timeout → config (mirror of min_score)
     _corpus_timeout = _corpus_meta.get("default_timeout")
     _timeout = req.timeout if req.timeout is not None else (_corpus_timeout if _corpus_timeout is not None else CONFIG.ollama.request_timeout_s)
-    docs = retrieve(query=retrieval_query, top_k=top_k, corpus=req.corpus, hybrid_alpha=hybrid_alpha, min_score=min_score, entity_filter=_effective_entity_filter, allowed_source_paths=req.allowed_source_paths or None, keywords=req.keywords or None)
+
+    await _prime_query_embedding(retrieval_query)
+
+    # Semantic answer cache (opt-in). Partition on everything that changes the answer so a
+    # paraphrase only matches an identically-shaped request; history-bearing follow-ups skip it.
+    _sem_cache = _semantic_cache() if not req.conversation_history else None
+    _sem_partition = ""
+    _sem_embedding: list[float] | None = None
+    if _sem_cache is not None:
+        # The index stamp changes on re-ingest or delete, so stale answers are not served for the TTL.
+        _sem_index = corpus_paths(repo_root=_get_repo_root(), corpus=req.corpus)["index"]
+        _sem_partition = json.dumps(
+            [req.corpus, index_stamp(_sem_index), _effective_model, top_k, hybrid_alpha, min_score,
+             sorted(_effective_entity_filter or []), sorted(req.allowed_source_paths or []),
+             sorted(req.keywords or []), req.temperature, req.include_context],
+            default=str,
+        )
+        try:
+            _sem_embedding = await asyncio.to_thread(
+                embed_query_with_cache, model=CONFIG.rag.default_embed_model, text=retrieval_query
+            )
+            _cached = _sem_cache.lookup(partition=_sem_partition, embedding=_sem_embedding)
+            if _cached is not None:
+                return _cached
+        except Exception:
+            # Embedding unavailable — fall through to the normal path (which will surface the error).
+            _sem_embedding = None
+
+    # Load the generation model in Ollama while retrieval runs; awaited before generation.
+    # Models already warmed (here or by /prewarm) skip the extra /api/generate round trip.
+    _warmup = (
+        None if _effective_model in _warm_models
+        else asyncio.create_task(_warm_generation_model(_effective_model))
+    )
+
+    try:
+        docs = await asyncio.to_thread(
+            retrieve, query=retrieval_query, top_k=top_k, corpus=req.corpus, hybrid_alpha=hybrid_alpha,
+            min_score=min_score, entity_filter=_effective_entity_filter,
+            allowed_source_paths=req.allowed_source_paths or None, keywords=req.keywords or None,
+        )
+    except BaseException:
+        if _warmup is not None:
+            _warmup.cancel()  # no generation follows a failed retrieval
+        raise
 
     # AIStudio_1013 — entity-filter-miss hard-stop. When an entity_filter was active but retrieval
     # returned 0 in-scope chunks, retrieve() already refuses the unfiltered lexical backfill (_800 v2)
@@ -1524,6 +1714,8 @@ async def ask(req: AskRequest) -> AskResponse:
     # generate. (auto-mode where a named entity never resolved to a filter is a separate, entity-KB
     # completeness problem — _1021/faithful-add — not reachable from a 0-doc signal.)
     if _effective_entity_filter and not docs:
+        if _warmup is not None:
+            _warmup.cancel()  # no generation on this path
         _asked = ", ".join(_effective_entity_filter)
         # Manuel option (iii): don't dump the (possibly long) covered list here — point the user to
         # the coverage meta-query, which /ask answers on demand (handled at the top of this endpoint).
@@ -1542,8 +1734,12 @@ async def ask(req: AskRequest) -> AskResponse:
             no_info=True,
         )
 
+    if _warmup is not None:
+        await _warmup
+
     # Generate answer with citations
-    result = generate_answer_with_citations(
+    result = await asyncio.to_thread(
+        generate_answer_with_citations,
         query=req.query,
         docs=docs,
         conversation_history=req.conversation_history,
@@ -1575,7 +1771,7 @@ async def ask(req: AskRequest) -> AskResponse:
             for d in docs
         ]
 
-    return AskResponse(
+    response = AskResponse(
         answer=result["answer"],
         citations=citation_responses,
         has_citations=result["has_citations"],
@@ -1584,6 +1780,9 @@ async def ask(req: AskRequest) -> AskResponse:
         system_prompt_tier=result.get("prompt_tier"),  # AIStudio_956: 'small' | 'full'
         context=_context,
     )
+    if _sem_cache is not None and _sem_embedding is not None:
+        _sem_cache.add(partition=_sem_partition, embedding=_sem_embedding, value=response)
+    return response
 
 
 @app.post("/debug/prompt")
@@ -1640,7 +1839,9 @@ async def debug_retrieve(req: RetrieveRequest) -> dict[str, Any]:
     _corpus_meta_dbg = _read_corpus_meta_defaults(req.corpus)
     _corpus_min_score_dbg = _corpus_meta_dbg.get("default_min_score")
     min_score_dbg = req.min_score if req.min_score is not None else (_corpus_min_score_dbg if _corpus_min_score_dbg is not None else 0.5)
-    docs = retrieve(
+    await _prime_query_embedding(retrieval_query)
+    docs = await asyncio.to_thread(
+        retrieve,
         query=retrieval_query, top_k=req.top_k, corpus=req.corpus, hybrid_alpha=hybrid_alpha,
         min_score=min_score_dbg, entity_filter=req.entity_filter or None,
         allowed_source_paths=req.allowed_source_paths or None,
@@ -1668,6 +1869,15 @@ async def debug_retrieve(req: RetrieveRequest) -> dict[str, Any]:
     }
 
 
+@app.get("/debug/cache")
+async def debug_cache() -> dict[str, Any]:
+    """Counters for the process-wide query-embedding, deterministic-generation and semantic caches."""
+    stats: dict[str, Any] = dict(cache_stats())
+    _sem = _semantic_cache()
+    stats["semantic"] = _sem.stats() if _sem is not None else {"enabled": False}
+    return stats
+
+
 # CORPUS MANAGEMENT ENDPOINTS
 
 
@@ -2704,10 +2914,9 @@ async def rename_corpus(corpus_name: str, request: Request) -> dict[str, Any]:
 
         # 3. Delete old Qdrant collection
         try:
-            from qdrant_client import QdrantClient
+            from local_llm_bot.app.vectorstore import qdrant_store
 
-            qc = QdrantClient(host="localhost", port=6333)
-            qc.delete_collection(f"aistudio_{corpus_name}")
+            qdrant_store.delete_collection(collection_name=f"aistudio_{corpus_name}")
         except Exception as e:
             print(f"[rename_corpus] Qdrant cleanup warning: {e}")
 
@@ -2758,10 +2967,9 @@ async def delete_corpus(corpus_name: str, confirm: str = "") -> dict[str, Any]:
 
     # Step 1: Delete Qdrant collection
     try:
-        from qdrant_client import QdrantClient
+        from local_llm_bot.app.vectorstore import qdrant_store
 
-        qc = QdrantClient(host="localhost", port=6333)
-        qc.delete_collection(f"aistudio_{corpus_name}")
+        qdrant_store.delete_collection(collection_name=f"aistudio_{corpus_name}")
     except Exception as e:
         print(f"[delete_corpus] Qdrant cleanup warning: {e}")
 
@@ -2888,6 +3096,23 @@ async def delete_file_chunks_only(corpus_name: str, filename: str) -> dict[str,
     except Exception as e:
         print(f"[delete_chunks] Qdrant warning: {e}")
 
+    try:
+        mark_doc_deleted(paths["index"], abs_file_path)
+        append_docmap_entry(paths["docmap"], abs_file_path, [])
+    except Exception as e:
+        print(f"[delete_chunks] index.jsonl warning: {e}")
+
+    if os.getenv("AISTUDIO_VECTORSTORE", "qdrant").lower() == "sqlite_vec":
+        try:
+            from local_llm_bot.app.vectorstore import sqlite_vec_store
+
+            if sqlite_vec_store.available():
+                sqlite_vec_store.delete_source_path(
+                    collection_name=f"aistudio_{corpus_name}", source_path=abs_file_path
+                )
+        except Exception as e:
+            print(f"[delete_chunks] sqlite-vec warning: {e}")
+
     # Clear file entry from corpus_metadata.yaml so it re-ingests cleanly
     try:
         _repo = _get_repo_root()
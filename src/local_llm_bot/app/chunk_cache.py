@@ -0,0 +1,145 @@
+# src/local_llm_bot/app/chunk_cache.py
+# Version: 1.0.0
+# Changelog: 1.0.0 — Disk-backed cache that survives uvicorn restarts, keyed by content hash. Two
+#   tables in one SQLite file: `emb` (sha256(model, text) -> float32 query embedding), consulted by
+#   ollama_client.embed_query_with_cache under its in-process LRU, and `bm25` (corpus ->
+#   sha256(index.jsonl) + the postings arrays), which lets rag_core._bm25_index skip re-tokenizing
+#   an unchanged corpus after a restart. OFF by default; enabled by CONFIG.rag.chunk_cache_path
+#   (env AISTUDIO_CHUNK_CACHE_PATH).
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+from local_llm_bot.app.config import CONFIG
+
+
+def _embedding_key(model: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model}\0{text}".encode()).digest()
+
+
+class ChunkCache:
+    """Content-hash keyed embedding + BM25 postings store in one SQLite file.
+
+    Thread-safe (one connection guarded by a lock); WAL mode lets several server processes share
+    the file. Values are immutable for a given key, so concurrent writers can only race to write
+    the same bytes.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS emb ("
+                "hash BLOB NOT NULL, model TEXT NOT NULL, vec BLOB NOT NULL, "
+                "PRIMARY KEY (hash, model))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bm25 ("
+                "corpus TEXT PRIMARY KEY, hash BLOB NOT NULL, terms BLOB NOT NULL, "
+                "offsets BLOB NOT NULL, positions BLOB NOT NULL, weights BLOB NOT NULL)"
+            )
+
+    def get_embedding(self, *, model: str, text: str) -> list[float] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT vec FROM emb WHERE hash = ? AND model = ?",
+                (_embedding_key(model, text), model),
+            ).fetchone()
+        if row is None:
+            return None
+        vec = array("f")
+        vec.frombytes(row[0])
+        return vec.tolist()
+
+    def put_embedding(self, *, model: str, text: str, vec: list[float]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO emb(hash, model, vec) VALUES (?, ?, ?)",
+                (_embedding_key(model, text), model, array("f", vec).tobytes()),
+            )
+
+    def get_bm25_postings(
+        self, *, corpus: str, content_hash: bytes
+    ) -> dict[str, tuple[np.ndarray, np.ndarray]] | None:
+        """Postings saved for `corpus`, or None if absent or built from different content."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT terms, offsets, positions, weights FROM bm25 WHERE corpus = ? AND hash = ?",
+                (corpus, content_hash),
+            ).fetchone()
+        if row is None:
+            return None
+        terms = row[0].decode("utf-8").split("\n") if row[0] else []
+        offsets = np.frombuffer(row[1], dtype=np.int64)
+        positions = np.frombuffer(row[2], dtype=np.int32)
+        weights = np.frombuffer(row[3], dtype=np.float32)
+        return {
+            term: (positions[offsets[i] : offsets[i + 1]], weights[offsets[i] : offsets[i + 1]])
+            for i, term in enumerate(terms)
+        }
+
+    def put_bm25_postings(
+        self,
+        *,
+        corpus: str,
+        content_hash: bytes,
+        postings: dict[str, tuple[np.ndarray, np.ndarray]],
+    ) -> None:
+        """Replace the saved postings for `corpus` (flattened into three contiguous arrays)."""
+        terms = list(postings)
+        lengths = [len(postings[t][0]) for t in terms]
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        positions = (
+            np.concatenate([postings[t][0] for t in terms]).astype(np.int32, copy=False)
+            if terms
+            else np.zeros(0, dtype=np.int32)
+        )
+        weights = (
+            np.concatenate([postings[t][1] for t in terms]).astype(np.float32, copy=False)
+            if terms
+            else np.zeros(0, dtype=np.float32)
+        )
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO bm25(corpus, hash, terms, offsets, positions, weights) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    corpus,
+                    content_hash,
+                    "\n".join(terms).encode("utf-8"),
+                    offsets.tobytes(),
+                    positions.tobytes(),
+                    weights.tobytes(),
+                ),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_CACHE_LOCK = threading.Lock()
+_CACHE: ChunkCache | None = None
+
+
+def get_chunk_cache() -> ChunkCache | None:
+    """The process-wide ChunkCache, or None when CONFIG.rag.chunk_cache_path is unset."""
+    global _CACHE
+    path = CONFIG.rag.chunk_cache_path
+    if not path:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None or _CACHE.path != Path(path).expanduser():
+            _CACHE = ChunkCache(Path(path).expanduser())
+        return _CACHE
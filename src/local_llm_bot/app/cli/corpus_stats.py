@@ -3,9 +3,18 @@ from __future__ import annotations
 import argparse
 import heapq
 import json
+import os
+import re
 import time
-from collections import Counter, defaultdict
-from collections.abc import Iterable
+from collections import Counter, defaultdict, deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -21,7 +30,12 @@ from ..config import (
     DEFAULT_PARSE_FILES_PER_SEC,
     default_excludes,
 )
-from ..ingest.loaders import SUPPORTED_EXTS, extract_text, is_excluded, should_skip_filename
+from ..ingest.loaders import (
+    SUPPORTED_EXTS,
+    compile_exclude_matcher,
+    extract_text,
+    should_skip_filename,
+)
 
 try:
     from tqdm import tqdm  # type: ignore
@@ -71,15 +85,113 @@ def fmt_duration(seconds: float) -> str:
     return f"{days:.1f}d"
 
 
-def iter_files(root: Path, excludes: list[str]) -> Iterable[Path]:
-    for p in root.rglob("*"):
-        if not p.is_file():
-            continue
-        if should_skip_filename(p.name):
-            continue
-        if is_excluded(p, excludes):
+# Bytes per stored vector component for each storage precision (see AISTUDIO_VECTOR_QUANT).
+QUANT_BYTES = {"fp32": 4, "fp16": 2, "int8": 1}
+
+# "*/NAME/*" — a pure directory-component exclude (the shape of every default exclude).
+_DIR_COMPONENT_GLOB = re.compile(r"^\*/([^/*?\[\]]+)/\*$")
+
+
+def split_dir_excludes(patterns: list[str]) -> tuple[frozenset[str], list[str]]:
+    """Split excludes into (directory names, remaining globs).
+
+    A "*/NAME/*" glob excludes exactly the files below a directory called NAME, so the walker can
+    drop that subtree by name before descending — no pattern matching per file. Anything else
+    (extensions, partial names, nested paths) stays a glob for compile_exclude_matcher.
+    """
+    dirs: set[str] = set()
+    globs: list[str] = []
+    for pat in patterns:
+        m = _DIR_COMPONENT_GLOB.match(pat)
+        if m:
+            dirs.add(m.group(1))
+        else:
+            globs.append(pat)
+    return frozenset(dirs), globs
+
+
+def iter_files(root: Path, excludes: list[str]) -> Iterable[os.DirEntry[str]]:
+    """Yield a DirEntry for every non-excluded file under `root`.
+
+    Walks with os.scandir so file/dir typing comes from the directory listing itself (no extra
+    stat per path, unlike rglob + is_file), and the entry's stat() result is cached for the
+    caller. Symlinked directories are not descended (rglob's default). Directory-name excludes
+    prune whole subtrees at push time; only the remaining globs are matched per file.
+    """
+    exclude_dirs, globs = split_dir_excludes(excludes)
+    excluded = compile_exclude_matcher(globs)
+    stack = [str(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
             continue
-        yield p
+        with it:
+            for e in it:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        if e.name not in exclude_dirs:
+                            stack.append(e.path)
+                        continue
+                    if not e.is_file():
+                        continue
+                except OSError:
+                    continue
+                if should_skip_filename(e.name):
+                    continue
+                if excluded(e.path):
+                    continue
+                yield e
+
+
+@dataclass(frozen=True)
+class ScanResult:
+    path: Path
+    size: int | None  # None = stat failed
+    ext: str
+
+
+def scan_one(entry: os.DirEntry[str]) -> ScanResult:
+    """stat one file. Runs on a worker thread."""
+    path = Path(entry.path)
+    ext = path.suffix.lower()
+    try:
+        size = entry.stat().st_size  # cached on the DirEntry after is_file()
+    except Exception:
+        return ScanResult(path=path, size=None, ext=ext)
+    return ScanResult(path=path, size=size, ext=ext)
+
+
+def extract_char_count(path: Path) -> tuple[bool, int, str]:
+    """(ok, extracted char count, failure reason) for one file. Runs in a worker PROCESS.
+
+    Parsing (pdfplumber, openpyxl, BeautifulSoup ...) is CPU-bound and holds the GIL, so it scales
+    with processes, not threads. Only the count crosses the process boundary — not the text.
+    """
+    res = extract_text(path)
+    return res.ok, len(res.text), res.reason
+
+
+def bounded_map[T, R](
+    executor: ThreadPoolExecutor, fn: Callable[[T], R], items: Iterable[T], window: int
+) -> Iterator[R]:
+    """Ordered executor.map that keeps at most `window` tasks in flight.
+
+    Executor.map submits the whole iterable up front, which would materialize every path; this
+    pulls from `items` only as results are consumed, so memory stays O(window).
+
+    The window is also what keeps many stat/read syscalls in flight at once. A batched io_uring
+    submitter was considered and rejected: the reads that dominate are issued inside the parser
+    libraries (pdfplumber, openpyxl, python-docx ...) from their own file handles, so only the
+    stat() would move to the ring, and it is Linux-only while this tool mostly runs on macOS.
+    """
+    pending: deque[Future[R]] = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
 
 
 def compute_estimates(
@@ -124,6 +236,12 @@ def main() -> None:
 
     p.add_argument("--embed-dim", type=int, default=DEFAULT_EMBED_DIM)
     p.add_argument("--float-bytes", type=int, default=DEFAULT_FLOAT_BYTES)
+    p.add_argument(
+        "--quant",
+        choices=sorted(QUANT_BYTES),
+        default=None,
+        help="Vector storage precision for the DB-size estimate (overrides --float-bytes)",
+    )
     p.add_argument("--overhead-low", type=float, default=DEFAULT_OVERHEAD_LOW)
     p.add_argument("--overhead-high", type=float, default=DEFAULT_OVERHEAD_HIGH)
 
@@ -136,9 +254,23 @@ def main() -> None:
     p.add_argument("--no-default-excludes", action="store_true")
 
     p.add_argument("--top", type=int, default=20, help="Top N to print for extensions & failures")
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=min(8, os.cpu_count() or 1),
+        help="Threads for the directory walk + stat (I/O-bound)",
+    )
+    p.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for text extraction (CPU-bound parsing)",
+    )
     p.add_argument("--report-json", default="", help="Write JSON report to this path")
 
     args = p.parse_args()
+    if args.quant is not None:
+        args.float_bytes = QUANT_BYTES[args.quant]
 
     root = Path(args.root).expanduser()
     if not root.exists():
@@ -164,50 +296,76 @@ def main() -> None:
 
     t0 = time.time()
 
-    paths = list(iter_files(root, excludes))
-    iterator = paths
-    if tqdm is not None:
-        iterator = tqdm(paths, desc="Scanning files", unit="file")  # type: ignore
-
-    for path in iterator:  # type: ignore
-        files_total += 1
-        try:
-            size = path.stat().st_size
-        except Exception:
-            ext = path.suffix.lower()
-            ext_counts_all[ext] += 1
-            failure_counts[ext]["stat_error"] += 1
-            key = (ext, "stat_error")
+    def _record_extract(path: Path, ext: str, ok: bool, n_chars: int, reason: str) -> None:
+        nonlocal extracted_chars_total, estimated_chunks_total
+        if not ok:
+            reason = reason or "unknown"
+            failure_counts[ext][reason] += 1
+            key = (ext, reason)
             if len(failure_samples[key]) < 10:
                 failure_samples[key].append(str(path))
-            continue
-
-        bytes_total += size
-
-        # top-N largest tracking
-        if len(largest) < args.top:
-            heapq.heappush(largest, (size, path))
-        else:
-            heapq.heappushpop(largest, (size, path))
-
-        ext = path.suffix.lower()
-        ext_counts_all[ext] += 1
-
-        if ext in SUPPORTED_EXTS:
-            files_supported += 1
-            ext_counts_supported[ext] += 1
-
-            res = extract_text(path)
-            if not res.ok:
-                reason = res.reason or "unknown"
-                failure_counts[ext][reason] += 1
-                key = (ext, reason)
+            return
+        extracted_chars_total += n_chars
+        estimated_chunks_total += estimate_chunks(n_chars, args.chunk_size, args.overlap)
+
+    n_procs = max(1, args.processes)
+    max_in_flight = 2 * n_procs
+    extracting: dict[Future[tuple[bool, int, str]], tuple[Path, str]] = {}
+
+    def _drain(done: set[Future[tuple[bool, int, str]]]) -> None:
+        for fut in done:
+            path, ext = extracting.pop(fut)
+            try:
+                ok, n_chars, reason = fut.result()
+            except Exception as e:  # worker crashed on this file
+                ok, n_chars, reason = False, 0, f"worker_error:{type(e).__name__}"
+            _record_extract(path, ext, ok, n_chars, reason)
+
+    with (
+        ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor,
+        ProcessPoolExecutor(max_workers=n_procs) as extractors,
+    ):
+        # Paths stream from the generator into a bounded window of in-flight stats; supported files
+        # are handed to the extraction processes with at most 2×processes outstanding. All counters
+        # are aggregated here on the main process only.
+        results = bounded_map(
+            executor, scan_one, iter_files(root, excludes), window=max(1, args.workers) * 4
+        )
+        iterator = results
+        if tqdm is not None:
+            iterator = tqdm(results, desc="Scanning files", unit="file")  # type: ignore
+
+        for r in iterator:  # type: ignore
+            files_total += 1
+            path, ext = r.path, r.ext
+            ext_counts_all[ext] += 1
+            if r.size is None:
+                failure_counts[ext]["stat_error"] += 1
+                key = (ext, "stat_error")
                 if len(failure_samples[key]) < 10:
                     failure_samples[key].append(str(path))
                 continue
 
-            extracted_chars_total += len(res.text)
-            estimated_chunks_total += estimate_chunks(len(res.text), args.chunk_size, args.overlap)
+            size = r.size
+            bytes_total += size
+
+            # top-N largest tracking
+            if len(largest) < args.top:
+                heapq.heappush(largest, (size, path))
+            else:
+                heapq.heappushpop(largest, (size, path))
+
+            if ext in SUPPORTED_EXTS:
+                files_supported += 1
+                ext_counts_supported[ext] += 1
+                if len(extracting) >= max_in_flight:
+                    done, _ = wait(extracting, return_when=FIRST_COMPLETED)
+                    _drain(done)
+                extracting[extractors.submit(extract_char_count, path)] = (path, ext)
+
+        while extracting:
+            done, _ = wait(extracting, return_when=FIRST_COMPLETED)
+            _drain(done)
 
     t1 = time.time()
     scan_seconds = t1 - t0
@@ -254,13 +412,14 @@ def main() -> None:
         for ext, c in failure_counts.items():
             for reason, n in c.items():
                 flat.append((n, ext, reason))
-        flat.sort(reverse=True)
+        # Only the top rows are printed (and the top 5 sampled) — select them, don't sort all.
+        top_flat = heapq.nlargest(max(args.top, 5), flat)
 
-        for n, ext, reason in flat[: args.top]:
+        for n, ext, reason in top_flat[: args.top]:
             print(f"{n:8d}  {ext:6s}  {reason}")
 
         print("\n--- Sample failing paths (top categories) ---")
-        for _n, ext, reason in flat[: min(5, len(flat))]:
+        for _n, ext, reason in top_flat[:5]:
             key = (ext, reason)
             samples = failure_samples.get(key, [])
             if samples:
@@ -275,7 +434,7 @@ def main() -> None:
     print("\n=== Embedding DB size estimate (Chroma) ===")
     print(f"Embedding dim:          {args.embed_dim}")
     print(
-        f"Vector raw bytes/chunk: {args.embed_dim * args.float_bytes} bytes (float{args.float_bytes * 8})"
+        f"Vector raw bytes/chunk: {args.embed_dim * args.float_bytes} bytes ({args.quant or f'float{args.float_bytes * 8}'})"
     )
     print(
         f"Estimated DB size:      {human_bytes(est.db_low_bytes)}  to  {human_bytes(est.db_high_bytes)} "
@@ -319,6 +478,7 @@ def main() -> None:
             "embedding_estimate": {
                 "embed_dim": args.embed_dim,
                 "float_bytes": args.float_bytes,
+                "quant": args.quant,
                 "overhead_low": args.overhead_low,
                 "overhead_high": args.overhead_high,
                 "db_size_bytes_low": est.db_low_bytes,
@@ -1,5 +1,31 @@
 # src/local_llm_bot/app/config.py
-# Version: 1.8.0
+# Version: 1.17.0
+# Changelog: 1.17.0 — RagConfig gains embed_concurrency (default 4; env AISTUDIO_EMBED_CONCURRENCY):
+#   how many embedding batches upsert_chunks keeps in flight against Ollama (1 = serial).
+# Changelog: 1.16.0 — IngestConfig gains office_backend ("objects" default | "stream"; env
+#   AISTUDIO_INGEST_OFFICE_BACKEND), selecting the DOCX/PPTX text extractor in ingest/loaders.py.
+# Changelog: 1.15.0 — IngestConfig gains pdf_backend ("pdfplumber" default | "pdfium"; env
+#   AISTUDIO_INGEST_PDF_BACKEND), selecting the PDF text extractor in ingest/loaders.py.
+# Changelog: 1.14.0 — IngestConfig gains extract_cache_path (None = off; env
+#   AISTUDIO_EXTRACT_CACHE_PATH): the SQLite file for ingest/extract_cache.py, which keeps extracted
+#   document text keyed by file MD5 so unchanged bytes are not re-parsed on re-ingest.
+# Changelog: 1.13.0 — load_config_from_env is table-driven (_ENV_FIELDS: section, field, env var,
+#   parser): the env snapshot is parsed into one nested dict and validated with a single
+#   AppConfig.model_validate call instead of ~25 attribute assignments on a default AppConfig.
+#   Because assignments were never validated, out-of-range env values (e.g. AISTUDIO_TOP_K=80 with
+#   le=50) used to slip through; they now fail fast with a ValidationError at import.
+# Changelog: 1.12.0 — load_config_from_env(env=None) reads one snapshot of os.environ (or a mapping
+#   passed in — handy for tests) and threads it through the _env_* helpers, which now take the
+#   mapping as their first argument; no per-field os.getenv round trips at import.
+# Changelog: 1.11.0 — RagConfig gains chunk_cache_path (None = off; env AISTUDIO_CHUNK_CACHE_PATH):
+#   the SQLite file for app/chunk_cache.py, which persists query embeddings and the lexical BM25
+#   postings across restarts, keyed by content hash.
+# Changelog: 1.10.0 — RagConfig gains query_batch_size (16) + query_batch_max_wait_ms (0 = off) for
+#   the /ask + /debug/retrieve query-embedding micro-batcher. Env AISTUDIO_QUERY_BATCH_SIZE /
+#   AISTUDIO_QUERY_BATCH_MAX_WAIT_MS.
+# Changelog: 1.9.0 — RagConfig gains semantic_cache_threshold (None = off; env
+#   AISTUDIO_SEMANTIC_CACHE_THRESHOLD, ~0.85 suggested) and semantic_cache_ttl_s (default 300; env
+#   AISTUDIO_SEMANTIC_CACHE_TTL_S) for the /ask semantic answer cache (app/semantic_cache.py).
 # Changelog: 1.8.0 — AIStudio_1059: ModelFitConfig gains mem_floor_gb, the minimum machine size the
 #   memory-ballast utility (scripts/_mem_ballast.py, ais_bench --emulate-ram) will emulate. Locked
 #   memory cannot be swapped, so a target below this leaves macOS no headroom. Declared here for
@@ -39,36 +65,24 @@
 from __future__ import annotations
 
 import os
+from collections.abc import Callable, Mapping
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import BaseModel, Field
 
 
-def _env_bool(name: str, default: bool) -> bool:
-    v = os.getenv(name)
-    if v is None:
-        return default
+def _parse_bool(v: str) -> bool:
     return v.strip().lower() in {"1", "true", "yes", "y", "on"}
 
 
-def _env_int(name: str, default: int) -> int:
-    v = os.getenv(name)
-    if v is None:
-        return default
-    return int(v)
+def _parse_optional_float(v: str) -> float | None:
+    # Null semantics for opt-in knobs: empty string = unset (None = feature off).
+    return float(v) if v.strip() != "" else None
 
 
-def _env_float(name: str, default: float) -> float:
-    v = os.getenv(name)
-    if v is None:
-        return default
-    return float(v)
-
-
-def _env_str(name: str, default: str) -> str:
-    v = os.getenv(name)
-    return default if v is None else v
+def _parse_optional_str(v: str) -> str | None:
+    return v.strip() or None
 
 
 class RagConfig(BaseModel):
@@ -112,11 +126,42 @@ class RagConfig(BaseModel):
     # generation path (/ask, rag_core, bench, /debug/prompt, warmup) inherits it. Env AISTUDIO_NUM_CTX.
     num_ctx: int = Field(default=16384, ge=512)
 
+    # Semantic answer cache for /ask (app/semantic_cache.py). A query whose embedding has cosine
+    # similarity >= this to a cached query — with an identical corpus/model/filter/knob set — is
+    # answered from the cache. None = off (default): a paraphrase hit returns an answer generated
+    # for different words, which is only acceptable once an operator opts in. ~0.85 is a sane start.
+    semantic_cache_threshold: float | None = Field(default=None, ge=0.0, le=1.0)
+    semantic_cache_ttl_s: float = Field(default=300.0, gt=0.0)
+
+    # Query-embedding micro-batching for /ask + /debug/retrieve (api.py _QueryEmbedBatcher).
+    # Concurrent requests are collected for up to max_wait_ms (or until batch_size is reached) and
+    # their queries embedded in one Ollama call. 0 = off: every request embeds on its own, with no
+    # added wait. 50-100 ms pays off only under real concurrency.
+    query_batch_size: int = Field(default=16, ge=1)
+    query_batch_max_wait_ms: float = Field(default=0.0, ge=0.0)
+
+    # Restart-surviving cache (app/chunk_cache.py): query embeddings keyed by sha256(model, text)
+    # and the lexical BM25 postings keyed by sha256(index.jsonl). None = off (default).
+    chunk_cache_path: str | None = Field(default=None)
+
+    # Ingest embedding: batches sent to Ollama concurrently by the stores' upsert_chunks
+    # (ollama_client.ollama_embed_batches). 1 = one batch at a time. Ollama serves them up to its
+    # own OLLAMA_NUM_PARALLEL; beyond that they queue server-side and only hide the HTTP round trip.
+    embed_concurrency: int = Field(default=4, ge=1)
+
 
 class IngestConfig(BaseModel):
     chunk_size: int = Field(default=1200, ge=1)
     overlap: int = Field(default=200, ge=0)
     xlsx_max_cells: int = Field(default=2_000_000, ge=1)
+    # PDF text extractor: "pdfplumber" (layout-aware, default) or "pdfium" (pypdfium2, native and
+    # much faster; text layout differs slightly, so switching warrants a --force re-ingest).
+    pdf_backend: Literal["pdfplumber", "pdfium"] = Field(default="pdfplumber")
+    # DOCX/PPTX text extractor: "objects" (python-docx / python-pptx, default) or "stream" (the
+    # part XML streamed with iterparse; faster, table cells in document order — re-ingest).
+    office_backend: Literal["objects", "stream"] = Field(default="objects")
+    # Extracted-text cache (ingest/extract_cache.py) keyed by file MD5. None = off (default).
+    extract_cache_path: str | None = Field(default=None)
 
 
 class ChromaConfig(BaseModel):
@@ -167,67 +212,64 @@ class AppConfig(BaseModel):
     # vectorstore : str | None = Field(default=None)
 
 
-def load_config_from_env() -> AppConfig:
-    cfg = AppConfig()
-
+# Environment → config table: (section, field, env var, parser). An unset variable — or one
+# whose parser returns None — keeps the model default.
+_ENV_FIELDS: tuple[tuple[str, str, str, Callable[[str], Any]], ...] = (
     # RAG
-    cfg.rag.use_chroma = _env_bool("AISTUDIO_USE_CHROMA", cfg.rag.use_chroma)
-    _vs = os.getenv("AISTUDIO_VECTORSTORE", cfg.rag.vectorstore).lower()
-    cfg.rag.vectorstore = _vs
-    # Keep use_chroma in sync for legacy code
-    cfg.rag.use_chroma = (_vs == "chroma")
-    cfg.rag.top_k = _env_int("AISTUDIO_TOP_K", cfg.rag.top_k)
-    # cfg.rag.max_distance = _env_float("AISTUDIO_MAX_DISTANCE", cfg.rag.max_distance)
-
-    v = os.getenv("AISTUDIO_MAX_DISTANCE")
-    if v is not None and v.strip() != "":
-        cfg.rag.max_distance = float(v)
-    else:
-        cfg.rag.max_distance = None
-
-    # Hybrid retrieval alpha — same null-semantics pattern as max_distance.
-    # Empty string or unset = None (vector-only retrieval, preserves v1.4.0 behavior).
-    # Value in [0.0, 1.0] = hybrid mode active with that weight.
-    v = os.getenv("AISTUDIO_HYBRID_ALPHA")
-    if v is not None and v.strip() != "":
-        cfg.rag.hybrid_alpha = float(v)
-    else:
-        cfg.rag.hybrid_alpha = None
-
-    cfg.rag.default_model = _env_str("AISTUDIO_DEFAULT_MODEL", cfg.rag.default_model)
-    cfg.rag.default_embed_model = _env_str(
-        "AISTUDIO_DEFAULT_EMBED_MODEL", cfg.rag.default_embed_model
-    )
-    cfg.rag.full_prompt_min_b = _env_int(
-        "AISTUDIO_FULL_PROMPT_MIN_B", cfg.rag.full_prompt_min_b
-    )
-    cfg.rag.num_ctx = _env_int("AISTUDIO_NUM_CTX", cfg.rag.num_ctx)
-
+    ("rag", "vectorstore", "AISTUDIO_VECTORSTORE", str.lower),
+    ("rag", "top_k", "AISTUDIO_TOP_K", int),
+    # max_distance / hybrid_alpha: empty or unset = None (no distance filter; vector-only
+    # retrieval, preserves v1.4.0 behavior). Value in [0.0, 1.0] = hybrid mode with that weight.
+    ("rag", "max_distance", "AISTUDIO_MAX_DISTANCE", _parse_optional_float),
+    ("rag", "hybrid_alpha", "AISTUDIO_HYBRID_ALPHA", _parse_optional_float),
+    ("rag", "default_model", "AISTUDIO_DEFAULT_MODEL", str),
+    ("rag", "default_embed_model", "AISTUDIO_DEFAULT_EMBED_MODEL", str),
+    ("rag", "full_prompt_min_b", "AISTUDIO_FULL_PROMPT_MIN_B", int),
+    ("rag", "num_ctx", "AISTUDIO_NUM_CTX", int),
+    ("rag", "semantic_cache_threshold", "AISTUDIO_SEMANTIC_CACHE_THRESHOLD", _parse_optional_float),
+    ("rag", "semantic_cache_ttl_s", "AISTUDIO_SEMANTIC_CACHE_TTL_S", float),
+    ("rag", "query_batch_size", "AISTUDIO_QUERY_BATCH_SIZE", int),
+    ("rag", "query_batch_max_wait_ms", "AISTUDIO_QUERY_BATCH_MAX_WAIT_MS", float),
+    ("rag", "chunk_cache_path", "AISTUDIO_CHUNK_CACHE_PATH", _parse_optional_str),
+    ("rag", "embed_concurrency", "AISTUDIO_EMBED_CONCURRENCY", int),
     # Ingest
-    cfg.ingest.chunk_size = _env_int("AISTUDIO_INGEST_CHUNK_SIZE", cfg.ingest.chunk_size)
-    cfg.ingest.overlap = _env_int("AISTUDIO_INGEST_OVERLAP", cfg.ingest.overlap)
-    cfg.ingest.xlsx_max_cells = _env_int(
-        "AISTUDIO_INGEST_XLSX_MAX_CELLS", cfg.ingest.xlsx_max_cells
-    )
-
-    # Chroma
-    # (collection is typically per-corpus at runtime, but keep a default)
-    cfg.chroma.collection = _env_str("AISTUDIO_CHROMA_COLLECTION", cfg.chroma.collection)
-
+    ("ingest", "chunk_size", "AISTUDIO_INGEST_CHUNK_SIZE", int),
+    ("ingest", "overlap", "AISTUDIO_INGEST_OVERLAP", int),
+    ("ingest", "xlsx_max_cells", "AISTUDIO_INGEST_XLSX_MAX_CELLS", int),
+    ("ingest", "extract_cache_path", "AISTUDIO_EXTRACT_CACHE_PATH", _parse_optional_str),
+    ("ingest", "pdf_backend", "AISTUDIO_INGEST_PDF_BACKEND", str.lower),
+    ("ingest", "office_backend", "AISTUDIO_INGEST_OFFICE_BACKEND", str.lower),
+    # Chroma (collection is typically per-corpus at runtime, but keep a default)
+    ("chroma", "collection", "AISTUDIO_CHROMA_COLLECTION", str),
     # Ollama
-    cfg.ollama.base_url = _env_str("AISTUDIO_OLLAMA_BASE_URL", cfg.ollama.base_url)
-    cfg.ollama.request_timeout_s = _env_float(
-        "AISTUDIO_OLLAMA_TIMEOUT_S", cfg.ollama.request_timeout_s
-    )
-
+    ("ollama", "base_url", "AISTUDIO_OLLAMA_BASE_URL", str),
+    ("ollama", "request_timeout_s", "AISTUDIO_OLLAMA_TIMEOUT_S", float),
     # Model-fit guard (AIStudio_1020)
-    cfg.fit.reserve_bytes = _env_int("AISTUDIO_FIT_RESERVE_BYTES", cfg.fit.reserve_bytes)
-    cfg.fit.footprint_mult = _env_float("AISTUDIO_FIT_FOOTPRINT_MULT", cfg.fit.footprint_mult)
-    cfg.fit.warn_frac = _env_float("AISTUDIO_FIT_WARN_FRAC", cfg.fit.warn_frac)
-    cfg.fit.block_frac = _env_float("AISTUDIO_FIT_BLOCK_FRAC", cfg.fit.block_frac)
-    cfg.fit.mem_floor_gb = _env_float("AISTUDIO_MEM_FLOOR_GB", cfg.fit.mem_floor_gb)
-
-    return cfg
+    ("fit", "reserve_bytes", "AISTUDIO_FIT_RESERVE_BYTES", int),
+    ("fit", "footprint_mult", "AISTUDIO_FIT_FOOTPRINT_MULT", float),
+    ("fit", "warn_frac", "AISTUDIO_FIT_WARN_FRAC", float),
+    ("fit", "block_frac", "AISTUDIO_FIT_BLOCK_FRAC", float),
+    ("fit", "mem_floor_gb", "AISTUDIO_MEM_FLOOR_GB", float),
+)
+
+
+def load_config_from_env(env: Mapping[str, str] | None = None) -> AppConfig:
+    # One snapshot of the environment, one validation pass over the whole nested config.
+    env = dict(os.environ) if env is None else env
+    data: dict[str, dict[str, Any]] = {}
+    for section, field, name, parse in _ENV_FIELDS:
+        raw = env.get(name)
+        if raw is None:
+            continue
+        value = parse(raw)
+        if value is not None:
+            data.setdefault(section, {})[field] = value
+
+    rag = data.setdefault("rag", {})
+    # Keep use_chroma in sync for legacy code (AISTUDIO_USE_CHROMA is superseded by this).
+    rag["use_chroma"] = rag.get("vectorstore", RagConfig.model_fields["vectorstore"].default) == "chroma"
+
+    return AppConfig.model_validate(data)
 
 
 # Global config instance
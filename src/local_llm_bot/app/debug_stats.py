@@ -1,31 +1,135 @@
 from __future__ import annotations
 
 import json
+import mmap
+import re
+from collections import Counter
+from collections.abc import Iterator
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
-from local_llm_bot.app.ingest.index_jsonl import read_jsonl
+from local_llm_bot.app.ingest.index_jsonl import index_stamp, iter_jsonl, load_docmap
 from local_llm_bot.app.utils.corpus_paths import corpus_paths
 from local_llm_bot.app.utils.repo_root import find_repo_root
 
+try:
+    import orjson as _orjson
+except ImportError:  # optional — stdlib json parses the same legacy docmap
+    _orjson = None
+
+# path -> (st_size, st_mtime_ns, non-blank line count); reused while the file is unchanged.
+_COUNT_CACHE: dict[Path, tuple[int, int, int]] = {}
+
+# path -> (index_stamp, _IndexSummary) for index.jsonl; also invalidated by new tombstones.
+_INDEX_CACHE: dict[Path, tuple[tuple[int, int, int, int], _IndexSummary]] = {}
+
+# Target size of the newline-aligned blocks the JSONL scanners copy out of the mmap.
+_BLOCK_BYTES = 8 << 20
+
+# A line holding only whitespace (``str.strip()`` would empty it), newline included.
+_BLANK_LINE_RE = re.compile(rb"^[ \t\r\f\v]*\n", re.MULTILINE)
+
+
+def _count_nonblank_lines(data: bytes) -> int:
+    """Non-blank line count via C-level bytes ops: newlines, minus blank lines, plus a final
+    unterminated line if it has content."""
+    newlines = data.count(b"\n")
+    has_tail = data.rfind(b"\n") + 1 < len(data)
+    # Canonical JSONL (every line is an object) needs only memchr-speed counts: when each line
+    # starts with "{", none of them can be blank and the regex pass below is skipped.
+    if data.count(b"\n{") + data.startswith(b"{") == newlines + has_tail:
+        return newlines + has_tail
+    n = newlines - len(_BLANK_LINE_RE.findall(data))
+    if data[data.rfind(b"\n") + 1 :].strip():
+        n += 1
+    return n
+
 
 def _count_jsonl(path: Path) -> int:
-    if not path.exists():
+    try:
+        st = path.stat()
+    except OSError:
         return 0
-    with path.open("r", encoding="utf-8") as f:
-        return sum(1 for line in f if line.strip())
+    key = (st.st_size, st.st_mtime_ns)
+    cached = _COUNT_CACHE.get(path)
+    if cached is not None and cached[:2] == key:
+        return cached[2]
+    n = sum(_count_nonblank_lines(block) for block in _iter_line_blocks(path))
+    _COUNT_CACHE[path] = (*key, n)
+    return n
+
+
+def _iter_line_blocks(path: Path) -> Iterator[bytes]:
+    """Yield the file as newline-aligned byte blocks of roughly _BLOCK_BYTES each.
+
+    Reads through a read-only mmap, so a multi-GB JSONL is never held in memory whole and
+    no per-line Python string is created just to find line boundaries.
+    """
+    with path.open("rb") as f:
+        if path.stat().st_size == 0:
+            return  # mmap cannot map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            start = 0
+            while start < size:
+                end = size
+                if start + _BLOCK_BYTES < size:
+                    nl = mm.rfind(b"\n", start, start + _BLOCK_BYTES)
+                    if nl < 0:  # one line longer than a block — extend to its end
+                        nl = mm.find(b"\n", start + _BLOCK_BYTES)
+                    end = size if nl < 0 else nl + 1
+                yield mm[start:end]
+                start = end
+
+
+@dataclass(frozen=True, slots=True)
+class _IndexSummary:
+    """The few index.jsonl aggregates the stats need — no per-row dicts retained."""
+
+    rows: int
+    docs_unique: int
+    source_counts: Counter[str]
+
+
+def _summarize_index(path: Path) -> _IndexSummary:
+    """One streaming pass over index.jsonl (index_jsonl.iter_jsonl: same blank/malformed-line and
+    tombstone rules as read_jsonl), cached on the index + tombstones stamp so compute_stats and
+    compute_jsonl_stats share it."""
+    if not path.exists():
+        return _IndexSummary(rows=0, docs_unique=0, source_counts=Counter())
+    key = index_stamp(path)
+    cached = _INDEX_CACHE.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    rows = 0
+    doc_ids: set[str] = set()
+    source_counts: Counter[str] = Counter()
+    for row in iter_jsonl(path):
+        rows += 1
+        if not isinstance(row, dict):
+            continue
+        if row.get("doc_id"):
+            doc_ids.add(str(row["doc_id"]))
+        if row.get("source_path"):
+            source_counts[str(row["source_path"])] += 1
+
+    summary = _IndexSummary(rows=rows, docs_unique=len(doc_ids), source_counts=source_counts)
+    _INDEX_CACHE[path] = (key, summary)
+    return summary
 
 
 def _safe_size(path: Path) -> int:
     return path.stat().st_size if path.exists() else 0
 
 
-def _load_docmap(path: Path) -> dict[str, list[str]]:
+def _load_legacy_docmap(path: Path) -> dict[str, list[str]]:
     if not path.exists():
         return {}
     try:
-        data = json.loads(path.read_text(encoding="utf-8"))
+        raw = path.read_bytes()
+        data = _orjson.loads(raw) if _orjson is not None else json.loads(raw)
         if isinstance(data, dict):
             # best-effort validation
             out: dict[str, list[str]] = {}
@@ -38,7 +142,12 @@ def _load_docmap(path: Path) -> dict[str, list[str]]:
         return {}
 
 
-@dataclass(frozen=True)
+def _load_docmap(path: Path) -> dict[str, list[str]]:
+    """Legacy monolithic doc_chunk_map.json, overlaid by the doc_chunk_map.jsonl append log."""
+    return load_docmap(path.with_suffix(".jsonl"), base=_load_legacy_docmap(path.with_suffix(".json")))
+
+
+@dataclass(frozen=True, slots=True)
 class JsonlStats:
     data_dir: Path
 
@@ -77,15 +186,11 @@ def compute_jsonl_stats(*, data_dir: Path | None = None, corpus: str = "default"
         repo_root = find_repo_root(Path(__file__))
         paths = corpus_paths(repo_root, corpus)
 
-    rows = read_jsonl(paths["index"])
+    index = _summarize_index(paths["index"])
 
-    # unique doc_id/source_path
-    doc_ids = {str(r.get("doc_id")) for r in rows if r.get("doc_id")}
-    sources = {str(r.get("source_path")) for r in rows if r.get("source_path")}
-
-    chunks_total = len(rows)
-    docs_unique = len(doc_ids)
-    sources_unique = len(sources)
+    chunks_total = index.rows
+    docs_unique = index.docs_unique
+    sources_unique = len(index.source_counts)
 
     manifest_entries = _count_jsonl(paths["manifest"])
     failures_total = _count_jsonl(paths["failures"])
@@ -112,18 +217,11 @@ def compute_stats(*, corpus: str = "default", top_n: int = 10) -> dict[str, Any]
     repo_root = find_repo_root(Path(__file__))
     paths = corpus_paths(repo_root, corpus)
 
-    rows = read_jsonl(paths["index"])
-    sources_list = [str(r.get("source_path", "")) for r in rows if r.get("source_path")]
-
-    counts: dict[str, int] = {}
-    for s in sources_list:
-        counts[s] = counts.get(s, 0) + 1
-
-    top_sources = sorted(
-        [{"source": k, "chunks": v} for k, v in counts.items()],
-        key=lambda x: x["chunks"],
-        reverse=True,
-    )[:top_n]
+    counts = _summarize_index(paths["index"]).source_counts
+    top_sources = [
+        {"source": k, "chunks": v}
+        for k, v in counts.most_common(top_n)
+    ]
 
     s = compute_jsonl_stats(corpus=corpus)
 
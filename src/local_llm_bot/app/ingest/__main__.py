@@ -11,8 +11,10 @@ from local_llm_bot.app.ingest.pipeline import ingest_corpus
 from local_llm_bot.app.utils.corpus_paths import corpus_paths
 from local_llm_bot.app.utils.repo_root import find_repo_root
 
-# Version: 1.3.5
-# Changelog: 1.3.5 — AIStudio_912 (Manuel CLI signature change, 2026-06-14): --files help text
+# Version: 1.3.6
+# Changelog: 1.3.6 — --jobs N sets the number of extraction worker processes for this run
+#            (ingest_corpus(workers=...)); omitted → AISTUDIO_INGEST_WORKERS or one per core.
+#            1.3.5 — AIStudio_912 (Manuel CLI signature change, 2026-06-14): --files help text
 #            updated to describe OR-matched literal-substring / regex patterns (matching logic
 #            lives in pipeline.py v1.8.32 _selective_match). No parse change here — still one
 #            comma-separated string → only_files set; pipeline does the matching.
@@ -100,6 +102,12 @@ def main(argv: list[str] | None = None) -> int:
             "parked) is left untouched. Omit to ingest the whole corpus."
         ),
     )
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Extraction worker processes (default: AISTUDIO_INGEST_WORKERS or one per core; 1 = one extraction thread)",
+    )
     p.add_argument("--verbose", action="store_true", help="Print full JSON result payload after summary")
 
     args = p.parse_args(argv)
@@ -110,6 +118,8 @@ def main(argv: list[str] | None = None) -> int:
         raise SystemExit(f"Path not found: {root}")
     if not root.is_dir():
         raise SystemExit(f"--root must be a directory: {root}")
+    if args.jobs is not None and args.jobs < 1:
+        raise SystemExit(f"--jobs must be >= 1: {args.jobs}")
 
     # Provide tqdm to pipeline (pipeline will create multiple progress bars)
     try:
@@ -138,6 +148,7 @@ def main(argv: list[str] | None = None) -> int:
         embed_model=args.embed_model,
         max_files=args.max_files,
         only_files=only_files,
+        workers=args.jobs,
         tqdm_cls=tqdm,  # <-- key change: pipeline controls bars
     )
     dur = time.time() - t0
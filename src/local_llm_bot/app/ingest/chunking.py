@@ -12,8 +12,12 @@ Key principles:
 - Falls back gracefully for unstructured text
 - Configurable for different document types via parameters
 """
-# Version: 1.1.0
-# Changelog: 1.0.0 — AIStudio_733: first version header on chunking.py.
+# Version: 1.1.4
+# Changelog: 1.1.4 — TextBoundary (one per detected boundary) is a slots dataclass.
+# Changelog: 1.1.3 — iter_chunk_text finds the stripped bounds of the text by index instead of
+#            calling text.strip(), so a large document with leading/trailing whitespace is no
+#            longer copied whole before its windows are sliced; output unchanged.
+#            1.0.0 — AIStudio_733: first version header on chunking.py.
 #            AIStudio_817: table-aware chunking. _is_markdown_table_block() detects a
 #            normalized markdown table; chunk_with_boundaries keeps such a block atomic
 #            (a single 'TABLE' chunk) instead of sentence-splitting it — sentence-splitting
@@ -26,10 +30,16 @@ Key principles:
 #            statement per line). Exploded facts are individually self-contained, so a
 #            split is non-destructive even if it occurs — this guard is for readability
 #            and retrieval cohesion, not correctness.
+#            1.1.1 — chunk_text builds its windows with one slicing comprehension over
+#            range(0, len - overlap, step) instead of a Python while-loop; output unchanged.
+#            1.1.2 — chunk_spans() yields chunk_text's (start, end) windows as index pairs and
+#            iter_chunk_text() slices them lazily; chunk_text is list(iter_chunk_text(...)).
+#            Ingest consumes the generator, so a file's raw windows are never all alive at once.
 
 from __future__ import annotations
 
 import re
+from collections.abc import Iterator
 from dataclasses import dataclass
 from enum import Enum
 
@@ -46,7 +56,7 @@ class BoundaryType(Enum):
     NONE = 0         # No boundary
 
 
-@dataclass
+@dataclass(slots=True)
 class TextBoundary:
     """Represents a detected boundary in text"""
     position: int           # Character position
@@ -528,10 +538,14 @@ def chunk_document_simple(doc: Document, chunk_size: int = 1200, overlap: int =
 
 
 # Original character-based chunking (kept for reference/testing)
-def chunk_text(text: str, chunk_size: int = 1200, overlap: int = 200) -> list[str]:
+_NON_SPACE_RE = re.compile(r"\S")
+
+
+def chunk_spans(n: int, *, chunk_size: int = 1200, overlap: int = 200) -> Iterator[tuple[int, int]]:
     """
-    DEPRECATED: Character-based chunking.
-    Use chunk_document() instead for better results.
+    (start, end) windows of chunk_text over a text of length n, without slicing anything.
+
+    Windows start every (chunk_size - overlap) chars; the last is the first one that reaches n.
     """
     if chunk_size <= 0:
         raise ValueError("chunk_size must be > 0")
@@ -539,22 +553,34 @@ def chunk_text(text: str, chunk_size: int = 1200, overlap: int = 200) -> list[st
         raise ValueError("overlap must be >= 0")
     if overlap >= chunk_size:
         raise ValueError("overlap must be < chunk_size")
+    if n <= 0:
+        return
+    # Every start < n - overlap, and always start 0.
+    for start in range(0, max(1, n - overlap), chunk_size - overlap):
+        yield start, min(n, start + chunk_size)
+
+
+def iter_chunk_text(text: str, chunk_size: int = 1200, overlap: int = 200) -> Iterator[str]:
+    """chunk_text as a generator: each window is sliced only when consumed."""
+    # The windows of text.strip(), offset into text itself: stripping an MB-scale document with
+    # a trailing newline would copy all of it just to drop one character.
+    m = _NON_SPACE_RE.search(text)
+    lo = m.start() if m else len(text)
+    hi = len(text)
+    while hi > lo and text[hi - 1].isspace():
+        hi -= 1
+    for start, end in chunk_spans(hi - lo, chunk_size=chunk_size, overlap=overlap):
+        chunk = text[lo + start:lo + end].strip()
+        if chunk:
+            yield chunk
 
-    text = text.strip()
-    if not text:
-        return []
 
-    chunks: list[str] = []
-    start = 0
-    while start < len(text):
-        end = min(len(text), start + chunk_size)
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        if end == len(text):
-            break
-        start = end - overlap
-    return chunks
+def chunk_text(text: str, chunk_size: int = 1200, overlap: int = 200) -> list[str]:
+    """
+    DEPRECATED: Character-based chunking.
+    Use chunk_document() instead for better results.
+    """
+    return list(iter_chunk_text(text, chunk_size, overlap))
 
 
 # ============================================================================
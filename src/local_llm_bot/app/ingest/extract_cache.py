@@ -0,0 +1,91 @@
+# src/local_llm_bot/app/ingest/extract_cache.py
+# Version: 1.0.2
+# Changelog: 1.0.2 — The entry tag also carries a non-default CONFIG.ingest.office_backend.
+# Changelog: 1.0.1 — Entries are tagged with EXTRACTOR_VERSION and the configured PDF backend
+#   (CONFIG.ingest.pdf_backend), so switching backends never serves the other backend's text.
+# Changelog: 1.0.0 — Disk-backed cache of extracted document text keyed by the file's content MD5
+#   (the digest ingest already stores in every chunk payload). A file whose mtime changed but whose
+#   bytes did not — touched, copied, moved to another corpus — is not re-parsed. OFF by default;
+#   enabled by CONFIG.ingest.extract_cache_path (env AISTUDIO_EXTRACT_CACHE_PATH).
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from local_llm_bot.app.config import CONFIG
+
+# Bump when extraction output changes (loaders.py), so text cached by an older extractor is
+# never served for the same bytes.
+EXTRACTOR_VERSION = 1
+
+
+def _extractor_tag() -> str:
+    # The PDF and Office backends change extracted text too; each backend keeps its own entries.
+    # The default Office backend adds nothing, so entries cached before it existed stay valid.
+    tag = f"{EXTRACTOR_VERSION}:{CONFIG.ingest.pdf_backend}"
+    if CONFIG.ingest.office_backend != "objects":
+        tag += f":{CONFIG.ingest.office_backend}"
+    return tag
+
+
+class ExtractCache:
+    """Content-hash keyed extracted-text store in one SQLite file.
+
+    Ingest worker processes each open their own connection; WAL mode plus a busy timeout lets
+    them read and write the file concurrently. Values are immutable for a given key, so racing
+    writers can only write the same text.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS extract ("
+                "md5 TEXT NOT NULL, version TEXT NOT NULL, text TEXT NOT NULL, "
+                "PRIMARY KEY (md5, version))"
+            )
+
+    def get(self, md5: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM extract WHERE md5 = ? AND version = ?",
+                (md5, _extractor_tag()),
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, md5: str, text: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extract(md5, version, text) VALUES (?, ?, ?)",
+                (md5, _extractor_tag(), text),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_CACHE_LOCK = threading.Lock()
+_CACHE: ExtractCache | None = None
+_CACHE_PID = 0
+
+
+def get_extract_cache(path: str | None) -> ExtractCache | None:
+    """This process's ExtractCache for `path`, or None when `path` is unset.
+
+    Reopened after a fork: a SQLite connection must not be shared with the parent process.
+    """
+    global _CACHE, _CACHE_PID
+    if not path:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None or os.getpid() != _CACHE_PID or _CACHE.path != Path(path).expanduser():
+            _CACHE = ExtractCache(Path(path).expanduser())
+            _CACHE_PID = os.getpid()
+        return _CACHE
@@ -1,10 +1,29 @@
 from __future__ import annotations
 
+import contextlib
 import json
-from collections.abc import Iterable
+import mmap
+import os
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
+from json.encoder import encode_basestring as _encode_str
 from pathlib import Path
-from typing import Any
+from typing import Any, BinaryIO
+
+try:
+    import orjson as _orjson
+except ImportError:  # optional — stdlib json produces the same rows (with spaces after separators)
+    _orjson = None
+
+
+# Write buffer for whole-file rewrites (compaction, doc removal): few large writes, not one per row.
+_REWRITE_BUFFER = 1 << 20
+
+# read_jsonl_fields(parallel=True) parses an index at least twice this size in a process pool, one
+# newline-aligned byte range of at least this many bytes per worker.
+_PARSE_RANGE_BYTES = 32 << 20
 
 
 @dataclass(frozen=True)
@@ -15,50 +34,444 @@ class ChunkRow:
     text: str
 
 
+def tombstones_path(index_path: Path) -> Path:
+    """Side-car of doc tombstones for a JSONL index: index.jsonl -> index.tombstones.jsonl."""
+    return index_path.with_name(f"{index_path.stem}.tombstones.jsonl")
+
+
+def _loads(line: bytes) -> Any:
+    """Parse one JSONL line — orjson when installed; stdlib json for what orjson rejects (NaN)."""
+    if _orjson is not None:
+        try:
+            return _orjson.loads(line)
+        except _orjson.JSONDecodeError:
+            pass
+    return json.loads(line)
+
+
+def _iter_lines(
+    path: Path, start: int = 0, stop: int | None = None
+) -> Iterator[tuple[int, bytes, Any]]:
+    """Yield (byte offset, raw line, parsed row) for every non-blank, well-formed line.
+
+    The file is memory-mapped and split with mmap.find: lines come straight from the page cache
+    without passing through a buffered reader. Rows appended after the map is taken are not seen.
+    `start`/`stop` limit the scan to a byte range; `start` must be at the beginning of a line.
+    """
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            find = mm.find
+            offset = start
+            if stop is not None:
+                size = min(size, stop)
+            while offset < size:
+                end = find(b"\n", offset)
+                end = size if end < 0 else end + 1
+                start, raw = offset, mm[offset:end]
+                offset = end
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    row = _loads(line)
+                except Exception:
+                    # ignore malformed lines
+                    continue
+                yield start, raw, row
+
+
+def iter_rows(path: Path) -> Iterator[Any]:
+    """
+    Parsed rows of a small plain JSONL file (manifest, side-cars): one bulk read, then one
+    orjson parse per line. No tombstone filtering; blank and malformed lines are skipped.
+    """
+    for line in path.read_bytes().splitlines():
+        if not line.strip():
+            continue
+        try:
+            yield _loads(line)
+        except Exception:
+            continue
+
+
+def load_tombstones(index_path: Path) -> dict[str, int]:
+    """doc_id -> byte offset in the index below which that doc's rows are deleted."""
+    path = tombstones_path(index_path)
+    if not path.exists():
+        return {}
+    out: dict[str, int] = {}
+    for _, _, t in _iter_lines(path):
+        if isinstance(t, dict) and t.get("doc_id"):
+            doc_id, before = str(t["doc_id"]), int(t.get("before", 0))
+            out[doc_id] = max(before, out.get(doc_id, 0))
+    return out
+
+
+def is_tombstoned(row: Any, offset: int, tombstones: dict[str, int]) -> bool:
+    if not tombstones or not isinstance(row, dict):
+        return False
+    before = tombstones.get(str(row.get("doc_id", "")))
+    return before is not None and offset < before
+
+
+def iter_jsonl(path: Path) -> Iterator[dict[str, Any]]:
+    """Stream the rows of a JSONL file one at a time, minus blank/malformed lines and
+    tombstoned docs. Aggregations should prefer this over read_jsonl (O(1) rows in memory)."""
+    if not path.exists():
+        return
+    tombstones = load_tombstones(path)
+    for off, _, row in _iter_lines(path):
+        if not is_tombstoned(row, off, tombstones):
+            yield row
+
+
 def read_jsonl(path: Path) -> list[dict[str, Any]]:
+    """All rows of a JSONL file, minus blank/malformed lines and tombstoned docs."""
+    return list(iter_jsonl(path))
+
+
+def _parse_range(
+    path: Path, start: int, stop: int, fields: Sequence[str], tombstones: dict[str, int]
+) -> list[list[str]]:
+    """`fields` of the live rows in bytes [start, stop) of `path`, one list per field."""
+    cols: list[list[str]] = [[] for _ in fields]
+    for off, _, row in _iter_lines(path, start, stop):
+        if not isinstance(row, dict) or is_tombstoned(row, off, tombstones):
+            continue
+        for col, field in zip(cols, fields, strict=True):
+            col.append(str(row.get(field, "")))
+    return cols
+
+
+def _line_aligned_ranges(path: Path, size: int, n: int) -> list[tuple[int, int]]:
+    """Split `path` into at most `n` byte ranges of about equal size, each ending after a newline."""
+    bounds = [0]
+    with path.open("rb") as f, mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, n):
+            nl = mm.find(b"\n", max(bounds[-1], i * size // n))
+            if nl < 0:
+                break
+            bounds.append(nl + 1)
+    if bounds[-1] < size:
+        bounds.append(size)
+    return list(zip(bounds, bounds[1:], strict=False))
+
+
+def read_jsonl_fields(
+    path: Path, fields: Sequence[str], *, parallel: bool = False
+) -> list[list[str]]:
+    """
+    `fields` (stringified, "" when absent) of every live dict row of a JSONL file, as one list per
+    field in file order — read_jsonl minus the row dicts.
+
+    With parallel=True (ingest / CLI callers), large files are split into newline-aligned byte
+    ranges and parsed by a process pool, each worker mapping the file itself and returning only
+    the requested columns; smaller files, or a pool that fails to start, are parsed in this
+    process. The server parses in-process: a pool of cpu_count workers per request would
+    contend with Ollama and uvicorn for every core.
+    """
     if not path.exists():
-        return []
-    rows: list[dict[str, Any]] = []
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                rows.append(json.loads(line))
-            except Exception:
-                # ignore malformed lines
-                continue
-    return rows
+        return [[] for _ in fields]
+    tombstones = load_tombstones(path)
+    size = path.stat().st_size
+    workers = min(os.cpu_count() or 1, size // _PARSE_RANGE_BYTES) if parallel else 1
+    if workers > 1:
+        ranges = _line_aligned_ranges(path, size, workers)
+        try:
+            with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+                futures = [
+                    pool.submit(_parse_range, path, a, b, fields, tombstones) for a, b in ranges
+                ]
+                parts = [f.result() for f in futures]
+        except (BrokenProcessPool, OSError):
+            pass
+        else:
+            cols: list[list[str]] = [[] for _ in fields]
+            for part in parts:
+                for col, values in zip(cols, part, strict=True):
+                    col.extend(values)
+            return cols
+    return _parse_range(path, 0, size, fields, tombstones)
 
 
-def append_rows(path: Path, rows: Iterable[dict[str, Any]]) -> None:
+def index_stamp(index_path: Path) -> tuple[int, int, int, int]:
+    """(mtime_ns, size) of the index and of its tombstones side-car — changes when either does."""
+    stamp: list[int] = []
+    for p in (index_path, tombstones_path(index_path)):
+        try:
+            st = p.stat()
+            stamp += [st.st_mtime_ns, st.st_size]
+        except OSError:
+            stamp += [0, 0]
+    return (stamp[0], stamp[1], stamp[2], stamp[3])
+
+
+def mark_doc_deleted(index_path: Path, doc_id: str) -> None:
+    """
+    Delete every row of `doc_id` currently in the index by appending a tombstone — O(1), no
+    rewrite. Rows appended afterwards (a re-ingest of the same doc) stay live, because the
+    tombstone only covers bytes written before it.
+    """
+    size = index_path.stat().st_size if index_path.exists() else 0
+    append_rows(tombstones_path(index_path), [{"doc_id": doc_id, "before": size}])
+
+
+def compact_index(index_path: Path, *, min_dead_ratio: float = 0.0) -> int:
+    """
+    Drop tombstoned rows from the index in one rewrite (tmp + atomic replace) and clear the
+    tombstones. Skipped while dead rows are at most `min_dead_ratio` of all rows.
+    Returns the number of rows removed.
+    """
+    tombstones = load_tombstones(index_path)
+    if not tombstones or not index_path.exists():
+        return 0
+    total = dead = 0
+    for off, _, row in _iter_lines(index_path):
+        total += 1
+        dead += is_tombstoned(row, off, tombstones)
+    if total and dead / total <= min_dead_ratio:
+        return 0
+
+    tmp_path = index_path.with_name(f"{index_path.name}.tmp")
+    with tmp_path.open("wb", buffering=_REWRITE_BUFFER) as dst:
+        dst.writelines(
+            raw if raw.endswith(b"\n") else raw + b"\n"
+            for off, raw, row in _iter_lines(index_path)
+            if not is_tombstoned(row, off, tombstones)
+        )
+    replace_durably(tmp_path, index_path)
+    tombstones_path(index_path).unlink(missing_ok=True)
+    return dead
+
+
+def load_docmap(path: Path, base: dict[str, list[str]] | None = None) -> dict[str, list[str]]:
+    """
+    doc_id -> chunk_ids from a doc_chunk_map.jsonl append log. The last entry per doc_id wins;
+    an entry with no chunk_ids removes the doc. The log is replayed onto a copy of `base` when
+    given (an older map the log supersedes), so its removals apply to `base`'s docs too.
+    """
+    return _read_docmap(path, base)[0]
+
+
+def _read_docmap(
+    path: Path, base: dict[str, list[str]] | None = None
+) -> tuple[dict[str, list[str]], int]:
+    """load_docmap() plus the number of well-formed lines read, from one pass over the log."""
+    out: dict[str, list[str]] = dict(base or {})
+    if not path.exists():
+        return out, 0
+    lines = 0
+    for _, _, e in _iter_lines(path):
+        lines += 1
+        if not isinstance(e, dict) or not e.get("doc_id"):
+            continue
+        doc_id = str(e["doc_id"])
+        chunk_ids = e.get("chunk_ids") or []
+        if chunk_ids:
+            out[doc_id] = [str(c) for c in chunk_ids]
+        else:
+            out.pop(doc_id, None)
+    return out, lines
+
+
+def append_docmap_entry(path: Path, doc_id: str, chunk_ids: list[str]) -> None:
+    """Record a doc's current chunk ids (an empty list deletes it) — one appended line."""
+    append_rows(path, [{"doc_id": doc_id, "chunk_ids": list(chunk_ids)}])
+
+
+def compact_docmap(path: Path) -> bool:
+    """Rewrite the docmap log to one line per live doc once it holds more than twice as many
+    lines as live docs. Returns True when it rewrote."""
+    docmap, lines = _read_docmap(path)
+    if lines <= 2 * len(docmap):
+        return False
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_bytes(
+        encode_rows({"doc_id": d, "chunk_ids": ids} for d, ids in docmap.items())
+    )
+    replace_durably(tmp_path, path)
+    return True
+
+
+def encode_rows(rows: Iterable[dict[str, Any]]) -> bytes:
+    """Serialize rows as UTF-8 JSONL bytes (orjson when installed, else stdlib json)."""
+    if _orjson is not None:
+        opt = _orjson.OPT_APPEND_NEWLINE
+        return b"".join(_orjson.dumps(r, option=opt) for r in rows)
+    return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows).encode("utf-8")
+
+
+def _dumps(obj: Any) -> bytes:
+    if _orjson is not None:
+        return _orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+# Keys of every row the ingest loop emits; encode_doc_rows serializes these rows field by field.
+_CHUNK_ROW_KEYS = frozenset({"chunk_id", "text", "page"})
+
+
+def encode_doc_rows(shared: dict[str, Any], rows: Iterable[dict[str, Any]]) -> bytes:
+    """
+    JSONL for one document's rows, each line being the row merged with `shared` (per-row keys
+    first). `shared` — doc_id, source_path, … — is serialized once and spliced into every line
+    instead of being re-encoded per chunk.
+    """
+    tail = _dumps(shared)[1:]  # '"k":v,...}' — the object minus its opening brace
+    if tail == b"}":
+        return encode_rows(rows)
+    dumps = _dumps
+    # orjson encodes a whole dict faster than any per-field splicing; the stdlib fallback does not.
+    specialize = _orjson is None
+    out = bytearray()
+    for r in rows:
+        if specialize and r.keys() == _CHUNK_ROW_KEYS:
+            # Ingest's fixed chunk row: only the two strings go through the (C) string escaper.
+            page = r["page"]
+            line = '{"chunk_id":' + _encode_str(r["chunk_id"]) + ',"text":' + _encode_str(r["text"])
+            out += line.encode("utf-8")
+            out += b',"page":' + (b"null" if page is None else str(int(page)).encode("ascii"))
+            out += b","
+        else:
+            head = dumps(r)[:-1]  # '{"k":v,...' — minus the closing brace
+            out += head
+            if len(head) > 1:
+                out += b","
+        out += tail
+        out += b"\n"
+    return bytes(out)
+
+
+def _fsync_dir(path: Path) -> None:
+    """Make a rename/creation in `path` durable. No-op where directories cannot be opened."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    with contextlib.suppress(OSError):
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def replace_durably(tmp_path: Path, path: Path) -> None:
+    """tmp_path.replace(path) with the new file's bytes and the rename both fsync'ed, so a crash
+    leaves either the old file or the complete new one."""
+    with tmp_path.open("rb") as f:
+        os.fsync(f.fileno())
+    tmp_path.replace(path)
+    _fsync_dir(path.parent)
+
+
+class AppendLog:
+    """
+    A JSONL file held open for appending across many writes (ingest's index and docmap).
+
+    write() appends already-encoded lines through a 1 MiB buffer; sync_point() flushes and
+    fsyncs, so everything written before it survives a crash. close() syncs and closes. The file
+    is opened (and created) on the first write.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.bytes_written = 0
+        self._f: BinaryIO | None = None
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return
+        if self._f is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            created = not self.path.exists()
+            self._f = self.path.open("ab", buffering=_REWRITE_BUFFER)
+            if created:
+                _fsync_dir(self.path.parent)
+        self._f.write(data)
+        self.bytes_written += len(data)
+
+    def sync_point(self) -> None:
+        if self._f is not None:
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        if self._f is None:
+            return
+        try:
+            self.sync_point()
+        finally:
+            self._f.close()
+            self._f = None
+
+
+def _append_bytes(path: Path, data: bytes) -> None:
+    if not data:
+        return
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        for r in rows:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+    with path.open("ab") as f:
+        f.write(data)
+
+
+def append_doc_rows(
+    path: Path, docs: Iterable[tuple[dict[str, Any], Iterable[dict[str, Any]]]]
+) -> None:
+    """Append the rows of one or more documents, each as (shared fields, rows), in one write."""
+    _append_bytes(path, b"".join(encode_doc_rows(shared, rows) for shared, rows in docs))
+
+
+def append_rows(path: Path, rows: Iterable[dict[str, Any]]) -> None:
+    """Append rows to a JSONL file with a single binary write."""
+    _append_bytes(path, encode_rows(rows))
+
+
+def _doc_id_needles(doc_id: str) -> tuple[bytes, ...]:
+    """Byte forms of `"doc_id": <doc_id>` in a JSONL row: orjson's compact raw UTF-8 and stdlib
+    json's spaced, \\u-escaped default."""
+    return tuple(
+        b'"doc_id"' + sep + enc
+        for enc in dict.fromkeys((_dumps(doc_id), json.dumps(doc_id).encode("ascii")))
+        for sep in (b":", b": ")
+    )
 
 
 def rewrite_excluding_doc(index_path: Path, tmp_path: Path, doc_id: str) -> None:
     """
     Remove all chunks from index.jsonl with doc_id == doc_id.
     Rewrite to tmp then atomic replace.
+
+    Byte-level scan: a line is parsed only if it contains a `"doc_id": <id>` needle for doc_id
+    (or for a tombstoned doc); every other line is copied verbatim, unparsed. Blank lines are
+    dropped. Tombstoned rows are dropped too and the tombstones cleared, as in compact_index:
+    their byte offsets would not survive the rewrite.
     """
     if not index_path.exists():
         return
 
-    with index_path.open("r", encoding="utf-8") as src, tmp_path.open("w", encoding="utf-8") as dst:
-        for line in src:
-            s = line.strip()
-            if not s:
-                continue
-            try:
-                row = json.loads(s)
-            except Exception:
-                # keep unknown/malformed lines out of the new file
-                continue
-            if str(row.get("doc_id", "")) == doc_id:
+    tombstones = load_tombstones(index_path)
+    needles = _doc_id_needles(doc_id)
+    tomb_needles = tuple(n for d in tombstones for n in _doc_id_needles(d))
+    with index_path.open("rb") as src, tmp_path.open("wb", buffering=_REWRITE_BUFFER) as dst:
+        offset = 0
+        for raw in src:
+            start, offset = offset, offset + len(raw)
+            line = raw.strip()
+            if not line:
                 continue
-            dst.write(line if line.endswith("\n") else line + "\n")
+            mine = any(n in line for n in needles)
+            if mine or any(n in line for n in tomb_needles):
+                try:
+                    row = _loads(line)
+                except Exception:
+                    # keep malformed lines out of the new file
+                    continue
+                if mine and isinstance(row, dict) and str(row.get("doc_id", "")) == doc_id:
+                    continue
+                if is_tombstoned(row, start, tombstones):
+                    continue
+            dst.write(raw if raw.endswith(b"\n") else raw + b"\n")
 
-    tmp_path.replace(index_path)
+    replace_durably(tmp_path, index_path)
+    tombstones_path(index_path).unlink(missing_ok=True)
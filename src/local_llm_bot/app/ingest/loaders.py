@@ -1,4 +1,4 @@
-# Version: 1.1.3
+# Version: 1.1.14
 # Changelog: 1.0.0 — AIStudio_733: first version header on loaders.py.
 #            AIStudio_817: table-aware HTML/iXBRL extraction. Data <table> elements are
 #            normalized to GFM markdown pipe-tables (colspan/rowspan expanded into a
@@ -61,18 +61,65 @@
 #            header band, and polluted anchors with leaked data (e.g. SocGen "2025, 27 254, ...").
 #            sec_10k (comma-thousands) behaviour unchanged. SEB-class intra-word text shredding
 #            is a SEPARATE still-open defect (AIStudio_880).
+#            1.1.4 — Exclude globs compiled once into a single regex (compile_exclude_matcher):
+#            is_excluded no longer runs fnmatch per pattern per path. Same fnmatch semantics
+#            (fnmatch.translate, os.path.normcase on both sides).
+#            1.1.5 — compile_exclude_matcher uses a Hyperscan multi-pattern database when the
+#            optional `hyperscan` package is installed (globs translated to anchored
+#            Hyperscan-safe regexes by _glob_to_hs — fnmatch.translate emits atomic groups,
+#            which Hyperscan rejects). Falls back to the single-regex matcher otherwise.
+#            1.1.6 — is_supported_filename(): extension gate + skip-name rule as one compiled,
+#            case-insensitive regex (no suffix.lower() allocation, one C-level match per name);
+#            used by load_document and ingest discovery.
+#            1.1.7 — _extract_xlsx charges the cell cap per row (one length check, the row
+#            sliced at the cap) and collects a row's non-empty values with one extend(), instead
+#            of a counter + branch per cell. Same cells, same cap, same partial flag.
+#            1.1.8 — Optional PDFium PDF backend (CONFIG.ingest.pdf_backend = "pdfium", env
+#            AISTUDIO_INGEST_PDF_BACKEND): pypdfium2 (native, already installed as pdfplumber's
+#            renderer) extracts each page's text with the same [PAGE_N] markers. Default stays
+#            pdfplumber, whose layout-aware text the current indexes were built from.
+#            1.1.9 — _extract_pptx reads each shape's text once (was: hasattr + truthiness +
+#            str(), three rebuilds of the text frame); _extract_docx builds a horizontally
+#            merged cell's text once per row instead of once per spanned grid column. Output
+#            unchanged.
+#            1.1.10 — extract_text dispatches through the _EXTRACTORS table (suffix -> extractor,
+#            one dict lookup) instead of an if-chain of set/equality tests.
+#            1.1.11 — precheck_file(): size cap per extension (MAX_FILE_BYTES; PDF 200 MiB, XLSX
+#            100 MiB, else 1 GiB) and a NUL-byte probe of .txt/.md heads, run by ingest before
+#            any extractor opens the file.
+#            1.1.12 — _extract_xlsx reads all sheets as one chained row stream; hitting the cell
+#            cap truncates that row and breaks once (no per-sheet partial-flag re-checks).
+#            1.1.13 — Optional streaming DOCX/PPTX readers (CONFIG.ingest.office_backend =
+#            "stream", env AISTUDIO_INGEST_OFFICE_BACKEND): the part XML is read straight from
+#            the zip with ElementTree.iterparse, one paragraph at a time, instead of building
+#            python-docx/python-pptx object trees. Table cells come out in document order
+#            rather than after the body text, so the default stays "objects".
+#            1.1.14 — load_document(path, doc_id=…): a caller that already holds the resolved
+#            path passes it instead of paying a path.resolve() (one lstat per component).
 from __future__ import annotations
 
 import fnmatch
+import functools
 import logging
+import os
 import re
 import warnings
+import xml.etree.ElementTree as ET
+import zipfile
+from collections.abc import Callable, Iterator
 from dataclasses import dataclass
+from itertools import chain
 from pathlib import Path
+from typing import IO, Any
 
 # from ..config import DEFAULT_XLSX_MAX_CELLS
 from local_llm_bot.app.config import CONFIG
 
+try:
+    import hyperscan as _hs
+except ImportError:  # optional — compile_exclude_matcher falls back to one stdlib regex
+    _hs = None
+
 SUPPORTED_EXTS = {".txt", ".md", ".pdf", ".docx", ".pptx", ".xlsx", ".htm", ".html", ".xhtml"}
 
 # Silence noisy PDF parsing logs/warnings (common with imperfect PDFs)
@@ -91,26 +138,145 @@ def should_skip_filename(name: str) -> bool:
     return name.startswith("~$") or name == ".DS_Store"
 
 
+# A name with a supported extension (Path.suffix semantics: at least one character before the
+# final dot), excluding Office lock files (~$…). .DS_Store has no supported extension.
+_SUPPORTED_NAME_RE = re.compile(
+    r"(?!~\$).+(?:" + "|".join(re.escape(e) for e in sorted(SUPPORTED_EXTS)) + r")",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def is_supported_filename(name: str) -> bool:
+    """True for a file name ingest would load: supported extension and not a skip-name."""
+    return _SUPPORTED_NAME_RE.fullmatch(name) is not None
+
+
+# Files above these sizes are rejected before any extractor opens them (one pathological file
+# would otherwise dominate a run's wall time). Other supported extensions: _DEFAULT_MAX_BYTES.
+MAX_FILE_BYTES: dict[str, int] = {".pdf": 200 << 20, ".xlsx": 100 << 20}
+_DEFAULT_MAX_BYTES = 1 << 30
+
+# Plain-text formats are probed for binary content (NUL bytes in the first 4 KiB).
+_TEXT_PROBE_EXTS = {".txt", ".md"}
+_TEXT_PROBE_BYTES = 4096
+
+
+def precheck_file(path: Path, size: int) -> str:
+    """
+    Cheap pre-extraction gate: "" if `path` may be extracted, otherwise a short failure label
+    ("too_large", "binary_content"). `size` is the caller's (cached) st_size.
+    """
+    ext = path.suffix.lower()
+    if size > MAX_FILE_BYTES.get(ext, _DEFAULT_MAX_BYTES):
+        return "too_large"
+    if ext in _TEXT_PROBE_EXTS:
+        try:
+            with path.open("rb") as f:
+                head = f.read(_TEXT_PROBE_BYTES)
+        except OSError:
+            return ""  # let the extractor report the read error
+        if head.count(b"\x00") > len(head) // 64:
+            return "binary_content"
+    return ""
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_exclude_patterns(patterns: tuple[str, ...]) -> re.Pattern[str] | None:
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(os.path.normcase(p)) for p in patterns))
+
+
+def _glob_to_hs(pattern: str) -> str:
+    """fnmatch glob -> anchored regex in the subset Hyperscan accepts (no atomic groups)."""
+    out = ["^"]
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == "*":
+            out.append(".*")
+        elif c == "?":
+            out.append(".")
+        elif c == "[":
+            j = i
+            if j < n and pattern[j] in "!]":
+                j += 1
+            while j < n and pattern[j] != "]":
+                j += 1
+            if j >= n:  # unterminated class is a literal "[" (fnmatch semantics)
+                out.append(re.escape(c))
+                continue
+            body = pattern[i:j].replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            elif body.startswith("^"):
+                body = "\\" + body
+            out.append(f"[{body}]")
+            i = j + 1
+        else:
+            out.append(re.escape(c))
+    out.append("\\z")
+    return "".join(out)
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_exclude_hs_db(patterns: tuple[str, ...]) -> Any | None:
+    """Hyperscan block-mode database over all globs, or None (not installed / rejected)."""
+    if _hs is None or not patterns:
+        return None
+    try:
+        db = _hs.Database(mode=_hs.HS_MODE_BLOCK)
+        db.compile(
+            expressions=[_glob_to_hs(os.path.normcase(p)).encode() for p in patterns],
+            ids=list(range(len(patterns))),
+            flags=[_hs.HS_FLAG_DOTALL | _hs.HS_FLAG_SINGLEMATCH] * len(patterns),
+        )
+    except Exception:  # noqa: BLE001 — pattern Hyperscan cannot compile: use the regex path
+        return None
+    return db
+
+
+def compile_exclude_matcher(patterns: list[str]) -> Callable[[str], bool]:
+    """Return a predicate over path strings: True when ANY fnmatch-style glob matches.
+
+    All globs are folded into one compiled alternation, so each path costs a single regex match
+    instead of one fnmatch per pattern. With the optional `hyperscan` package the globs are
+    instead compiled into one multi-pattern DFA database, whose scan cost does not grow with
+    the number of patterns. Hoist this out of per-file loops.
+    """
+    db = _compile_exclude_hs_db(tuple(patterns))
+    if db is not None:
+        scan = db.scan
+
+        def _stop(_pattern_id: int, _start: int, _end: int, _flags: int, _ctx: Any) -> bool:
+            return True  # any match decides the path — terminate the scan
+
+        def _hs_match(s: str) -> bool:
+            try:
+                scan(os.path.normcase(s).encode("utf-8", "surrogateescape"), match_event_handler=_stop)
+            except _hs.ScanTerminated:
+                return True
+            return False
+
+        return _hs_match
+
+    rx = _compile_exclude_patterns(tuple(patterns))
+    if rx is None:
+        return lambda _s: False
+    match = rx.match
+    return lambda s: match(os.path.normcase(s)) is not None
+
+
 def is_excluded(path: Path, patterns: list[str]) -> bool:
-    s = str(path)
-    return any(fnmatch.fnmatch(s, pat) for pat in patterns)
+    return compile_exclude_matcher(patterns)(str(path))
 
 
 def extract_text(path: Path) -> ExtractResult:
-    ext = path.suffix.lower()
-    if ext in {".txt", ".md"}:
-        return _extract_txt_md(path)
-    if ext == ".docx":
-        return _extract_docx(path)
-    if ext == ".pptx":
-        return _extract_pptx(path)
-    if ext == ".xlsx":
-        return _extract_xlsx(path, max_cells=CONFIG.ingest.xlsx_max_cells)
-    if ext == ".pdf":
-        return _extract_pdf(path)
-    if ext in {".htm", ".html", ".xhtml"}:
-        return _extract_html(path)
-    return ExtractResult(ok=False, text="", reason="unsupported_ext")
+    extractor = _EXTRACTORS.get(path.suffix.lower())
+    if extractor is None:
+        return ExtractResult(ok=False, text="", reason="unsupported_ext")
+    return extractor(path)
 
 
 def _extract_txt_md(path: Path) -> ExtractResult:
@@ -131,17 +297,18 @@ def _extract_docx(path: Path) -> ExtractResult:
 
     try:
         doc = DocxDocument(str(path))
-        parts: list[str] = []
-
-        for p in doc.paragraphs:
-            t = (p.text or "").strip()
-            if t:
-                parts.append(t)
+        parts = [t for p in doc.paragraphs if (t := (p.text or "").strip())]
 
         for table in doc.tables:
             for row in table.rows:
+                prev = None
+                t = ""
                 for cell in row.cells:
-                    t = (cell.text or "").strip()
+                    # A horizontally merged cell is yielded once per grid column, as the same
+                    # object: its text (a walk over its paragraphs) is built once and repeated.
+                    if cell is not prev:
+                        t = (cell.text or "").strip()
+                        prev = cell
                     if t:
                         parts.append(t)
 
@@ -165,11 +332,10 @@ def _extract_pptx(path: Path) -> ExtractResult:
 
         for slide in prs.slides:
             for shape in slide.shapes:
-                # Text frames
-                if hasattr(shape, "text") and shape.text:
-                    t = str(shape.text).strip()
-                    if t:
-                        parts.append(t)
+                # Text frames. shape.text is rebuilt from the XML on every access — read it once.
+                t = str(getattr(shape, "text", None) or "").strip()
+                if t:
+                    parts.append(t)
 
                 # Tables
                 if hasattr(shape, "has_table") and shape.has_table:
@@ -188,6 +354,79 @@ def _extract_pptx(path: Path) -> ExtractResult:
         return ExtractResult(ok=False, text="", reason=f"parse_error:{type(e).__name__}")
 
 
+# Office Open XML namespaces: WordprocessingML (docx body), DrawingML (pptx text), package rels.
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_A_NS = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}Relationship"
+
+
+def _iter_xml_paragraphs(stream: IO[bytes], ns: str) -> Iterator[str]:
+    """
+    Stripped, non-empty text of each <ns:p> in document order, streamed with iterparse: no
+    object model is built, and each paragraph's subtree is cleared once its text is read.
+    Runs (<ns:t>) are concatenated; <ns:tab> is a tab and <ns:br>/<ns:cr> a newline.
+    """
+    t_tag, p_tag, tab_tag = ns + "t", ns + "p", ns + "tab"
+    breaks = {ns + "br", ns + "cr"}
+    buf: list[str] = []
+    for _, el in ET.iterparse(stream, events=("end",)):
+        tag = el.tag
+        if tag == t_tag:
+            buf.append(el.text or "")
+        elif tag == tab_tag:
+            buf.append("\t")
+        elif tag in breaks:
+            buf.append("\n")
+        elif tag == p_tag:
+            text = "".join(buf).strip()
+            buf.clear()
+            el.clear()
+            if text:
+                yield text
+
+
+def _extract_docx_stream(path: Path) -> ExtractResult:
+    """word/document.xml paragraphs — body and table cells alike — in document order."""
+    try:
+        with zipfile.ZipFile(path) as zf, zf.open("word/document.xml") as f:
+            text = "\n".join(_iter_xml_paragraphs(f, _W_NS))
+        if not text:
+            return ExtractResult(ok=False, text="", reason="empty")
+        return ExtractResult(ok=True, text=text, reason="")
+    except Exception as e:
+        return ExtractResult(ok=False, text="", reason=f"parse_error:{type(e).__name__}")
+
+
+def _pptx_slide_parts(zf: zipfile.ZipFile) -> list[str]:
+    """Slide part names in presentation order (presentation.xml sldIdLst via its rels)."""
+    rels = ET.fromstring(zf.read("ppt/_rels/presentation.xml.rels"))
+    targets = {r.get("Id"): r.get("Target", "") for r in rels.iter(_PKG_REL)}
+    pres = ET.fromstring(zf.read("ppt/presentation.xml"))
+    out: list[str] = []
+    for sld in pres.iter("{http://schemas.openxmlformats.org/presentationml/2006/main}sldId"):
+        target = targets.get(sld.get(_R_ID), "")
+        if target:
+            out.append(target.lstrip("/") if target.startswith("/") else f"ppt/{target}")
+    return out
+
+
+def _extract_pptx_stream(path: Path) -> ExtractResult:
+    """Each slide's DrawingML paragraphs (text frames and table cells) in slide order."""
+    try:
+        parts: list[str] = []
+        with zipfile.ZipFile(path) as zf:
+            for name in _pptx_slide_parts(zf):
+                with zf.open(name) as f:
+                    parts.extend(_iter_xml_paragraphs(f, _A_NS))
+        text = "\n".join(parts)
+        if not text:
+            return ExtractResult(ok=False, text="", reason="empty")
+        return ExtractResult(ok=True, text=text, reason="")
+    except Exception as e:
+        return ExtractResult(ok=False, text="", reason=f"parse_error:{type(e).__name__}")
+
+
 def _extract_xlsx(path: Path, max_cells: int) -> ExtractResult:
     try:
         import openpyxl  # type: ignore
@@ -200,22 +439,16 @@ def _extract_xlsx(path: Path, max_cells: int) -> ExtractResult:
         scanned = 0
         partial = False
 
-        for ws in wb.worksheets:
-            for row in ws.iter_rows(values_only=True):
-                for v in row:
-                    scanned += 1
-                    if scanned > max_cells:
-                        partial = True
-                        break
-                    if v is None:
-                        continue
-                    s = str(v).strip()
-                    if s:
-                        parts.append(s)
-                if partial:
-                    break
-            if partial:
+        # Every sheet's rows as one stream: the cap ends it with a single break.
+        rows = chain.from_iterable(ws.iter_rows(values_only=True) for ws in wb.worksheets)
+        for row in rows:
+            remaining = max_cells - scanned
+            if len(row) > remaining:
+                parts.extend(s for v in row[:remaining] if v is not None and (s := str(v).strip()))
+                partial = True
                 break
+            scanned += len(row)
+            parts.extend(s for v in row if v is not None and (s := str(v).strip()))
 
         wb.close()
         text = "\n".join(parts).strip()
@@ -228,6 +461,49 @@ def _extract_xlsx(path: Path, max_cells: int) -> ExtractResult:
         return ExtractResult(ok=False, text="", reason=f"parse_error:{type(e).__name__}")
 
 
+def _extract_pdf_pdfium(path: Path) -> ExtractResult | None:
+    """
+    Extract PDF text with [PAGE_N] markers via PDFium (pypdfium2) — native text extraction,
+    several times faster than pdfplumber's per-character layout analysis. None when pypdfium2
+    is not installed (caller falls back to _extract_pdf). Pages are read sequentially: PDFium
+    is not thread-safe, and ingest already extracts whole files in parallel.
+    """
+    try:
+        import pypdfium2 as pdfium  # type: ignore
+    except ImportError:
+        return None
+
+    try:
+        pdf = pdfium.PdfDocument(str(path))
+    except Exception as e:
+        return ExtractResult(ok=False, text="", reason=f"parse_error:{type(e).__name__}")
+    try:
+        if len(pdf) == 0:
+            return ExtractResult(ok=False, text="", reason="empty")
+        parts: list[str] = []
+        for page_num in range(1, len(pdf) + 1):
+            page = pdf[page_num - 1]
+            textpage = page.get_textpage()
+            try:
+                t = textpage.get_text_bounded().replace("\r\n", "\n").replace("\r", "\n").strip()
+            finally:
+                textpage.close()
+                page.close()
+            if t:
+                parts.append(f"[PAGE_{page_num}]\n{t}")
+    except Exception as e:
+        return ExtractResult(ok=False, text="", reason=f"parse_error:{type(e).__name__}")
+    finally:
+        pdf.close()
+
+    text = "\n\n".join(parts).strip()
+    if not text:
+        return ExtractResult(ok=False, text="", reason="empty")
+    if text.lstrip().startswith("%PDF-"):
+        return ExtractResult(ok=False, text="", reason="pdf_bytes_detected")
+    return ExtractResult(ok=True, text=text, reason="")
+
+
 def _extract_pdf(path: Path) -> ExtractResult:
     """
     Extract PDF text with page boundary markers using pdfplumber.
@@ -687,18 +963,57 @@ class Document:
     text: str
 
 
-def load_document(path: Path) -> Document | None:
+def _extract_xlsx_capped(path: Path) -> ExtractResult:
+    return _extract_xlsx(path, max_cells=CONFIG.ingest.xlsx_max_cells)
+
+
+def _extract_docx_configured(path: Path) -> ExtractResult:
+    if CONFIG.ingest.office_backend == "stream":
+        return _extract_docx_stream(path)
+    return _extract_docx(path)
+
+
+def _extract_pptx_configured(path: Path) -> ExtractResult:
+    if CONFIG.ingest.office_backend == "stream":
+        return _extract_pptx_stream(path)
+    return _extract_pptx(path)
+
+
+def _extract_pdf_configured(path: Path) -> ExtractResult:
+    if CONFIG.ingest.pdf_backend == "pdfium":
+        res = _extract_pdf_pdfium(path)
+        if res is not None:
+            return res
+    return _extract_pdf(path)
+
+
+# extract_text dispatch: lowercase suffix -> extractor (one dict lookup per file). Keys are
+# exactly SUPPORTED_EXTS.
+_EXTRACTORS: dict[str, Callable[[Path], ExtractResult]] = {
+    ".txt": _extract_txt_md,
+    ".md": _extract_txt_md,
+    ".docx": _extract_docx_configured,
+    ".pptx": _extract_pptx_configured,
+    ".xlsx": _extract_xlsx_capped,
+    ".pdf": _extract_pdf_configured,
+    ".htm": _extract_html,
+    ".html": _extract_html,
+    ".xhtml": _extract_html,
+}
+
+
+def load_document(path: Path, *, doc_id: str | None = None) -> Document | None:
+    """Extract `path` into a Document (None if unsupported or empty).
+
+    doc_id defaults to the resolved path; pass it when already known to skip the resolve().
+    """
     if not path.is_file():
         return None
-    if should_skip_filename(path.name):
-        return None
-
-    ext = path.suffix.lower()
-    if ext not in SUPPORTED_EXTS:
+    if not is_supported_filename(path.name):
         return None
 
     res = extract_text(path)
     if not res.ok or not res.text.strip():
         return None
 
-    return Document(doc_id=str(path.resolve()), source_path=str(path), text=res.text)
+    return Document(doc_id=doc_id or str(path.resolve()), source_path=str(path), text=res.text)
@@ -1,59 +1,91 @@
 from __future__ import annotations
 
-import json
+import os
+from collections.abc import Iterable
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
 
+from local_llm_bot.app.ingest.index_jsonl import encode_rows, iter_rows, replace_durably
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class ManifestEntry:
     """
     One line per file ingested (stored in manifest.jsonl).
 
-    We use (path, mtime, size) to detect changes.
+    We use (path, mtime, size) to detect changes. mtime_ns (st_mtime_ns) is the exact
+    modification time; entries written before it existed carry only whole-second mtime
+    (mtime_ns=None) and are compared at that precision. alias_of names the file whose
+    identical content (same MD5) was chunked first in the same run.
     """
 
     path: str
     mtime: int
     size: int
-
-
-def _safe_stat(path: Path) -> tuple[int, int]:
-    st = path.stat()
-    # Use integer seconds to keep stable across platforms
-    mtime = int(st.st_mtime)
-    size = int(st.st_size)
-    return mtime, size
+    mtime_ns: int | None = None
+    alias_of: str | None = None
+
+    def matches(self, st: os.stat_result) -> bool:
+        """True if `st` has this entry's size and modification time (integer compares only)."""
+        if self.size != st.st_size:
+            return False
+        if self.mtime_ns is not None:
+            return self.mtime_ns == st.st_mtime_ns
+        return self.mtime == st.st_mtime_ns // 1_000_000_000
+
+
+def encode_manifest_entries(entries: Iterable[ManifestEntry]) -> bytes:
+    return encode_rows(
+        {"path": e.path, "mtime": e.mtime, "size": e.size}
+        | ({} if e.mtime_ns is None else {"mtime_ns": e.mtime_ns})
+        | ({} if e.alias_of is None else {"alias_of": e.alias_of})
+        for e in entries
+    )
+
+
+def entry_from_stat(
+    abs_path: str, st: os.stat_result, *, alias_of: str | None = None
+) -> ManifestEntry:
+    """
+    Helper: create a ManifestEntry from an already-resolved path and a stat result (e.g. a
+    cached DirEntry.stat() from discovery) — no filesystem calls.
+    """
+    # mtime stays whole seconds (integer, stable across platforms) for older readers.
+    return ManifestEntry(
+        path=abs_path,
+        mtime=st.st_mtime_ns // 1_000_000_000,
+        size=int(st.st_size),
+        mtime_ns=st.st_mtime_ns,
+        alias_of=alias_of,
+    )
 
 
 def load_manifest_map(manifest_path: Path) -> dict[str, ManifestEntry]:
     """
     Load manifest.jsonl into a dict keyed by absolute path string.
-    Newer entries overwrite older ones.
+    Newer entries overwrite older ones. One bulk read; lines parsed with orjson when installed.
     """
     out: dict[str, ManifestEntry] = {}
     if not manifest_path.exists():
         return out
 
-    with manifest_path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                obj: dict[str, Any] = json.loads(line)
-                p = str(obj.get("path", ""))
-                if not p:
-                    continue
-                out[p] = ManifestEntry(
-                    path=p,
-                    mtime=int(obj.get("mtime", 0)),
-                    size=int(obj.get("size", 0)),
-                )
-            except Exception:
-                # Corrupt line: ignore, keep going
+    for obj in iter_rows(manifest_path):
+        try:
+            p = str(obj.get("path", ""))
+            if not p:
                 continue
+            mtime_ns = obj.get("mtime_ns")
+            alias_of = obj.get("alias_of")
+            out[p] = ManifestEntry(
+                path=p,
+                mtime=int(obj.get("mtime", 0)),
+                size=int(obj.get("size", 0)),
+                mtime_ns=None if mtime_ns is None else int(mtime_ns),
+                alias_of=None if alias_of is None else str(alias_of),
+            )
+        except Exception:
+            # Corrupt line: ignore, keep going
+            continue
     return out
 
 
@@ -62,18 +94,63 @@ def write_manifest_entry(manifest_path: Path, entry: ManifestEntry) -> None:
     Write a manifest entry, replacing any existing entry for the same path.
     Rewrites the manifest atomically — no duplicate entries, no append-only growth.
     """
+    write_manifest_entries(manifest_path, [entry])
+
+
+def write_manifest_entries(manifest_path: Path, entries: Iterable[ManifestEntry]) -> None:
+    """
+    Merge many entries into the manifest with one load + one atomic rewrite.
+
+    Ingest batches its per-file entries through this: rewriting the whole manifest once per
+    file is O(files²) over a run.
+    """
+    entries = list(entries)
+    if not entries:
+        return
     manifest_path.parent.mkdir(parents=True, exist_ok=True)
 
-    # Load existing entries, overwrite the one matching this path
+    # Load existing entries, overwrite the ones matching these paths
     existing = load_manifest_map(manifest_path)
-    existing[entry.path] = entry
+    for entry in entries:
+        existing[entry.path] = entry
 
     # Rewrite manifest atomically via temp file
     tmp_path = manifest_path.with_suffix(".jsonl.tmp")
-    with tmp_path.open("w", encoding="utf-8") as f:
-        for e in existing.values():
-            f.write(json.dumps({"path": e.path, "mtime": e.mtime, "size": e.size}) + "\n")
-    tmp_path.replace(manifest_path)
+    tmp_path.write_bytes(encode_manifest_entries(existing.values()))
+    replace_durably(tmp_path, manifest_path)
+
+
+def append_manifest_entries(manifest_path: Path, entries: Iterable[ManifestEntry]) -> None:
+    """
+    Append entries to the manifest with one buffered write (no load, no rewrite).
+
+    The manifest may then hold several lines for a path; load_manifest_map keeps the newest.
+    Ingest checkpoints through this and calls compact_manifest() once at the end of the run.
+    """
+    data = encode_manifest_entries(entries)
+    if not data:
+        return
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    with manifest_path.open("ab") as f:
+        f.write(data)
+
+
+def compact_manifest(manifest_path: Path) -> bool:
+    """
+    Rewrite the manifest to one line per path if appends left superseded lines behind.
+    Returns True when it rewrote.
+    """
+    if not manifest_path.exists():
+        return False
+    with manifest_path.open("r", encoding="utf-8") as f:
+        lines = sum(1 for line in f if line.strip())
+    existing = load_manifest_map(manifest_path)
+    if lines <= len(existing):
+        return False
+    tmp_path = manifest_path.with_suffix(".jsonl.tmp")
+    tmp_path.write_bytes(encode_manifest_entries(existing.values()))
+    replace_durably(tmp_path, manifest_path)
+    return True
 
 
 def should_skip(
@@ -81,32 +158,37 @@ def should_skip(
     source_path: Path,
     manifest_map: dict[str, ManifestEntry],
     force: bool = False,
+    abs_path: str | None = None,
+    st: os.stat_result | None = None,
 ) -> bool:
     """
     Return True if we should skip ingesting this file because it appears unchanged.
 
     - force=True => never skip
+    - abs_path / st: the resolved path and stat result when the caller already has them
+      (e.g. from a scandir DirEntry); each one passed saves a resolve() / stat() here.
     """
     if force:
         return False
 
-    abs_path = str(source_path.resolve())
-    prev = manifest_map.get(abs_path)
+    prev = manifest_map.get(abs_path or str(source_path.resolve()))
     if prev is None:
         return False
 
-    try:
-        mtime, size = _safe_stat(source_path)
-    except FileNotFoundError:
-        # If it disappeared, skip (it will be handled via stale-chunk removal elsewhere)
-        return True
+    if st is None:
+        try:
+            st = source_path.stat()
+        except FileNotFoundError:
+            # If it disappeared, skip (it will be handled via stale-chunk removal elsewhere)
+            return True
 
-    return (prev.mtime == mtime) and (prev.size == size)
+    return prev.matches(st)
 
 
-def build_entry(source_path: Path) -> ManifestEntry:
+def build_entry(
+    source_path: Path, *, abs_path: str | None = None, st: os.stat_result | None = None
+) -> ManifestEntry:
     """
-    Helper: create a ManifestEntry from a file path.
+    Helper: create a ManifestEntry from a file path (abs_path / st reused when given).
     """
-    mtime, size = _safe_stat(source_path)
-    return ManifestEntry(path=str(source_path.resolve()), mtime=mtime, size=size)
+    return entry_from_stat(abs_path or str(source_path.resolve()), st or source_path.stat())
@@ -1,3 +1,140 @@
+# Version: 1.8.79
+# Changelog: 1.8.79 — The sqlite-vec mirror switch reads CONFIG.rag.vectorstore (settings file and
+#            AISTUDIO_VECTORSTORE, lower-cased) instead of the raw environment variable, so a
+#            vectorstore selected in config also enables the mirror.
+# Changelog: 1.8.78 — Ingest no longer writes doc_chunk_map.jsonl (no per-batch docmap fsync, no
+#            end-of-run compact_docmap): nothing on the ingest or query path reads it. The file is
+#            still cleared on reset/--force, and debug_stats still reads it when present.
+# Changelog: 1.8.77 — _iter_files skips a subdirectory it cannot scandir (unreadable, removed
+#            mid-walk) and entries whose type cannot be read, as the old rglob walk did, instead
+#            of aborting discovery.
+# Changelog: 1.8.76 — Identical copies are no longer served from a cache of chunk windows: every
+#            file is windowed lazily again (no full chunk lists held across files). Copies are
+#            still counted in files_deduped and recorded with alias_of.
+# Changelog: 1.8.75 — A grouped extraction task returns each file's exception in that file's slot:
+#            one unreadable file no longer fails every small file that shared its task.
+# Changelog: 1.8.74 — After upserting a file that was already in Qdrant, its chunk ids the new
+#            version no longer produces (qdrant_store.stale_chunk_ids) are deleted from Qdrant and
+#            the sqlite-vec mirror; they used to linger and keep being retrieved.
+# Changelog: 1.8.73 — Upserts of files already in Qdrant pass skip_unchanged=True, so their
+#            unchanged chunks reuse stored vectors instead of being re-embedded.
+# Changelog: 1.8.72 — _upsert_rows builds ids/documents/metadatas in one pass over the rows and
+#            converts each file's shared payload fields (source_path, doc_id, md5, firm) once per
+#            file instead of once per chunk.
+# Changelog: 1.8.71 — _repo_root() is functools.cache'd (the root is fixed for the process).
+# Changelog: 1.8.70 — Per file, the suffix test runs once (_MARKUP_SUFFIXES) and
+#            _extract_document_metadata is called only for markup files (it returned the all-None
+#            tuple for the rest after an env lookup); the coalesced-upsert size is a running
+#            count instead of a sum over every queued file on each add.
+# Changelog: 1.8.69 — compact_docmap / compact_manifest run after an ingest only when the run
+#            appended to that log (AppendLog.bytes_written): a run that stored nothing no longer
+#            re-reads both files in full.
+# Changelog: 1.8.68 — The manifest and ingest_failures.jsonl are written through AppendLogs held
+#            open for the run (one open, 1 MiB buffer): manifest entries are appended as files
+#            finish and fsync'ed every _MANIFEST_CHECKPOINT_EVERY, failure rows as they happen
+#            (no pending lists; failures are kept even when the run aborts).
+# Changelog: 1.8.67 — Extraction receives each file's resolved path from _abs_paths (Document
+#            doc_id) instead of resolve()ing it again in the worker; discovery's cached
+#            DirEntry.stat() and _abs_paths are now the only stat/resolve per file.
+# Changelog: 1.8.66 — _abs_paths joins the resolved root with the DirEntry path's suffix as
+#            strings (os.path.join) instead of Path.relative_to() + a Path join per file.
+# Changelog: 1.8.65 — The extraction process pool receives consecutive small files (< 256 KiB) in
+#            tasks of up to 8 (_extract_documents) instead of one submit + result pickle per file;
+#            larger files stay one per task. The prefetch window still counts tasks (2 per worker).
+# Changelog: 1.8.64 — _record_stored streams each file's encoded index/docmap lines into the
+#            AppendLog buffers instead of joining a whole writer batch into one bytes object first.
+# Changelog: 1.8.63 — The [Document: …] prefix (entity, Wikidata aliases, fiscal year) and the
+#            chunk_id stems are built once per file instead of once per chunk; the chunk loop
+#            only splices in the window text and index.
+# Changelog: 1.8.62 — Files failing loaders.precheck_file (over the per-extension size cap, or a
+#            .txt/.md whose first 4 KiB look binary) are never handed to an extractor: they are
+#            counted in files_failed and written to ingest_failures.jsonl with the reason.
+# Changelog: 1.8.61 — index.jsonl and doc_chunk_map.jsonl are held open for the run as
+#            index_jsonl.AppendLog (1 MiB buffer) and fsync'ed at the end of every _RecordWriter
+#            batch (≤1024 rows / 1s), so rows of files already upserted survive a crash.
+# Changelog: 1.8.60 — Stored files' index.jsonl/docmap appends go through _RecordWriter: a single
+#            writer thread fed by a bounded queue, flushing every 1024 rows or 1s, so the loop
+#            moves on to chunking/embedding the next file instead of waiting on the writes.
+#            Extraction was already a separate stage (_ExtractPrefetcher); run order is now
+#            extract (pool) → chunk + embed (loop) → write (thread).
+# Changelog: 1.8.59 — Files whose content MD5 matches a file already chunked this run reuse its
+#            chunk windows instead of re-chunking, are counted in IngestResult.files_deduped, and
+#            get a manifest entry with alias_of = the first file's path. Each copy still gets its
+#            own chunks (chunk_id/source_path), so per-file presence and deletion are unchanged.
+# Changelog: 1.8.58 — _file_unchanged (reference only) compares via ManifestEntry.matches, i.e.
+#            st_mtime_ns when the entry has it.
+# Changelog: 1.8.57 — Resolved paths (_abs_paths) are the root resolved once joined with each
+#            file's relative path; only symlinked files are resolve()d individually (the walker
+#            never descends symlinked directories). Manifest entries are built from discovery's
+#            cached DirEntry.stat() and _abs_paths (manifest.entry_from_stat) instead of a fresh
+#            stat() + resolve() per file.
+# Changelog: 1.8.56 — With one extraction worker (AISTUDIO_INGEST_WORKERS=1 / --jobs 1) the
+#            prefetcher runs a single extraction thread instead of extracting inline, so the next
+#            files are read and parsed while the loop waits on embedding/upsert.
+# Changelog: 1.8.55 — Extraction workers run _extract_document: load_document plus the file MD5
+#            (hashed in the worker, not the loop), and — when CONFIG.ingest.extract_cache_path is
+#            set — a lookup in ingest/extract_cache.py keyed by that MD5, so a file whose bytes
+#            are unchanged (touched, copied, moved) is not re-parsed.
+# Changelog: 1.8.54 — Per-file chunking consumes chunking.iter_chunk_text (lazy windows over
+#            chunk_spans) instead of materializing chunk_text's full list first; chunk counts
+#            come from file_rows.
+# Changelog: 1.8.53 — _iter_files yields os.DirEntry and no longer stat()s every file during the
+#            walk; discovery stats (cached DirEntry.stat) only the supported files, whose sizes
+#            the progress estimate and file_stats use. Dropped the unused _total_bytes sum.
+# Changelog: 1.8.52 — ingest_corpus(workers=...) overrides the extraction pool size per run
+#            (__main__ --jobs); None keeps _EXTRACT_WORKERS (env AISTUDIO_INGEST_WORKERS).
+# Changelog: 1.8.51 — Manifest checkpoints append the queued entries (manifest.append_manifest_entries,
+#            one buffered write) instead of load + full rewrite each time, which was still
+#            O(files²/_MANIFEST_CHECKPOINT_EVERY) on large corpora. The manifest is compacted to
+#            one line per path once at the end of the run (manifest.compact_manifest).
+# Changelog: 1.8.50 — Supported-file gating uses loaders.is_supported_filename (one compiled regex
+#            for extension + ~$ lock-file rule); the loop's gate is membership in _abs_paths,
+#            which holds exactly the supported files.
+# Changelog: 1.8.49 — The already-indexed skip set (_already_indexed) is computed once before the
+#            loop from the same predicate the "N of T" denominator uses, and each file's resolved
+#            path is computed once (_abs_paths) — the loop's skip is a single set-membership test
+#            and resolve() no longer runs twice per file.
+# Changelog: 1.8.48 — A coalesced upsert's files are recorded with one index.jsonl write and one
+#            doc_chunk_map.jsonl write for the whole pool (after any tombstones), not one
+#            open + write per file.
+# Changelog: 1.8.47 — A file's chunk rows carry only chunk_id/text/page; the fields every chunk of
+#            the file shares (doc_id, source_path, md5, firm) live once in doc_fields. index.jsonl
+#            lines are written with index_jsonl.append_doc_rows, which serializes doc_fields once
+#            per file and splices it into every line (same row content, per-chunk keys first).
+# Changelog: 1.8.46 — Each stored file appends its doc_id → chunk_ids entry to
+#            doc_chunk_map.jsonl (index_jsonl.append_docmap_entry; last entry per doc wins)
+#            rather than rewriting a monolithic JSON map; the log is compacted at the end of the
+#            run once it holds more than 2 lines per live doc, and cleared on reset/--force.
+# Changelog: 1.8.45 — Small files (fewer than _UPSERT_COALESCE_CHUNKS chunks, default 4 × the
+#            32-chunk embed batch; env AISTUDIO_INGEST_COALESCE_CHUNKS, 0 = off) no longer get an
+#            upsert each: their chunks are pooled and upserted together once the pool is full and
+#            at the end of the run, so Ollama sees full embed batches. A pooled file's index rows
+#            and manifest entry are written only after the shared upsert succeeds; if it fails,
+#            every file in the pool is recorded in ingest_failures.jsonl.
+# Changelog: 1.8.44 — Discovery walks the tree with os.scandir (type from the directory listing,
+#            one cached DirEntry.stat() per file) instead of Path.rglob + is_file(); the sizes it
+#            returns feed the byte totals and per-file size fields, replacing the later
+#            is_file()/stat() calls on every file.
+# Changelog: 1.8.43 — Text extraction (load_document: PDF/DOCX/XLSX/HTML parsing, CPU-bound and
+#            single-threaded) runs in a ProcessPoolExecutor over the to-process files, at most
+#            2 × workers ahead of the loop (bounded RAM). The loop still consumes documents in
+#            discovery order and stays the single writer for index/manifest/Qdrant. Workers =
+#            AISTUDIO_INGEST_WORKERS (default os.cpu_count()); 1 = serial, as before. A crashed
+#            worker (BrokenProcessPool) drops the pool and the run continues serially.
+# Changelog: 1.8.42 — Re-ingesting an already-indexed file (--files) tombstones its previous
+#            index.jsonl rows (index_jsonl.mark_doc_deleted, O(1) append to a side-car) instead
+#            of leaving duplicate rows behind; the index is compacted once at the end of the
+#            run, and only when tombstoned rows exceed _INDEX_COMPACT_DEAD_RATIO of the file.
+# Changelog: 1.8.41 — manifest.jsonl is no longer rewritten after every file (load + full atomic
+#            rewrite per file = O(files²) per run). Entries are queued and merged with one
+#            write_manifest_entries() call every _MANIFEST_CHECKPOINT_EVERY files and once in the
+#            loop's finally (so Ctrl-C / errors still persist what was ingested).
+# Changelog: 1.8.40 — ingest_failures.jsonl is written through index_jsonl.append_rows, the same
+#            single-write encoder as index.jsonl (orjson when installed, stdlib json otherwise).
+# Changelog: 1.8.39 — sqlite-vec dual-write. When AISTUDIO_VECTORSTORE=sqlite_vec and the
+#            extension loads, every Qdrant upsert batch is mirrored into the corpus's
+#            vectors.sqlite through qdrant_store's on_embedded hook (same embeddings, no second
+#            Ollama pass); --force drops the mirror along with the collection.
 # Version: 1.8.38
 # Changelog: 1.8.38 — A9 + A10 (ingest enumeration). A9: the "N of T" progress denominator
 #            counted all supported files, including already-indexed ones that get skipped inside
@@ -230,33 +367,56 @@ from __future__ import annotations
 
 import contextlib
 import hashlib
-import json
 import os as _os
+import queue
 import re as _re
+import sqlite3
 import sys as _sys
 import threading
 import time
-from collections.abc import Iterable
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
 from typing import Any
 
 from bs4 import BeautifulSoup
 
-from local_llm_bot.app.config import CONFIG
-from local_llm_bot.app.ingest.chunking import chunk_text
-from local_llm_bot.app.ingest.index_jsonl import append_rows
-from local_llm_bot.app.ingest.loaders import SUPPORTED_EXTS, load_document
+from local_llm_bot.app.config import CONFIG, VectorstoreConfig
+from local_llm_bot.app.ingest.chunking import iter_chunk_text
+from local_llm_bot.app.ingest.extract_cache import get_extract_cache
+from local_llm_bot.app.ingest.index_jsonl import (
+    AppendLog,
+    compact_index,
+    encode_doc_rows,
+    encode_rows,
+    mark_doc_deleted,
+    tombstones_path,
+)
+from local_llm_bot.app.ingest.loaders import (
+    Document,
+    is_supported_filename,
+    load_document,
+    precheck_file,
+)
 from local_llm_bot.app.ingest.manifest import (
-    build_entry,
-    write_manifest_entry,
+    compact_manifest,
+    encode_manifest_entries,
+    entry_from_stat,
 )
 from local_llm_bot.app.utils.corpus_paths import corpus_paths
 from local_llm_bot.app.utils.repo_root import find_repo_root
 
 # Qdrant is the only supported vectorstore.
 # Chroma support has been removed — see chroma eradication ticket.
-from local_llm_bot.app.vectorstore import qdrant_store as _store
+from local_llm_bot.app.vectorstore import qdrant_store as _store, sqlite_vec_store as _vec_mirror
+
+# sqlite-vec is a read-side backend (rag_core) fed from the Qdrant ingest: mirror only when it is
+# the selected vectorstore and the extension actually loads in this interpreter.
+_VEC_MIRROR_ON = CONFIG.rag.vectorstore == "sqlite_vec" and _vec_mirror.available()
 
 try:
     import yaml as _yaml
@@ -265,6 +425,243 @@ except ImportError:
     _YAML_AVAILABLE = False
 
 
+# Suffixes whose document head the entity/fiscal-year normalizer reads.
+_MARKUP_SUFFIXES = frozenset({".htm", ".html", ".xhtml"})
+
+# ingest_corpus flushes queued manifest entries every N processed files (and at the end).
+_MANIFEST_CHECKPOINT_EVERY = 200
+
+# End-of-run index.jsonl compaction threshold: rewrite only when tombstoned rows exceed this share.
+_INDEX_COMPACT_DEAD_RATIO = 0.3
+
+# Files with fewer chunks than this are not upserted on their own: their chunks are coalesced
+# with other small files' into one store upsert (full embed batches, fewer Ollama/Qdrant round
+# trips) once this many are pending, and at the end of the run. 0 = per-file upserts.
+_UPSERT_COALESCE_CHUNKS = int(
+    _os.getenv("AISTUDIO_INGEST_COALESCE_CHUNKS", str(4 * VectorstoreConfig.embed_batch_size))
+)
+
+# Extraction tasks batch up to this many consecutive files smaller than _EXTRACT_SMALL_FILE_BYTES
+# (process pool only); larger files are always a task of their own.
+_EXTRACT_TASK_FILES = 8
+_EXTRACT_SMALL_FILE_BYTES = 256 << 10
+
+# Extraction worker processes (0/unset = one per core; 1 = no process pool — a single thread
+# extracts the next files while the loop embeds the current one).
+_EXTRACT_WORKERS = int(_os.getenv("AISTUDIO_INGEST_WORKERS", "0")) or (_os.cpu_count() or 1)
+
+
+def _extract_document(
+    path: Path, cache_path: str | None = None, doc_id: str | None = None
+) -> tuple[Document | None, str]:
+    """
+    load_document(path) plus the file's MD5 (stored in every chunk payload).
+
+    With an extraction cache configured, text extracted earlier from the same bytes is reused
+    instead of re-parsing the file. doc_id is the already-resolved path when the caller has it.
+    Module-level so extraction workers can run it.
+    """
+    cache = get_extract_cache(cache_path)
+    if cache is None:
+        doc = load_document(path, doc_id=doc_id)
+        return doc, (_md5_of_file(path) if doc is not None else "")
+    md5 = _md5_of_file(path)
+    text = cache.get(md5)
+    if text is not None:
+        return Document(doc_id=doc_id or str(path.resolve()), source_path=str(path), text=text), md5
+    doc = load_document(path, doc_id=doc_id)
+    if doc is not None and doc.text.strip():
+        with contextlib.suppress(sqlite3.Error):
+            cache.put(md5, doc.text)
+    return doc, md5
+
+
+def _extract_documents(
+    items: list[tuple[Path, str | None]], cache_path: str | None = None
+) -> list[tuple[Document | None, str] | Exception]:
+    """
+    _extract_document() for several (path, doc_id) pairs in one worker task (one pickle round
+    trip). A file that raises gets its exception in its own slot, so it fails alone rather
+    than taking the rest of its group with it.
+    """
+    out: list[tuple[Document | None, str] | Exception] = []
+    for p, doc_id in items:
+        try:
+            out.append(_extract_document(p, cache_path, doc_id))
+        except Exception as e:
+            out.append(e)
+    return out
+
+
+class _ExtractPrefetcher:
+    """Runs _extract_document() for upcoming files in worker processes, a bounded window ahead.
+
+    The ingest loop asks for documents in discovery order via load(); only extraction (and the
+    file hash) runs in the pool — chunking and embedding stay in the calling thread (index
+    writes go to _RecordWriter). Files never submitted (or any file once the pool has broken)
+    are loaded inline. Consecutive small files (by `sizes`) are sent to a worker process as one
+    task, so a corpus of many tiny files does not pay a submit + result pickle per file.
+    With workers=1 the pool is one thread: file reads and parsing then overlap the loop's
+    embedding calls, which wait on Ollama with the GIL released.
+    """
+
+    def __init__(
+        self,
+        files: list[Path],
+        workers: int,
+        cache_path: str | None = None,
+        sizes: dict[Path, int] | None = None,
+        doc_ids: dict[Path, str] | None = None,
+    ) -> None:
+        self._queue: deque[Path] = deque(files)
+        self._futures: dict[Path, tuple[Future, int]] = {}
+        self._tasks: dict[Future, int] = {}  # in-flight task -> its files not yet loaded
+        self._window = 2 * workers
+        self._cache_path = cache_path
+        self._sizes = sizes or {}
+        self._doc_ids = doc_ids or {}
+        self._group = 1
+        self._pool: Executor | None = None
+        if len(files) > 1:
+            if workers > 1:
+                self._pool = ProcessPoolExecutor(max_workers=workers)
+                self._group = _EXTRACT_TASK_FILES
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-extract")
+        self._fill()
+
+    def _is_small(self, path: Path) -> bool:
+        return self._sizes.get(path, _EXTRACT_SMALL_FILE_BYTES) < _EXTRACT_SMALL_FILE_BYTES
+
+    def _fill(self) -> None:
+        while self._pool is not None and self._queue and len(self._tasks) < self._window:
+            group = [self._queue.popleft()]
+            while (
+                len(group) < self._group
+                and self._queue
+                and self._is_small(group[-1])
+                and self._is_small(self._queue[0])
+            ):
+                group.append(self._queue.popleft())
+            fut = self._pool.submit(
+                _extract_documents, [(p, self._doc_ids.get(p)) for p in group], self._cache_path
+            )
+            self._tasks[fut] = len(group)
+            for i, path in enumerate(group):
+                self._futures[path] = (fut, i)
+
+    def load(self, path: Path) -> tuple[Document | None, str]:
+        entry = self._futures.pop(path, None)
+        if entry is None:
+            with contextlib.suppress(ValueError):
+                self._queue.remove(path)
+            self._fill()
+            return _extract_document(path, self._cache_path, self._doc_ids.get(path))
+        fut, i = entry
+        self._tasks[fut] -= 1
+        if not self._tasks[fut]:
+            del self._tasks[fut]
+        try:
+            result = fut.result()[i]
+        except BrokenProcessPool:
+            self.close()
+            return _extract_document(path, self._cache_path, self._doc_ids.get(path))
+        finally:
+            self._fill()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._futures.clear()
+        self._tasks.clear()
+
+
+class _RecordWriter:
+    """Appends stored files' index.jsonl rows from one background thread.
+
+    The ingest loop hands each stored file over with put() and moves on to the next file; a
+    bounded queue blocks it only when the writer is `maxsize` files behind. The thread batches
+    what has queued into one write call once `flush_rows` rows are pending or `flush_secs` have
+    passed since the oldest. close() drains the queue and re-raises the first write error.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        write: Callable[[list[tuple[str, dict[str, Any], list[dict[str, Any]]]]], None],
+        *,
+        maxsize: int = 64,
+        flush_rows: int = 1024,
+        flush_secs: float = 1.0,
+    ) -> None:
+        self._write = write
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._flush_rows = flush_rows
+        self._flush_secs = flush_secs
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, name="ingest-records", daemon=True)
+        self._thread.start()
+
+    def put(self, abs_path: str, doc_fields: dict[str, Any], rows: list[dict[str, Any]]) -> None:
+        self._queue.put((abs_path, doc_fields, rows))
+
+    def _flush(self, pending: list) -> None:
+        if pending and self._error is None:
+            try:
+                self._write(pending)
+            except BaseException as e:  # noqa: BLE001 — surfaced by close()
+                self._error = e
+        pending.clear()
+
+    def _run(self) -> None:
+        pending: list[tuple[str, dict[str, Any], list[dict[str, Any]]]] = []
+        n_rows = 0
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if pending else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is self._STOP:
+                self._flush(pending)
+                return
+            if item is not None:
+                if not pending:
+                    deadline = time.monotonic() + self._flush_secs
+                pending.append(item)
+                n_rows += len(item[2])
+            if n_rows >= self._flush_rows or (pending and time.monotonic() >= deadline):
+                self._flush(pending)
+                n_rows = 0
+
+    def close(self) -> None:
+        self._queue.put(self._STOP)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+
+def _mirror_batch(collection_name: str):
+    """on_embedded callback writing a Qdrant upsert batch into the sqlite-vec mirror."""
+
+    def _write(ids, documents, metadatas, embeddings) -> None:
+        _vec_mirror.upsert_embeddings(
+            collection_name=collection_name,
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            embeddings=embeddings,
+        )
+
+    return _write
+
+
 def _load_ks_alias_map(repo: Path, corpus: str) -> dict[str, list[str]]:
     """
     Load GLEIF entity Wikidata fields for a corpus and return a dict mapping
@@ -350,24 +747,46 @@ class IngestResult:
     normalizer_hits: int = 0       # files where entity+year was extracted
     normalizer_misses: int = 0     # HTML/XHTML files where normalizer found nothing
     normalizer_mismatches: int = 0 # files where entity didn't match filename stem
+    files_deduped: int = 0         # files whose content (MD5) matched a file chunked earlier
 
 
+@cache
 def _repo_root() -> Path:
     return find_repo_root(Path(__file__))
 
 
-def _iter_files(root: Path) -> Iterable[Path]:
+def _iter_files(root: Path) -> Iterator[_os.DirEntry]:
     """
-    Yield all files under root, excluding the trash/ directory.
+    Yield a DirEntry for every file under root, excluding the trash/ directory.
 
     trash/ is now a sibling of uploads/ at the corpus level, so this guard
     is belt-and-suspenders — uploads/ should never contain a trash/ subdir.
     Kept explicitly to prevent any legacy or accidental trash/ inside uploads/
     from being ingested.
+
+    Walks with os.scandir: file/dir type comes from the directory listing, and nothing is
+    stat()ed here — callers stat only the entries they keep (DirEntry.stat() caches).
+    Like Path.rglob, symlinked directories are not descended; symlinked files are included, and
+    a directory or entry that cannot be read (permissions, removed mid-walk) is skipped.
     """
-    for p in root.rglob("*"):
-        if p.is_file() and "trash" not in p.parts:
-            yield p
+    stack = [str(root)]
+    while stack:
+        try:
+            it = _os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name != "trash":
+                            stack.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                yield entry
 
 
 def _load_qdrant_source_paths(collection_name: str) -> set[str]:
@@ -432,8 +851,7 @@ def _file_unchanged(source_path: Path, manifest_map: dict) -> bool:
     if prev is None:
         return False
     try:
-        st = source_path.stat()
-        return (prev.mtime == int(st.st_mtime)) and (prev.size == int(st.st_size))
+        return prev.matches(source_path.stat())
     except FileNotFoundError:
         return False
 
@@ -847,6 +1265,8 @@ def ingest_corpus(
     # (re-)embedded regardless of whether Qdrant already has them. None => whole
     # corpus, today's behavior. (AIStudio: per-file selective ingest.)
     only_files: set[str] | None = None,
+    # Extraction worker processes (None => _EXTRACT_WORKERS; 1 => one extraction thread, no process pool)
+    workers: int | None = None,
     # progress bar class (tqdm) passed from __main__
     tqdm_cls: Any | None = None,
 ) -> IngestResult:
@@ -885,17 +1305,23 @@ def ingest_corpus(
 
     # Reset handling
     if reset_index:
-        for k in ("index", "manifest", "failures"):
+        for k in ("index", "manifest", "failures", "docmap"):
             if paths[k].exists():
                 paths[k].unlink()
+        tombstones_path(paths["index"]).unlink(missing_ok=True)
 
     # --force: atomic wipe of Qdrant collection + manifest + index
     if force:
-        for k in ("index", "manifest", "failures"):
+        for k in ("index", "manifest", "failures", "docmap"):
             if paths[k].exists():
                 paths[k].write_text("", encoding="utf-8")  # truncate, don't delete
+        # Tombstone offsets refer to the truncated index — they would hide the fresh rows.
+        tombstones_path(paths["index"]).unlink(missing_ok=True)
         with contextlib.suppress(Exception):
             _store.delete_collection(collection_name=collection_name)
+        if _VEC_MIRROR_ON:
+            with contextlib.suppress(Exception):
+                _vec_mirror.delete_collection(collection_name=collection_name)
 
     # Pre-load Qdrant source paths — single scroll, O(n chunks), done once per run.
     # This is the skip-decision source of truth. Empty on first ingest or after --force.
@@ -906,9 +1332,15 @@ def ingest_corpus(
     files_processed = 0
     files_skipped_unchanged = 0
     files_failed = 0
+    files_deduped = 0
 
     chunks_written = 0
-    failures: list[dict[str, Any]] = []
+    # Failure rows go straight into one buffered append handle (opened on the first failure).
+    _failure_log = AppendLog(paths["failures"])
+
+    def _record_failure(row: dict[str, Any]) -> None:
+        _failure_log.write(encode_rows([row]))
+
     file_stats: dict[str, dict] = {}
     # Normalizer counters — accumulated across all HTML/XHTML files
     _normalizer_hits = 0
@@ -918,6 +1350,16 @@ def ingest_corpus(
 
     _PAGE_RE = _re.compile(r"^\[PAGE_(\d+)\]\s*", _re.MULTILINE)
 
+    def _iter_windows(text: str, size: int, ovl: int) -> Iterator[tuple[int | None, str]]:
+        # (page, text without [PAGE_n] markers) per chunk window; the page carries forward.
+        last_page: int | None = None
+        # Windows are sliced one at a time as the loop consumes them (chunking.chunk_spans).
+        for c in iter_chunk_text(text, chunk_size=size, overlap=ovl):
+            page_match = _PAGE_RE.search(c)
+            if page_match:
+                last_page = int(page_match.group(1))
+            yield last_page, _PAGE_RE.sub("", c).strip()
+
     # -----------------------
     # Phase 1: Discover
     # -----------------------
@@ -926,11 +1368,14 @@ def ingest_corpus(
     # bytes_processed accumulates in the correct order for the progress bar.
 
     discovered: list[Path] = []
+    _entries: dict[Path, _os.DirEntry] = {}  # scandir entries — stat() later, supported files only
     p_discover = None  # Discover is instant — no progress bar needed
 
     try:
-        for p in sorted(_iter_files(root), key=lambda x: x.name.lower()):  # A10: case-insensitive (was ASCII: 'CME' sorted before 'Cboe')
+        for entry in sorted(_iter_files(root), key=lambda e: e.name.lower()):  # A10: case-insensitive (was ASCII: 'CME' sorted before 'Cboe')
+            p = Path(entry.path)
             discovered.append(p)
+            _entries[p] = entry
             files_discovered += 1
             if max_files is not None and files_discovered >= int(max_files):
                 break
@@ -958,9 +1403,6 @@ def ingest_corpus(
     # corpus size. Qdrant gets live chunk counts as each file completes,
     # enabling accurate progress reporting.
 
-    # Pre-compute total bytes for byte-based progress estimation (same algo as UI).
-    _total_bytes = sum(f.stat().st_size for f in discovered if f.is_file())
-
     # AIStudio_722b — pre-compute supported file count BEFORE the loop so N-of-T
     # denominator is fixed. Without this, files_supported increments during the loop
     # producing "1 of 1", "2 of 2" etc. in completion lines.
@@ -971,19 +1413,37 @@ def ingest_corpus(
     # 10 of 12", skipping the 2 already-done) and a correct run look like it dropped files.
     # We mirror the loop's exact skip predicate here so "N of T" counts only the to-process set.
     def _is_supported(f: Path) -> bool:
-        return f.suffix.lower() in SUPPORTED_EXTS and not f.name.startswith("~$")
-
-    def _will_skip(f: Path) -> bool:
-        # matches the in-loop skip: not force, no explicit allowlist, already in Qdrant
-        return (
-            not force
-            and only_files is None
-            and str(f.resolve()) in qdrant_source_paths
-        )
+        return is_supported_filename(f.name)
 
     _supported_files = [f for f in discovered if _is_supported(f)]
-    _to_process = [f for f in _supported_files if not _will_skip(f)]
+    # Sizes for the files ingest can load; unsupported files are never stat()ed.
+    _file_sizes = {f: _entries[f].stat().st_size for f in _supported_files}
+    # Resolved path per file, computed once for the whole run; the loop reuses these keys.
+    # The walker never descends symlinked directories, so only the root and a symlinked file
+    # itself need resolving: everything else is the resolved root joined with its relative path.
+    # Plain string slicing on the DirEntry path (which starts with str(root)): ~25x cheaper per
+    # file than Path.relative_to() plus a Path join.
+    _root_abs = str(root.resolve())
+    _root_len = len(str(root))
+    _abs_paths = {
+        f: str(f.resolve())
+        if _entries[f].is_symlink()
+        else _os.path.join(_root_abs, _entries[f].path[_root_len:].lstrip(_os.sep))
+        for f in _supported_files
+    }
+    # Files already in Qdrant — the loop skips them with one set-membership test. Skipped only
+    # when not force and no explicit allowlist (the user chose those files on purpose).
+    _already_indexed = (
+        frozenset(f for f in _supported_files if _abs_paths[f] in qdrant_source_paths)
+        if not force and only_files is None
+        else frozenset()
+    )
+    _to_process = [f for f in _supported_files if f not in _already_indexed]
     _total_supported = len(_to_process)          # A9: denominator = actual to-process count
+    # Oversized / binary-looking files: never handed to an extractor, reported as failures.
+    _rejected = {
+        f: reason for f in _to_process if (reason := precheck_file(f, _file_sizes[f]))
+    }
     _n_skip_preexisting = len(_supported_files) - _total_supported
 
     # A9 — announce the process-set upfront so a skipped-file gap is expected, not alarming.
@@ -1003,7 +1463,7 @@ def ingest_corpus(
     _D_SEED_BAR = 40.0 / (1024 * 1024)
     # A9 — bytes from the to-process set (skipped/already-indexed files produce 0 chunks,
     # so counting their bytes here would make the bar under-fill). Reuses _to_process.
-    _supported_bytes = sum(f.stat().st_size for f in _to_process if f.is_file())
+    _supported_bytes = sum(_file_sizes[f] for f in _to_process)
     _est_total_chunks_bar = max(1, int(_D_SEED_BAR * _supported_bytes))
     _n_width = len(str(_total_supported))  # digit width for right-justify in label
 
@@ -1045,10 +1505,127 @@ def ingest_corpus(
     else:
         p_process = None
 
+    # Manifest entries are appended through one buffered handle held for the run and fsync'ed
+    # every _MANIFEST_CHECKPOINT_EVERY entries (and at the end); compacted once afterwards.
+    _manifest_log = AppendLog(paths["manifest"])
+    _manifest_unsynced = 0
+    # Content dedup: first abs_path chunked per MD5, the recent MD5s' windows, copies' canonicals.
+    _canonical_by_md5: dict[str, str] = {}
+    _aliases: dict[Path, str] = {}
+
+    def _queue_manifest(path: Path) -> None:
+        nonlocal _manifest_unsynced
+        # Discovery's cached stat and resolved path: no syscalls per manifest entry.
+        entry = entry_from_stat(_abs_paths[path], _entries[path].stat(), alias_of=_aliases.get(path))
+        _manifest_log.write(encode_manifest_entries([entry]))
+        _manifest_unsynced += 1
+        if _manifest_unsynced >= _MANIFEST_CHECKPOINT_EVERY:
+            _manifest_log.sync_point()
+            _manifest_unsynced = 0
+
+    # A file's chunks are kept as (doc_fields, rows): doc_fields holds what every chunk of the
+    # file shares (doc_id, source_path, md5, firm); rows hold only chunk_id / text / page.
+    def _upsert_rows(docs: list[tuple[dict[str, Any], list[dict[str, Any]]]]) -> None:
+        # One pass over the rows; the file-level payload strings are built once per file.
+        ids: list[str] = []
+        documents: list[str] = []
+        metadatas: list[dict[str, Any]] = []
+        for d, rows in docs:
+            source_path, doc_id = str(d["source_path"]), str(d["doc_id"])
+            md5, firm = str(d["md5"]), str(d["firm"])
+            for r in rows:
+                ids.append(str(r["chunk_id"]))
+                documents.append(str(r["text"]))
+                metadatas.append(
+                    {
+                        "source_path": source_path,
+                        "doc_id": doc_id,
+                        "page": r["page"],
+                        "md5": md5,
+                        "firm": firm,
+                    }
+                )
+        _store.upsert_chunks(
+            persist_dir=Path("."),
+            collection_name=collection_name,
+            embed_model=embed_model_eff,
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            on_embedded=_mirror_batch(collection_name) if _VEC_MIRROR_ON else None,
+            # Re-ingested files: unchanged chunks keep their stored vectors (no re-embedding).
+            skip_unchanged=any(d["source_path"] in qdrant_source_paths for d, _ in docs),
+        )
+        # Upsert-by-id already replaced a re-ingested file's surviving chunk ids; delete only the
+        # ids its new version no longer has (none when the id set is unchanged).
+        for d, rows in docs:
+            if d["source_path"] not in qdrant_source_paths:
+                continue
+            stale = _store.stale_chunk_ids(
+                collection_name=collection_name,
+                source_path=d["source_path"],
+                keep={str(r["chunk_id"]) for r in rows},
+            )
+            if stale:
+                _store.delete_chunks(persist_dir=Path("."), collection_name=collection_name, ids=stale)
+                if _VEC_MIRROR_ON:
+                    _vec_mirror.delete_chunks(collection_name=collection_name, ids=stale)
+
+    def _record_stored(docs: list[tuple[str, dict[str, Any], list[dict[str, Any]]]]) -> None:
+        # Persist JSONL audit log for files whose chunks are in the store — one index write
+        # however many files. A re-ingest supersedes a file's earlier rows:
+        # tombstone them (no rewrite) before appending.
+        # Each batch ends at a sync point: rows of files already in the store survive a crash,
+        # and mark_doc_deleted sees the index's true size.
+        for abs_path, _, _ in docs:
+            if abs_path in qdrant_source_paths:
+                mark_doc_deleted(paths["index"], abs_path)
+        # One file's encoded rows at a time into the log's buffer (no batch-sized join).
+        for _, d, rows in docs:
+            _index_log.write(encode_doc_rows(d, rows))
+        _index_log.sync_point()
+
+    # Small files waiting for a shared upsert: (file, abs path, doc_fields, rows). Their index
+    # rows and manifest entries are written only after the upsert, as for directly-upserted files.
+    _coalesced: list[tuple[Path, str, dict[str, Any], list[dict[str, Any]]]] = []
+    _coalesced_rows = 0  # chunks currently held in _coalesced
+
+    def _flush_coalesced() -> None:
+        nonlocal files_processed, files_failed, chunks_written, _coalesced_rows
+        if not _coalesced:
+            return
+        batch = list(_coalesced)
+        _coalesced.clear()
+        _coalesced_rows = 0
+        try:
+            _upsert_rows([(d, rows) for _, _, d, rows in batch])
+        except Exception as e:
+            for f, _, _, rows in batch:
+                files_processed -= 1
+                files_failed += 1
+                chunks_written -= len(rows)
+                _record_failure(
+                    {"source_path": str(f), "reason": type(e).__name__, "detail": str(e)}
+                )
+            return
+        for f, abs_path, d, rows in batch:
+            _records.put(abs_path, d, rows)
+            _queue_manifest(f)
+
+    _prefetch = _ExtractPrefetcher(
+        [f for f in _to_process if f not in _rejected],
+        workers or _EXTRACT_WORKERS,
+        CONFIG.ingest.extract_cache_path,
+        _file_sizes,
+        _abs_paths,
+    )
+    # Index appends run on a writer thread, batched, while the loop chunks and embeds.
+    _index_log = AppendLog(paths["index"])
+    _records = _RecordWriter(_record_stored)
+
     try:
         for file_path in discovered:
-            ext = file_path.suffix.lower()
-            if ext not in SUPPORTED_EXTS or file_path.name.startswith("~$"):
+            if file_path not in _abs_paths:  # keyed by exactly the _is_supported files
                 # Unsupported file — skip silently. Do NOT update the bar:
                 # _total_supported excludes these files, so updating here would
                 # push the bar past 100% and produce a spurious 10/None final tick.
@@ -1057,17 +1634,30 @@ def ingest_corpus(
             files_supported += 1
 
             try:
-                abs_path = str(file_path.resolve())
+                abs_path = _abs_paths[file_path]
 
                 # Skip decision: Qdrant already has this file — no re-ingest needed.
                 # _file_unchanged() removed: manifest.jsonl stale after corpus recreation. (AIStudio_186)
                 # Exception: when an explicit allowlist (only_files) is active, the user
                 # chose these files on purpose — always (re-)embed them, never skip.
-                if not force and only_files is None and abs_path in qdrant_source_paths:
+                # (_already_indexed is precomputed with exactly that predicate.)
+                if file_path in _already_indexed:
                     files_skipped_unchanged += 1
                     if p_process is not None:
                         p_process.update(1)
                     continue
+                if file_path in _rejected:
+                    files_failed += 1
+                    _record_failure(
+                        {
+                            "source_path": str(file_path),
+                            "reason": _rejected[file_path],
+                            "detail": f"{_file_sizes[file_path]} bytes",
+                        }
+                    )
+                    if p_process is not None:
+                        p_process.update(1)
+                    continue
 
                 t_file_start = time.time()
                 # AIStudio_722a — STD §8 Phase 1 activity line: gerund header + N of T +
@@ -1082,16 +1672,14 @@ def ingest_corpus(
                         "{percentage:.0f}%|{bar:20}| elapsed: -- · remaining: -- · avg: --"
                     )
                     p_process.refresh()
-                doc = load_document(file_path)
+                doc, file_md5 = _prefetch.load(file_path)
                 if not doc or not doc.text.strip():
-                    write_manifest_entry(paths["manifest"], build_entry(file_path))
+                    _queue_manifest(file_path)
                     files_processed += 1
                     if p_process is not None:
                         p_process.update(1)
                     continue
 
-                chunks = chunk_text(doc.text, chunk_size=chunk_size_eff, overlap=overlap_eff)
-
                 # AIStudio_640 + AIStudio_674 — Document-Head + Temporal normalizers.
                 # Extract entity (AIStudio_640) and fiscal year (AIStudio_674) from
                 # the document head. When both are found, prefix is
@@ -1099,73 +1687,77 @@ def ingest_corpus(
                 # both identity and time in vector space. When only entity is found,
                 # prefix is "[Document: <entity>]". Neither found = no-op.
                 # AIStudio_682 — single parse via merged _extract_document_metadata()
+                # Only markup files carry a document head; for the rest it would return the
+                # all-None tuple after an env lookup, so it is not called.
+                _is_markup = file_path.suffix.lower() in _MARKUP_SUFFIXES
                 doc_entity, doc_year, doc_fmt, doc_strategy, doc_mismatch, doc_tag, doc_year_tag = (
                     _extract_document_metadata(file_path)
+                    if _is_markup
+                    else (None, None, None, None, False, None, None)
                 )
 
-                # Compute MD5 once per file — stored in every chunk payload
-                file_md5 = _md5_of_file(file_path)
-
-                # Build rows for this file only
+                # Build rows for this file only; the per-file fields are stored once.
+                doc_fields: dict[str, Any] = {
+                    "doc_id": abs_path,
+                    "source_path": abs_path,
+                    "md5": file_md5,
+                    "firm": doc_entity or "",
+                }
                 file_rows: list[dict[str, Any]] = []
-                last_page: int | None = None
-                for i, c in enumerate(chunks):
-                    page_match = _PAGE_RE.search(c)
-                    if page_match:
-                        last_page = int(page_match.group(1))
-                    page_num = last_page
-                    clean_text = _PAGE_RE.sub("", c).strip()
-
-                    # Apply normalizer prefix if entity was extracted.
-                    # AIStudio_801: if knowledge sources exist for this corpus,
-                    # enrich prefix with Wikidata natural query forms (scope_name,
-                    # label, short_name, tickers). These are embedded into every
-                    # chunk from this entity — improving both BM25 and vector recall
-                    # for user queries that use the natural name rather than the
-                    # full GLEIF legal name.
-                    # Format (entity + aliases + year): "[Document: THE GOLDMAN SACHS GROUP, INC. | Goldman Sachs | GS FY2025] <chunk>"
-                    # Format (entity + year, no aliases): "[Document: JPMorgan Chase & Co. FY2025] <chunk>"
-                    # Format (entity only):               "[Document: JPMorgan Chase & Co.] <chunk>"
-                    _ks_aliases = _ks_alias_map.get(doc_entity, []) if doc_entity else []
-                    _alias_suffix = (" | " + " | ".join(_ks_aliases)) if _ks_aliases else ""
-                    if doc_entity and doc_year:
-                        clean_text = f"[Document: {doc_entity}{_alias_suffix} FY{doc_year}] {clean_text}"
-                    elif doc_entity:
-                        clean_text = f"[Document: {doc_entity}{_alias_suffix}] {clean_text}"
-
+                # Identical bytes already seen this run: record the copy as an alias of that
+                # file. Each copy keeps its own chunk_ids.
+                _canonical = _canonical_by_md5.get(file_md5)
+                if _canonical is None:
+                    _canonical_by_md5[file_md5] = abs_path
+                else:
+                    files_deduped += 1
+                    _aliases[file_path] = _canonical
+                # Apply normalizer prefix if entity was extracted.
+                # AIStudio_801: if knowledge sources exist for this corpus,
+                # enrich prefix with Wikidata natural query forms (scope_name,
+                # label, short_name, tickers). These are embedded into every
+                # chunk from this entity — improving both BM25 and vector recall
+                # for user queries that use the natural name rather than the
+                # full GLEIF legal name.
+                # Format (entity + aliases + year): "[Document: THE GOLDMAN SACHS GROUP, INC. | Goldman Sachs | GS FY2025] <chunk>"
+                # Format (entity + year, no aliases): "[Document: JPMorgan Chase & Co. FY2025] <chunk>"
+                # Format (entity only):               "[Document: JPMorgan Chase & Co.] <chunk>"
+                # The prefix and the chunk_id stems are per-file constants, built once here;
+                # per chunk only the window text and index are spliced in.
+                _ks_aliases = _ks_alias_map.get(doc_entity, []) if doc_entity else []
+                _alias_suffix = (" | " + " | ".join(_ks_aliases)) if _ks_aliases else ""
+                _doc_prefix = ""
+                if doc_entity and doc_year:
+                    _doc_prefix = f"[Document: {doc_entity}{_alias_suffix} FY{doc_year}] "
+                elif doc_entity:
+                    _doc_prefix = f"[Document: {doc_entity}{_alias_suffix}] "
+                _page_stem = f"{abs_path}::page-"
+                _chunk_stem = f"{abs_path}::chunk-"
+
+                for i, (page_num, clean_text) in enumerate(
+                    _iter_windows(doc.text, chunk_size_eff, overlap_eff)
+                ):
                     chunk_id = (
-                        f"{abs_path}::page-{page_num}::chunk-{i}"
+                        f"{_page_stem}{page_num}::chunk-{i}"
                         if page_num is not None
-                        else f"{abs_path}::chunk-{i}"
+                        else f"{_chunk_stem}{i}"
                     )
                     file_rows.append(
-                        {
-                            "chunk_id": chunk_id,
-                            "doc_id": abs_path,
-                            "source_path": abs_path,
-                            "text": clean_text,
-                            "page": page_num,
-                            "md5": file_md5,
-                            "firm": doc_entity or "",
-                        }
+                        {"chunk_id": chunk_id, "text": _doc_prefix + clean_text, "page": page_num}
                     )
 
 
-                # Embed + upsert this file's chunks immediately — no accumulation
-                if file_rows:
-                    ids = [str(r["chunk_id"]) for r in file_rows]
-                    documents = [str(r["text"]) for r in file_rows]
-                    metadatas = [
-                        {
-                            "source_path": str(r["source_path"]),
-                            "doc_id": str(r["doc_id"]),
-                            "page": r["page"],
-                            "md5": str(r["md5"]),
-                            "firm": str(r.get("firm", "")),
-                        }
-                        for r in file_rows
-                    ]
-
+                # Embed + upsert this file's chunks immediately — unless the file is small, in
+                # which case its chunks join the shared coalesced upsert.
+                _coalesce = 0 < len(file_rows) < _UPSERT_COALESCE_CHUNKS
+                if _coalesce:
+                    _coalesced.append((file_path, abs_path, doc_fields, file_rows))
+                    _coalesced_rows += len(file_rows)
+                    if p_process is not None:
+                        p_process.update(len(file_rows))
+                    if _coalesced_rows >= _UPSERT_COALESCE_CHUNKS:
+                        _flush_coalesced()
+                elif file_rows:
                     # Interpolation thread: tick bar forward at expected rate
                     # during upsert so progress appears continuous not jumpy.
                     # Uses seed _chunks_per_sec (45/s) for file 1, then
@@ -1237,14 +1829,7 @@ def ingest_corpus(
                     if p_process is not None:
                         _interp_thread.start()
 
-                    _store.upsert_chunks(
-                        persist_dir=Path("."),
-                        collection_name=collection_name,
-                        embed_model=embed_model_eff,
-                        ids=ids,
-                        documents=documents,
-                        metadatas=metadatas,
-                    )
+                    _upsert_rows([(doc_fields, file_rows)])
 
                     # Stop interpolation and correct any over/undershoot
                     _interp_stop.set()
@@ -1256,14 +1841,13 @@ def ingest_corpus(
                         if _interp_delta != 0:
                             p_process.update(_interp_delta)
 
-                    # Persist JSONL audit log per file
-                    append_rows(paths["index"], file_rows)
+                    _records.put(abs_path, doc_fields, file_rows)
 
-                chunks_written += len(chunks)
+                chunks_written += len(file_rows)
                 file_dur = round(time.time() - t_file_start, 3)
                 file_stats[file_path.name] = {
-                    "size_bytes": file_path.stat().st_size,
-                    "chunks": len(chunks),
+                    "size_bytes": _file_sizes[file_path],
+                    "chunks": len(file_rows),
                     "duration_sec": file_dur,
                     "ingested_at": _dt_now(),
                 }
@@ -1274,9 +1858,8 @@ def ingest_corpus(
                 # Two outputs:
                 #   (1) STD §8 completion line via _tqdm_write — operator terminal
                 #   (2) Structured [ingest] normalizer: stderr line — parsed by api.py → UI
-                _is_markup = file_path.suffix.lower() in (".htm", ".html", ".xhtml")
-                _file_chunks = len(chunks)
-                _file_size = file_path.stat().st_size
+                _file_chunks = len(file_rows)
+                _file_size = _file_sizes[file_path]
 
                 if _is_markup:
                     # Use _total_supported (pre-computed before loop) as fixed denominator.
@@ -1399,7 +1982,8 @@ def ingest_corpus(
                         f"file={file_path.name}",
                     )
 
-                write_manifest_entry(paths["manifest"], build_entry(file_path))
+                if not _coalesce:
+                    _queue_manifest(file_path)
                 files_processed += 1
 
                 if p_process is not None:
@@ -1454,7 +2038,7 @@ def ingest_corpus(
 
             except Exception as e:
                 files_failed += 1
-                failures.append(
+                _record_failure(
                     {"source_path": str(file_path), "reason": type(e).__name__, "detail": str(e)}
                 )
                 if p_process is not None:
@@ -1508,18 +2092,28 @@ def ingest_corpus(
                     p_process.refresh()
 
     finally:
+        _prefetch.close()
+        _flush_coalesced()
         if p_process is not None:
             # Erase the final bar render, then disable before close.
             # clear() wipes the current line; disable=True prevents close() re-rendering.
             p_process.clear()  # erase final 100% line from terminal
             p_process.disable = True
             p_process.close()
-
-    if failures:
-        paths["failures"].parent.mkdir(parents=True, exist_ok=True)
-        with paths["failures"].open("a", encoding="utf-8") as f:
-            for r in failures:
-                f.write(json.dumps(r) + "\n")
+        try:
+            _records.close()
+        finally:
+            _index_log.close()
+            _manifest_log.close()
+            _failure_log.close()
+
+    with contextlib.suppress(OSError):
+        compact_index(paths["index"], min_dead_ratio=_INDEX_COMPACT_DEAD_RATIO)
+    # The manifest log only grows when this run appended to it; otherwise its last compaction
+    # check still holds and re-reading it would be O(corpus) for nothing.
+    if _manifest_log.bytes_written:
+        with contextlib.suppress(OSError):
+            compact_manifest(paths["manifest"])
 
     dur = time.time() - t0
     return IngestResult(
@@ -1540,4 +2134,5 @@ def ingest_corpus(
         normalizer_hits=_normalizer_hits,
         normalizer_misses=_normalizer_misses,
         normalizer_mismatches=_normalizer_mismatches,
+        files_deduped=files_deduped,
     )
@@ -1,5 +1,53 @@
 # src/local_llm_bot/app/ollama_client.py
-# Version: 1.3.0
+# Version: 1.10.6
+# Changelog: 1.10.6 — Pooled async clients are keyed by the event loop object in a
+#            WeakKeyDictionary (was id(loop), never evicted): a closed loop's clients go with it.
+#            Client timeouts are normalized to float, so 30 and 30.0 share one client.
+# Changelog: 1.10.5 — embed_query_with_cache coalesces concurrent misses on the same query
+#            (_EMBED_INFLIGHT): one Ollama round-trip, every caller gets its vector.
+# Changelog: 1.10.4 — ollama_embed retries a batch that fails with a 5xx or read timeout in halves
+#            and caps that model's batch size for the rest of the process (_EMBED_BATCH_LIMIT).
+# Changelog: 1.10.3 — The pooled sync/async clients keep idle connections for 30 s
+#            (_KEEPALIVE_EXPIRY_S) instead of httpx's 5 s default.
+# Changelog: 1.10.2 — ollama_embed_batches submits to a process-wide pool per concurrency
+#            (_embed_pool) instead of starting and joining a ThreadPoolExecutor on every call.
+# Changelog: 1.10.1 — ollama_embed takes `timeout` (default CONFIG.ollama.request_timeout_s, like
+#            ollama_generate) and calls /api/embed through the pooled _sync_client; it used the
+#            module-level ollama client, which has no timeout. _default_timeout() holds the
+#            config lookup the generate/stream/warmup paths each repeated.
+# Changelog: 1.10.0 — ollama_embed_batches(): embeds a sequence of batches with up to
+#            CONFIG.rag.embed_concurrency (env AISTUDIO_EMBED_CONCURRENCY, default 4) requests in
+#            flight on a thread pool, yielding results in batch order. The vector stores'
+#            upsert_chunks loops use it, so Ollama computes the next batches while we upsert.
+# Changelog: 1.9.0 — ollama_embed sends texts to the batch endpoint (ollama.embed, /api/embed)
+#            batch_size (default 64) at a time instead of one /api/embeddings round-trip per text;
+#            order is preserved. A 404 from an older server (or a client without embed()) switches
+#            the process to the per-text endpoint.
+# Changelog: 1.8.0 — Query embeddings persist across restarts when CONFIG.rag.chunk_cache_path is
+#            set: embed_query_with_cache / prime_query_embeddings fall back to the on-disk
+#            chunk_cache.ChunkCache on an LRU miss and write newly computed vectors through to it.
+# Changelog: 1.7.0 — ollama_warmup(): async empty-prompt /api/generate with keep_alive, which makes
+#            Ollama load (or keep resident) a model without generating. /ask fires it alongside
+#            retrieval so a cold model load overlaps the retrieval work.
+# Changelog: 1.6.0 — Pooled Ollama clients. ollama_generate built a fresh ollama.Client (and so a
+#            fresh httpx connection pool + TCP handshake) on every call; _sync_client(timeout) now
+#            returns one long-lived client per timeout value, and ollama_generate_stream reuses one
+#            AsyncClient per (event loop, timeout). Callers in async endpoints run ollama_generate
+#            in a worker thread (api.py 1.20.8) instead of blocking the event loop.
+# Changelog: 1.5.0 — ollama_generate now requests stream=True and accumulates the token chunks
+#            server-side (same str return). Non-streaming /api/generate calls stall for seconds on
+#            some Ollama versions before the single response lands; streaming avoids that and
+#            starts the HTTP body immediately. New ollama_generate_stream() async generator yields
+#            the chunks themselves (ollama.AsyncClient) for a future StreamingResponse /ask.
+# Changelog: 1.4.1 — prime_query_embeddings(): embed every not-yet-cached query of a batch in ONE
+#            ollama_embed call and seed the embedding LRU. Used by the /ask + /debug/retrieve
+#            micro-batcher (api.py 1.20.7) so the per-request embed_query_with_cache() lookups hit.
+# Changelog: 1.4.0 — Process-wide SHA-256-keyed LRU caches for query embeddings and deterministic
+#            generations. Every identical /ask used to re-embed the query and, at temperature 0,
+#            re-generate the same answer. embed_query_with_cache() (used by the vector stores'
+#            query paths) and ollama_generate() now consult _Sha256LruCache instances keyed by
+#            sha256(model \0 text…); the lock is never held across the Ollama call. Generations
+#            are cached only when temperature == 0. cache_stats() feeds GET /debug/cache.
 # Changelog: 1.3.0 — AIStudio_941: ollama_generate accepts `timeout` (transport-level HTTP timeout),
 #            defaults from CONFIG.ollama.request_timeout_s when None, applied via ollama.Client(timeout=…).
 #            NOT a build_generate_kwargs option (it's httpx-level, not an Ollama generate option).
@@ -16,9 +64,146 @@
 #            behavior is unchanged (num_ctx omitted → Ollama applies its own default context).
 from __future__ import annotations
 
+import hashlib
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Any
 
 
+class _Sha256LruCache:
+    """Thread-safe LRU keyed by sha256 of its NUL-joined string parts.
+
+    The lock guards only the dict operations — callers compute misses (HTTP to Ollama) outside
+    it, so a slow embed/generate never serializes unrelated lookups.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._data: OrderedDict[bytes, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0  # time spent computing values that were then cached
+
+    @staticmethod
+    def key(*parts: str) -> bytes:
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Any | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: bytes, value: Any, elapsed_s: float = 0.0) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self.miss_seconds += elapsed_s
+            while len(self._data) > self.capacity:
+                self._data.popitem(last=False)
+
+    def __contains__(self, key: bytes) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+            self.miss_seconds = 0.0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "avg_miss_ms": (1000.0 * self.miss_seconds / self.misses) if self.misses else 0.0,
+            }
+
+
+# Long-lived Ollama clients so each call reuses the underlying httpx connection pool.
+_CLIENT_LOCK = threading.Lock()
+# Idle connections are kept 30 s (httpx's default is 5 s): the gap between two files' embeds, or
+# between two /ask requests, routinely exceeds 5 s and would otherwise reconnect each time.
+_KEEPALIVE_EXPIRY_S = 30.0
+_SYNC_CLIENTS: dict[float, Any] = {}
+# event loop -> {timeout: AsyncClient}. Weakly keyed: a closed loop (e.g. each asyncio.run in a
+# CLI or test) drops its clients instead of leaking them, and a new loop that reuses the old
+# one's id() can never be handed a client bound to the dead loop.
+_ASYNC_CLIENTS: weakref.WeakKeyDictionary[Any, dict[float | None, Any]] = weakref.WeakKeyDictionary()
+
+
+def _default_timeout() -> float | None:
+    """CONFIG.ollama.request_timeout_s — the HTTP timeout of every call that does not pass one."""
+    try:
+        from local_llm_bot.app.config import CONFIG
+
+        return CONFIG.ollama.request_timeout_s
+    except Exception:
+        return None
+
+
+def _sync_client(timeout: float) -> Any:
+    """One shared ollama.Client per timeout value (httpx.Client is thread-safe)."""
+    import httpx
+    import ollama
+
+    timeout = float(timeout)  # 30 and 30.0 share a client
+    with _CLIENT_LOCK:
+        client = _SYNC_CLIENTS.get(timeout)
+        if client is None:
+            client = _SYNC_CLIENTS[timeout] = ollama.Client(
+                timeout=timeout, limits=httpx.Limits(keepalive_expiry=_KEEPALIVE_EXPIRY_S)
+            )
+        return client
+
+
+def _async_client(timeout: float | None) -> Any:
+    """One shared ollama.AsyncClient per (running event loop, timeout) — async pools are loop-bound."""
+    import asyncio
+
+    import httpx
+    import ollama
+
+    loop = asyncio.get_running_loop()
+    timeout = None if timeout is None else float(timeout)  # 30 and 30.0 share a client
+    with _CLIENT_LOCK:
+        clients = _ASYNC_CLIENTS.setdefault(loop, {})
+        client = clients.get(timeout)
+        if client is None:
+            client = clients[timeout] = ollama.AsyncClient(
+                timeout=timeout, limits=httpx.Limits(keepalive_expiry=_KEEPALIVE_EXPIRY_S)
+            )
+        return client
+
+
+# Query embeddings: small (one vector per distinct query) and hot — sized generously.
+_EMBED_CACHE = _Sha256LruCache(capacity=10_000)
+# key -> Future of a query embedding being computed by embed_query_with_cache.
+_EMBED_INFLIGHT: dict[bytes, Future] = {}
+_EMBED_INFLIGHT_LOCK = threading.Lock()
+# Deterministic (temperature 0) generations only; answers are large, so keep fewer.
+_GENERATE_CACHE = _Sha256LruCache(capacity=1024)
+
+
+def cache_stats() -> dict[str, dict[str, Any]]:
+    """Hit/miss counters for the embedding + generation caches (served by GET /debug/cache)."""
+    return {"embeddings": _EMBED_CACHE.stats(), "generations": _GENERATE_CACHE.stats()}
+
+
 def build_generate_kwargs(
     *,
     model: str,
@@ -69,40 +254,271 @@ def ollama_generate(
     num_ctx: int | None = None,
     timeout: float | None = None,
 ) -> str:
-    """Generate text using Ollama. Requires the Ollama server to be installed and running."""
+    """Generate text using Ollama. Requires the Ollama server to be installed and running.
+
+    Greedy (temperature == 0) generations are deterministic for a given payload and are served
+    from _GENERATE_CACHE on repeat; sampled generations always go to the model.
+    """
     import ollama
 
     kwargs = build_generate_kwargs(
         model=model, prompt=prompt, system=system, temperature=temperature, num_ctx=num_ctx
     )
+    cache_key: bytes | None = None
+    if temperature == 0:
+        cache_key = _Sha256LruCache.key(
+            model, system or "", prompt, str(kwargs.get("options", {}).get("num_ctx", ""))
+        )
+        cached = _GENERATE_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+    t0 = time.perf_counter()
     # AIStudio_941: apply an HTTP request timeout. This is TRANSPORT-level (httpx client), NOT an
     # Ollama generate option — so it does NOT go through build_generate_kwargs. Default from config
     # so every path inherits it; a caller (per-request / per-corpus) may override. A too-small
     # timeout kills slow-model generations mid-flight, so the config default is generous (300s).
     if timeout is None:
-        try:
-            from local_llm_bot.app.config import CONFIG
+        timeout = _default_timeout()
+    client = _sync_client(timeout) if timeout is not None else ollama
+    parts: list[str] = []
+    for chunk in client.generate(**kwargs, stream=True):
+        parts.append(str(chunk.get("response", "") or ""))
+        if chunk.get("done"):
+            break
+    text = "".join(parts).strip()
+    if cache_key is not None:
+        _GENERATE_CACHE.put(cache_key, text, time.perf_counter() - t0)
+    return text
 
-            timeout = CONFIG.ollama.request_timeout_s
-        except Exception:
-            timeout = None
-    if timeout is not None:
-        resp = ollama.Client(timeout=timeout).generate(**kwargs)
-    else:
-        resp = ollama.generate(**kwargs)
-    return str(resp.get("response", "")).strip()
+
+async def ollama_generate_stream(
+    *,
+    model: str,
+    prompt: str,
+    system: str | None = None,
+    temperature: float | None = None,
+    num_ctx: int | None = None,
+    timeout: float | None = None,
+) -> AsyncIterator[str]:
+    """Async variant of ollama_generate that yields response text chunks as Ollama produces them.
+
+    Same payload (build_generate_kwargs) and timeout default as ollama_generate; nothing is cached.
+    """
+    kwargs = build_generate_kwargs(
+        model=model, prompt=prompt, system=system, temperature=temperature, num_ctx=num_ctx
+    )
+    if timeout is None:
+        timeout = _default_timeout()
+    client = _async_client(timeout)
+    async for chunk in await client.generate(**kwargs, stream=True):
+        piece = str(chunk.get("response", "") or "")
+        if piece:
+            yield piece
+        if chunk.get("done"):
+            break
+
+
+async def ollama_warmup(*, model: str, keep_alive: str = "10m", timeout: float | None = None) -> None:
+    """Ask Ollama to load `model` (empty prompt = load only, no tokens) and keep it resident.
+
+    Cheap when the model is already loaded; on a cold model it pays the load so the next real
+    generation does not.
+    """
+    if timeout is None:
+        timeout = _default_timeout()
+    await _async_client(timeout).generate(model=model, prompt="", keep_alive=keep_alive)
 
 
-def ollama_embed(*, model: str, texts: list[str]) -> list[list[float]]:
-    """Compute embeddings using Ollama.
+# Ollama servers predating /api/embed (batch input) answer it with 404; set once seen so every
+# later call goes straight to the per-text /api/embeddings endpoint.
+_LEGACY_EMBED = False
+# Per model: the largest /api/embed batch known to go through. Set when a batch fails with a 5xx
+# or a read timeout (Ollama out of memory / overloaded) and is retried in halves; later calls
+# start from it instead of failing at the same size again.
+_EMBED_BATCH_LIMIT: dict[str, int] = {}
+
+
+def _is_overload(e: Exception) -> bool:
+    """True for errors a smaller batch can cure: a server 5xx or an HTTP read timeout."""
+    import httpx
+
+    status = getattr(e, "status_code", None)
+    return (isinstance(status, int) and status >= 500) or isinstance(e, httpx.ReadTimeout)
+
+
+def ollama_embed(
+    *, model: str, texts: list[str], batch_size: int = 64, timeout: float | None = None
+) -> list[list[float]]:
+    """Compute embeddings using Ollama, in input order.
+
+    Texts go to /api/embed `batch_size` at a time (one HTTP call + one model pass per batch).
+    Servers or clients without it fall back to one /api/embeddings call per text.
+    Requests go through the pooled _sync_client with ollama_generate's timeout default, so a
+    stalled batch fails instead of hanging ingest. A batch that fails with a 5xx or a read
+    timeout is retried in halves (down to one text), and the model's batch size stays capped.
 
     Example embedding model:
       - nomic-embed-text
     """
+    global _LEGACY_EMBED
     import ollama
 
+    if timeout is None:
+        timeout = _default_timeout()
+    client = _sync_client(timeout) if timeout is not None else ollama
+    batch_size = min(batch_size, _EMBED_BATCH_LIMIT.get(model, batch_size))
     out: list[list[float]] = []
-    for t in texts:
-        r = ollama.embeddings(model=model, prompt=t)
+    start = 0
+    while start < len(texts) and not _LEGACY_EMBED:
+        batch = texts[start : start + batch_size]
+        try:
+            r = client.embed(model=model, input=batch)
+        except AttributeError:
+            _LEGACY_EMBED = True  # client library without embed()
+            break
+        except Exception as e:
+            if len(batch) > 1 and _is_overload(e):
+                batch_size = (len(batch) + 1) // 2
+                _EMBED_BATCH_LIMIT[model] = min(batch_size, _EMBED_BATCH_LIMIT.get(model, batch_size))
+                continue
+            if getattr(e, "status_code", None) != 404:
+                raise
+            _LEGACY_EMBED = True
+            break
+        out.extend(list(v) for v in r["embeddings"])
+        start += len(batch)
+    for t in texts[start:]:
+        r = client.embeddings(model=model, prompt=t)
         out.append(list(r["embedding"]))
     return out
+
+
+# Embedding worker threads, one pool per concurrency, kept for the process: ingest calls
+# ollama_embed_batches once per file (or coalesced group), which must not start and join threads.
+_EMBED_POOLS: dict[int, ThreadPoolExecutor] = {}
+
+
+def _embed_pool(concurrency: int) -> ThreadPoolExecutor:
+    with _CLIENT_LOCK:
+        pool = _EMBED_POOLS.get(concurrency)
+        if pool is None:
+            pool = _EMBED_POOLS[concurrency] = ThreadPoolExecutor(
+                max_workers=concurrency, thread_name_prefix="ollama-embed"
+            )
+        return pool
+
+
+def ollama_embed_batches(
+    *, model: str, batches: Iterable[list[str]], concurrency: int | None = None
+) -> Iterator[list[list[float]]]:
+    """ollama_embed() each batch, yielding the results in batch order.
+
+    Up to `concurrency` (default CONFIG.rag.embed_concurrency) batches are in flight on a shared
+    thread pool, so Ollama embeds the next batches while the caller upserts the current one.
+    1 = serial.
+    """
+    if concurrency is None:
+        try:
+            from local_llm_bot.app.config import CONFIG
+
+            concurrency = CONFIG.rag.embed_concurrency
+        except Exception:
+            concurrency = 1
+    if concurrency <= 1:
+        for batch in batches:
+            yield ollama_embed(model=model, texts=batch)
+        return
+    pool = _embed_pool(concurrency)
+    pending: deque[Future] = deque()
+    try:
+        for batch in batches:
+            pending.append(pool.submit(ollama_embed, model=model, texts=batch))
+            # One batch queued beyond the pool: workers stay busy while the caller consumes.
+            if len(pending) > concurrency:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+
+def embed_query_with_cache(*, model: str, text: str) -> list[float]:
+    """Embed a single query string, served from the process-wide LRU on repeat.
+
+    Concurrent misses on the same (model, text) share one embed: the first caller computes it,
+    the others wait for its result. The returned list is shared with the cache — callers must
+    not mutate it.
+    """
+    key = _Sha256LruCache.key(model, text)
+    cached = _EMBED_CACHE.get(key)
+    if cached is not None:
+        return cached
+    with _EMBED_INFLIGHT_LOCK:
+        fut = _EMBED_INFLIGHT.get(key)
+        owner = fut is None
+        if owner:
+            fut = _EMBED_INFLIGHT[key] = Future()
+    if not owner:
+        return fut.result()
+    try:
+        emb = _embed_query_uncached(model, text, key)
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    else:
+        fut.set_result(emb)
+    finally:
+        with _EMBED_INFLIGHT_LOCK:
+            _EMBED_INFLIGHT.pop(key, None)
+    return emb
+
+
+def _embed_query_uncached(model: str, text: str, key: bytes) -> list[float]:
+    """An LRU miss: the on-disk cache, else Ollama; the result is written through to both."""
+    disk = _disk_cache()
+    if disk is not None:
+        stored = disk.get_embedding(model=model, text=text)
+        if stored is not None:
+            _EMBED_CACHE.put(key, stored)
+            return stored
+    t0 = time.perf_counter()
+    emb = ollama_embed(model=model, texts=[text])[0]
+    _EMBED_CACHE.put(key, emb, time.perf_counter() - t0)
+    if disk is not None:
+        disk.put_embedding(model=model, text=text, vec=emb)
+    return emb
+
+
+def _disk_cache() -> Any | None:
+    """The persistent ChunkCache when configured (CONFIG.rag.chunk_cache_path), else None."""
+    try:
+        from local_llm_bot.app.chunk_cache import get_chunk_cache
+
+        return get_chunk_cache()
+    except Exception:
+        return None
+
+
+def prime_query_embeddings(*, model: str, texts: list[str]) -> None:
+    """Embed the uncached `texts` in a single ollama_embed call and seed the query-embedding LRU."""
+    pending = [t for t in dict.fromkeys(texts) if _Sha256LruCache.key(model, t) not in _EMBED_CACHE]
+    disk = _disk_cache()
+    if disk is not None:
+        missing = []
+        for text in pending:
+            stored = disk.get_embedding(model=model, text=text)
+            if stored is None:
+                missing.append(text)
+            else:
+                _EMBED_CACHE.put(_Sha256LruCache.key(model, text), stored)
+        pending = missing
+    if not pending:
+        return
+    t0 = time.perf_counter()
+    embs = ollama_embed(model=model, texts=pending)
+    per_item = (time.perf_counter() - t0) / len(pending)
+    for text, emb in zip(pending, embs, strict=True):
+        _EMBED_CACHE.put(_Sha256LruCache.key(model, text), emb, per_item)
+        if disk is not None:
+            disk.put_embedding(model=model, text=text, vec=emb)
@@ -1,5 +1,69 @@
 # src/local_llm_bot/app/rag_core.py
-# Version: 1.10.1
+# Version: 1.10.20
+# Changelog: 1.10.20 — _bm25_index is single-flight per corpus: the cache check, build and
+#             _remember_bm25 run under that corpus's lock, so concurrent cold queries build once.
+# Changelog: 1.10.19 — The BM25 build parses index.jsonl in-process (read_jsonl_fields(parallel=False));
+#             a process pool of cpu_count workers inside the server contended with Ollama and
+#             uvicorn on every cold corpus.
+# Changelog: 1.10.18 — The cross-encoder reranker loads on first use (_reranker(), cached)
+#             instead of at import, so importing rag_core no longer loads sentence-transformers
+#             and the model. Retrieval results are unchanged.
+# Changelog: 1.10.17 — Citation (one per cited hit) is a slots dataclass, like RetrievedDoc.
+# Changelog: 1.10.16 — The BM25 build reads only chunk_id/text/source_path from index.jsonl
+#             (index_jsonl.read_jsonl_fields), which parses a large index in a process pool
+#             over newline-aligned byte ranges instead of one line at a time.
+# Changelog: 1.10.15 — RetrievedDoc is a slots dataclass: one is built per hit on every query.
+# Changelog: 1.10.14 — _repo_root() is functools.cache'd and the knowledge-source loaders use it,
+#             so retrieval resolves the repo root once per process.
+# Changelog: 1.10.13 — Lexical tokenization lives in one place: _terms() (the _TERM_RE split
+#             behind both the BM25 postings build and _tokenize) and the entity-filter
+#             _WORD_RE/_word_tokens sit together; the postings build no longer inlines its own copy.
+# Changelog: 1.10.12 — _detect_entities matches each entity with one pattern compiled when the
+#             knowledge source loads (_entity_match_re: \b(?:alias|…|scope_name)\b over the
+#             normalized names). Per query it used to NFKD-normalize every alias and build one
+#             regex per alias, which overflows re's 512-pattern cache on a large KB. Same matches.
+# Changelog: 1.10.11 — The per-corpus BM25 cache is an LRU of at most _BM25_CACHE_MAX (4) corpora
+#             instead of growing with every corpus queried, and a cached lookup costs the
+#             index_stamp stats only (the separate exists() check is gone).
+# Changelog: 1.10.10 — _bm25_index builds its postings vectorized: per row only a Counter runs in
+#             Python; term ids, BM25 weights and the per-term grouping are NumPy over the flattened
+#             (term, tf) pairs (np.argsort + bincount offsets), replacing ~2 list appends and a
+#             dict.setdefault per posting. Postings are views into two flat arrays, the same layout
+#             chunk_cache already returns. Same positions and weights.
+# Changelog: 1.10.9 — Lexical terms come from one compiled regex, [a-z0-9]{3,} (_TERM_RE), used by
+#             both the query tokenizer and the BM25 postings build; the len >= 3 filter no longer
+#             runs as a Python comprehension over every token of every chunk. Same terms.
+# Changelog: 1.10.8 — The BM25 index honours index.jsonl tombstones: read_jsonl drops deleted docs,
+#             the cache stamp is index_jsonl.index_stamp (index + tombstones side-car), and the
+#             persisted-postings hash covers both files.
+# Changelog: 1.10.7 — _bm25_index reuses postings persisted in chunk_cache.ChunkCache (when
+#             CONFIG.rag.chunk_cache_path is set), keyed by sha256 of index.jsonl, so a restart
+#             with an unchanged corpus skips re-tokenizing every chunk. New builds are saved back.
+# Changelog: 1.10.6 — AISTUDIO_VECTORSTORE=sqlite_vec selects vectorstore/sqlite_vec_store (vec0
+#             KNN over the corpus's vectors.sqlite) for the vector channel. Falls back to Qdrant
+#             when sqlite-vec is missing or the interpreter cannot load extensions. Hybrid stays
+#             Qdrant-only (the sqlite mirror has no BM25 channel), as on Chroma.
+# Changelog: 1.10.5 — _Bm25Index holds the corpus as structure-of-arrays (ids / texts / sources
+#             parallel lists) instead of the full index.jsonl row dicts. Drops every unused
+#             per-row field (doc_id, md5, firm, page ...) from the cached index and removes the
+#             dict lookups + str() coercions when the top-k RetrievedDocs are built.
+# Changelog: 1.10.4 — Hoist redundant lower()/tokenize work out of retrieve()'s post-filters. The
+#             entity + scope backstops called _entity_token_matches per (hit, token) pair, which
+#             re-lower-cased and re-tokenized the filter token AND both hit fields every time.
+#             _filter_hits_by_tokens() tokenizes each filter token once and each hit's
+#             source_path/firm once; match semantics unchanged (AIStudio_891 MatchText parity).
+# Changelog: 1.10.3 — Lexical-fallback BM25 scoring vectorized with NumPy. _Bm25Index now stores, per
+#             term, int32 row positions + the precomputed length-normalized term weights, so a query
+#             is one np.bincount over its terms' concatenated postings (weights × idf) followed by
+#             np.argpartition for the top-k — no per-posting Python arithmetic left on the hot path.
+# Changelog: 1.10.2 — Lexical fallback now ranks by Okapi BM25 instead of raw substring
+#             containment counts. _lexical_jsonl_retrieve used to lower-case and scan every
+#             chunk's text for every query token on every call (O(Q·N·L)), and scored a chunk
+#             by how many tokens it contained — no TF saturation, no IDF, no length norm. A
+#             per-corpus postings index (_Bm25Index) is now built once from index.jsonl and
+#             reused until the file's (mtime_ns, size) stamp changes; a query only touches the
+#             postings of its own terms. Pure Python — no new dependency (bm25s/scipy were
+#             considered, but this path is a fallback and the index is small enough in memory).
 # Changelog: 1.10.1 — AIStudio_891: make the Python entity/scope post-filter backstops
 #             firm-aware. The Qdrant-side filter (qdrant_store._build_entity_filter) now
 #             matches the entity on the `firm` payload field (tokenized MatchText), but the
@@ -111,15 +175,23 @@ RAG core: retrieval, answer generation, citation support, and conversation memor
 
 from __future__ import annotations
 
+import hashlib
+import math
 import os as _os
 import re
+import threading
 import unicodedata
+from collections import Counter
 from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
 from typing import Any
 
+import numpy as np
+
+from local_llm_bot.app.chunk_cache import get_chunk_cache
 from local_llm_bot.app.config import CONFIG
-from local_llm_bot.app.ingest.index_jsonl import read_jsonl
+from local_llm_bot.app.ingest.index_jsonl import index_stamp, read_jsonl_fields, tombstones_path
 from local_llm_bot.app.ollama_client import ollama_generate
 from local_llm_bot.app.utils.corpus_paths import corpus_paths
 from local_llm_bot.app.utils.repo_root import find_repo_root
@@ -143,6 +215,14 @@ _HYBRID_UNDER_FILTER = _os.getenv("AISTUDIO_HYBRID_UNDER_FILTER", "").strip().lo
 
 if _VECTORSTORE == "chroma":
     from local_llm_bot.app.vectorstore import chroma_store as _store
+elif _VECTORSTORE == "sqlite_vec":
+    from local_llm_bot.app.vectorstore import sqlite_vec_store as _store
+
+    if not _store.available():
+        print("[rag_core] sqlite-vec unavailable (not installed / no extension loading) — Qdrant")
+        from local_llm_bot.app.vectorstore import qdrant_store as _store
+
+        _VECTORSTORE = "qdrant"
 else:
     from local_llm_bot.app.vectorstore import qdrant_store as _store
 
@@ -150,15 +230,21 @@ else:
 # Only invoked when retrieve(hybrid_alpha=...) is called with a non-None value.
 from local_llm_bot.app import scoring as _scoring  # noqa: E402
 
+
 # Reranker — lazy load, graceful fallback if sentence-transformers missing
-try:
-    from sentence_transformers import CrossEncoder as _CrossEncoder
+@cache
+def _reranker() -> Any | None:
+    """The cross-encoder reranker, loaded on the first retrieval that has hits to rerank.
+
+    Not at import: sentence-transformers (torch) and the model load dominate rag_core's import
+    time, which every importer — tests, CLI tools — would otherwise pay.
+    """
+    try:
+        from sentence_transformers import CrossEncoder
 
-    _reranker: _CrossEncoder | None = _CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
-    _RERANKER_AVAILABLE = True
-except Exception:  # noqa: BLE001
-    _reranker = None
-    _RERANKER_AVAILABLE = False
+        return CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
+    except Exception:  # noqa: BLE001
+        return None
 
 
 # ---------------------------------------------------------------------------
@@ -166,7 +252,7 @@ except Exception:  # noqa: BLE001
 # ---------------------------------------------------------------------------
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RetrievedDoc:
     id: str
     content: str
@@ -175,7 +261,7 @@ class RetrievedDoc:
     page: int | None = None  # page number from pdfplumber extraction, None for non-PDF or unknown
 
 
-@dataclass
+@dataclass(slots=True)
 class Citation:
     """A citation reference to a source document."""
 
@@ -223,7 +309,7 @@ def _load_knowledge_sources(corpus: str) -> list[dict]:
 
     import yaml  # local import — yaml not needed at module level
 
-    repo = find_repo_root(Path(__file__))
+    repo = _repo_root()
     ks_dir = repo / "data" / "knowledge_sources" / "gleif"
     pattern = f"gleif_{corpus}_*_entities.yaml"
     matches = list(ks_dir.glob(pattern)) if ks_dir.exists() else []
@@ -247,6 +333,7 @@ def _load_knowledge_sources(corpus: str) -> list[dict]:
                 "wikidata_short_name": e.get("wikidata_short_name", ""),
                 "wikidata_tickers": e.get("wikidata_tickers", []),
             })
+            records[-1]["match_re"] = _entity_match_re(records[-1])
         _KS_CACHE[corpus] = records
         return records
     except Exception:  # noqa: BLE001
@@ -278,6 +365,19 @@ def _normalize_for_match(s: str) -> str:
     return unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii").lower()
 
 
+def _entity_match_re(entity: dict) -> re.Pattern[str] | None:
+    """One word-bounded alternation over an entity's normalized aliases (> 2 chars) and scope_name.
+
+    Compiled once per entity at knowledge-source load; None when it has nothing to match.
+    """
+    names = [_normalize_for_match(a) for a in entity["aliases"] if a and len(a) > 2]
+    if entity["scope_name"]:
+        names.append(_normalize_for_match(entity["scope_name"]))
+    if not names:
+        return None
+    return re.compile(rf"\b(?:{'|'.join(map(re.escape, names))})\b")
+
+
 def _detect_entities(query: str, corpus: str) -> list[dict]:
     """
     AIStudio_876 — THE single entity-detection function. Given a query and corpus,
@@ -300,18 +400,8 @@ def _detect_entities(query: str, corpus: str) -> list[dict]:
     q = _normalize_for_match(query)
     matched: list[dict] = []
     for entity in entities:
-        hit = False
-        for alias in entity["aliases"]:
-            if not alias or len(alias) <= 2:
-                continue
-            if re.search(rf"\b{re.escape(_normalize_for_match(alias))}\b", q):
-                hit = True
-                break
-        if not hit and entity["scope_name"] and re.search(
-            rf"\b{re.escape(_normalize_for_match(entity['scope_name']))}\b", q
-        ):
-            hit = True
-        if hit:
+        pattern = entity["match_re"] if "match_re" in entity else _entity_match_re(entity)
+        if pattern is not None and pattern.search(q):
             matched.append(entity)
     return matched
 
@@ -374,7 +464,7 @@ def _load_glossary_sources() -> list[dict]:
 
     import yaml  # local import
 
-    repo = find_repo_root(Path(__file__))
+    repo = _repo_root()
     ks_dir = repo / "data" / "knowledge_sources" / "bis_basel"
     matches = list(ks_dir.glob("bis_basel_*_glossary.yaml")) if ks_dir.exists() else []
 
@@ -460,7 +550,9 @@ def _count_matched_entities(query: str, corpus: str) -> int:
     return count
 
 
+@cache
 def _repo_root() -> Path:
+    # Fixed for the process; cached so a query pays no Path building or lookup for it.
     return find_repo_root(Path(__file__))
 
 
@@ -468,8 +560,25 @@ def _is_tax_corpus(corpus: str) -> bool:
     return "tax" in corpus.lower()
 
 
+# Lexical terms: maximal [a-z0-9] runs of 3+ characters (shorter runs never match, so the length
+# filter runs inside the regex engine rather than as a Python comprehension).
+_TERM_RE = re.compile(r"[a-z0-9]{3,}")
+# Entity-filter word tokens (_word_tokens): every [a-z0-9] run, including 1-2 character ones.
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _terms(text: str) -> list[str]:
+    """Lexical terms of `text` in order, repeats kept: the one tokenizer behind BM25 postings and
+    queries, so documents and queries can never be split differently."""
+    return _TERM_RE.findall(text.lower())
+
+
 def _tokenize(text: str) -> set[str]:
-    return {t for t in re.findall(r"[a-z0-9]+", text.lower()) if len(t) >= 3}
+    return set(_terms(text))
+
+
+def _word_tokens(value: Any) -> set[str]:
+    return set(_WORD_RE.findall(str(value).lower()))
 
 
 def compose_queries(query: str, corpus: str) -> list[str]:
@@ -477,37 +586,175 @@ def compose_queries(query: str, corpus: str) -> list[str]:
     return [query]
 
 
+# Okapi BM25 parameters for the lexical fallback (the usual defaults).
+_BM25_K1: float = 1.5
+_BM25_B: float = 0.75
+
+
+@dataclass(frozen=True)
+class _Bm25Index:
+    """Postings index over one corpus's index.jsonl, for the lexical fallback.
+
+    Each term maps to two parallel arrays: the row positions containing it and that row's
+    length-normalized BM25 term weight tf·(k1+1)/(tf + k1·(1-b+b·dl/avgdl)). Only the IDF depends
+    on the query-time df, so a query is a weighted np.bincount over its terms' postings.
+    """
+
+    stamp: tuple[int, int, int, int]  # index_jsonl.index_stamp (index + tombstones) when built
+    # Structure-of-arrays over the index rows: only the three fields a hit needs are kept, as
+    # parallel lists indexed by row position (the full row dicts are not retained).
+    ids: list[str]
+    texts: list[str]
+    sources: list[str]
+    postings: dict[str, tuple[np.ndarray, np.ndarray]]  # term -> (int32 positions, float32 weights)
+
+
+# Per-corpus BM25 index, rebuilt only when index.jsonl changes on disk. Least recently used
+# first; at most _BM25_CACHE_MAX corpora are held (each holds its corpus's full chunk text).
+_BM25_CACHE: dict[str, _Bm25Index] = {}
+_BM25_CACHE_MAX = 4
+# One lock per corpus (single-flight): concurrent cold queries wait for one build instead of each
+# reading and tokenizing the whole index. _BM25_LOCKS_GUARD covers the lock map and the LRU.
+_BM25_LOCKS: dict[str, threading.Lock] = {}
+_BM25_LOCKS_GUARD = threading.Lock()
+
+
+def _remember_bm25(corpus: str, index: _Bm25Index) -> None:
+    with _BM25_LOCKS_GUARD:
+        _BM25_CACHE.pop(corpus, None)
+        _BM25_CACHE[corpus] = index
+        while len(_BM25_CACHE) > _BM25_CACHE_MAX:
+            _BM25_CACHE.pop(next(iter(_BM25_CACHE)), None)
+
+
+def _bm25_index(corpus: str) -> _Bm25Index | None:
+    """Return the BM25 index for `corpus`, building it on first use or after index.jsonl changes."""
+    with _BM25_LOCKS_GUARD:
+        lock = _BM25_LOCKS.setdefault(corpus, threading.Lock())
+    with lock:
+        return _bm25_index_locked(corpus)
+
+
+def _bm25_index_locked(corpus: str) -> _Bm25Index | None:
+    index_path = corpus_paths(_repo_root(), corpus)["index"]
+    stamp = index_stamp(index_path)  # one stat per file; all zeros for a missing index
+    if stamp[:2] == (0, 0):
+        return None
+    cached = _BM25_CACHE.get(corpus)
+    if cached is not None and cached.stamp == stamp:
+        _remember_bm25(corpus, cached)
+        return cached
+
+    ids, texts, sources = read_jsonl_fields(
+        index_path, ("chunk_id", "text", "source_path"), parallel=False
+    )
+
+    disk = get_chunk_cache()
+    content_hash = b""
+    if disk is not None:
+        digest = hashlib.sha256()
+        for p in (index_path, tombstones_path(index_path)):
+            if p.exists():
+                with p.open("rb") as f:
+                    digest.update(hashlib.file_digest(f, "sha256").digest())
+        content_hash = digest.digest()
+        postings = disk.get_bm25_postings(corpus=corpus, content_hash=content_hash)
+        if postings is not None:
+            index = _Bm25Index(stamp=stamp, ids=ids, texts=texts, sources=sources, postings=postings)
+            _remember_bm25(corpus, index)
+            return index
+
+    # One Counter per row (C-level counting); everything after runs as NumPy over the flattened
+    # (term, tf) pairs of all rows instead of per-posting Python appends.
+    row_terms: list[str] = []
+    row_tfs: list[int] = []
+    n_unique = np.zeros(len(texts), dtype=np.int64)
+    doc_len = np.zeros(len(texts), dtype=np.float32)
+    for pos, text in enumerate(texts):
+        counts = Counter(_terms(text))
+        row_terms.extend(counts)
+        row_tfs.extend(counts.values())
+        n_unique[pos] = len(counts)
+        doc_len[pos] = counts.total()
+
+    vocab = dict.fromkeys(row_terms)  # first-seen order
+    for term_id, term in enumerate(vocab):
+        vocab[term] = term_id
+    term_ids = np.fromiter(map(vocab.__getitem__, row_terms), dtype=np.int64, count=len(row_terms))
+    del row_terms
+    positions_all = np.repeat(np.arange(len(texts), dtype=np.int32), n_unique)
+    tf_all = np.asarray(row_tfs, dtype=np.float32)
+    del row_tfs
+
+    avgdl = float(doc_len.mean()) if len(texts) else 0.0
+    avgdl = avgdl or 1.0
+    len_norm = _BM25_K1 * (1.0 - _BM25_B + _BM25_B * doc_len / avgdl)
+    weights_all = tf_all * (_BM25_K1 + 1.0) / (tf_all + len_norm[positions_all])
+
+    # Group by term; the stable sort keeps each term's positions ascending.
+    order = np.argsort(term_ids, kind="stable")
+    positions_all = positions_all[order]
+    weights_all = weights_all[order]
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(term_ids, minlength=len(vocab)), out=offsets[1:])
+    postings: dict[str, tuple[np.ndarray, np.ndarray]] = {
+        term: (positions_all[offsets[i] : offsets[i + 1]], weights_all[offsets[i] : offsets[i + 1]])
+        for i, term in enumerate(vocab)
+    }
+
+    if disk is not None:
+        disk.put_bm25_postings(corpus=corpus, content_hash=content_hash, postings=postings)
+    index = _Bm25Index(stamp=stamp, ids=ids, texts=texts, sources=sources, postings=postings)
+    _remember_bm25(corpus, index)
+    return index
+
+
 def _lexical_jsonl_retrieve(*, query: str, top_k: int, corpus: str) -> list[RetrievedDoc]:
     """
-    Simple lexical fallback retrieval from index.jsonl.
-    Scores chunks by token containment count.
+    Lexical fallback retrieval from index.jsonl, ranked by Okapi BM25.
+    Only the postings of the query's own terms are visited.
     """
-    paths = corpus_paths(_repo_root(), corpus)
-    rows = read_jsonl(paths["index"])
-    if not rows:
+    index = _bm25_index(corpus)
+    if index is None or not index.ids:
         return []
 
     tokens = _tokenize(query)
     if not tokens:
         return []
 
-    scored: list[tuple[int, dict[str, Any]]] = []
-    for r in rows:
-        text = str(r.get("text", "")).lower()
-        score = sum(1 for token in tokens if token in text)
-        if score > 0:
-            scored.append((score, r))
+    n_docs = len(index.ids)
+    hit_positions: list[np.ndarray] = []
+    hit_weights: list[np.ndarray] = []
+    for token in tokens:
+        plist = index.postings.get(token)
+        if plist is None:
+            continue
+        positions, weights = plist
+        df = len(positions)
+        idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+        hit_positions.append(positions)
+        hit_weights.append(weights * idf)
+    if not hit_positions:
+        return []
 
-    scored.sort(key=lambda x: x[0], reverse=True)
+    scores = np.bincount(
+        np.concatenate(hit_positions), weights=np.concatenate(hit_weights), minlength=n_docs
+    )
+    n_hits = int(np.count_nonzero(scores))
+    k = min(top_k, n_hits)
+    if k <= 0:
+        return []
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
 
     return [
         RetrievedDoc(
-            id=str(r.get("chunk_id", "")),
-            content=str(r.get("text", "")),
-            source=str(r.get("source_path", "")),
-            score=float(score),
+            id=index.ids[pos],
+            content=index.texts[pos],
+            source=index.sources[pos],
+            score=float(scores[pos]),
         )
-        for score, r in scored[:top_k]
+        for pos in top.tolist()
     ]
 
 
@@ -530,13 +777,28 @@ def _entity_token_matches(token: str, *field_values: str) -> bool:
     which is not a source_path substring but does match the `firm` field token-for-token.
     Tokenizing is backward-compatible: label tokens remain a subset of their filename tokens.
     """
-    t_toks = set(re.findall(r"[a-z0-9]+", token.lower()))
+    t_toks = _word_tokens(token)
     if not t_toks:
         return False
-    for value in field_values:
-        if t_toks <= set(re.findall(r"[a-z0-9]+", str(value).lower())):
-            return True
-    return False
+    return any(t_toks <= _word_tokens(value) for value in field_values)
+
+
+def _filter_hits_by_tokens(hits: list[Any], tokens: list[str]) -> list[Any]:
+    """Keep hits whose source_path OR firm satisfies _entity_token_matches for ANY token.
+
+    Same semantics as calling _entity_token_matches per (hit, token), but each filter token and
+    each hit's two fields are lower-cased + tokenized once, not once per (hit, token) pair.
+    """
+    token_sets = [t for t in (_word_tokens(tok) for tok in tokens) if t]
+    if not token_sets:
+        return []
+    kept = []
+    for h in hits:
+        path_toks = _word_tokens(h.metadata.get("source_path", ""))
+        firm_toks = _word_tokens(h.metadata.get("firm", ""))
+        if any(t <= path_toks or t <= firm_toks for t in token_sets):
+            kept.append(h)
+    return kept
 
 
 def retrieve(
@@ -608,7 +870,7 @@ def retrieve(
         # gates hybrid exactly like entity_filter (BM25 scope post-filter added in 1.3.0).
         _use_hybrid = (
             hybrid_alpha is not None
-            and _VECTORSTORE != "chroma"
+            and _VECTORSTORE not in ("chroma", "sqlite_vec")
             and (not (entity_filter or allowed_source_paths) or _HYBRID_UNDER_FILTER)
         )
 
@@ -733,34 +995,14 @@ def retrieve(
         # parity). The Qdrant filter matches firm; this backstop must too, or it drops
         # the very hits the Qdrant filter just admitted.
         if entity_filter:
-            hits = [
-                h for h in hits
-                if any(
-                    _entity_token_matches(
-                        token,
-                        h.metadata.get("source_path", ""),
-                        h.metadata.get("firm", ""),
-                    )
-                    for token in entity_filter
-                )
-            ]
+            hits = _filter_hits_by_tokens(hits, entity_filter)
 
         # AIStudio_882: scope boundary backstop — AND the allowed_source_paths set across the
         # merged hits, same rationale as the entity backstop (a vector hit can reach here
         # without per-channel source_path filtering). entity AND scope: an out-of-scope firm
         # that satisfied the entity clause is dropped here; empty intersection → no hits.
         if allowed_source_paths:
-            hits = [
-                h for h in hits
-                if any(
-                    _entity_token_matches(
-                        token,
-                        h.metadata.get("source_path", ""),
-                        h.metadata.get("firm", ""),
-                    )
-                    for token in allowed_source_paths
-                )
-            ]
+            hits = _filter_hits_by_tokens(hits, allowed_source_paths)
 
         # AIStudio_778: drop BM25-floor chunks below minimum score threshold.
         # AIStudio_835: skip min_score filter when entity_filter is active.
@@ -781,9 +1023,10 @@ def retrieve(
             hits = [h for h in hits if float(h.distance) <= md]
 
         if hits:
-            if _RERANKER_AVAILABLE and _reranker is not None:
+            reranker = _reranker()
+            if reranker is not None:
                 pairs = [[query, h.text] for h in hits]
-                scores = _reranker.predict(pairs)
+                scores = reranker.predict(pairs)
                 hits = [
                     h
                     for _, h in sorted(
@@ -1,5 +1,7 @@
 # src/local_llm_bot/app/scoring.py
-# Version: 1.0.0
+# Version: 1.0.1
+# Changelog: 1.0.1 — combine_hybrid selects its top_k with heapq.nlargest (O(n log k)) instead
+#             of sorting every merged candidate and slicing; same ranking, ties included.
 """
 Score combination and normalization for hybrid retrieval.
 
@@ -18,6 +20,9 @@ a merged ranked list. All I/O happens in qdrant_store.py and rag_core.py.
 
 from __future__ import annotations
 
+import heapq
+from operator import itemgetter
+
 from local_llm_bot.app.vectorstore.qdrant_store import QdrantHit
 
 
@@ -63,7 +68,7 @@ def combine_hybrid(
                final_score = alpha * vector_norm + (1 - alpha) * bm25_norm
            Missing channel contributes 0 (chunk only matched one signal — that's fine,
            it just means the other channel didn't surface it in its top-K).
-        5. Sort descending by final_score, return top_k
+        5. Return the top_k by final_score, descending
 
     Args:
         vector_hits: Output of qdrant_store.query() — distance is 1-cosine_similarity
@@ -134,13 +139,14 @@ def combine_hybrid(
         final = alpha * v_score + (1.0 - alpha) * b_score
         combined.append((final, cid))
 
-    # Sort by combined score descending (highest first)
-    combined.sort(key=lambda x: x[0], reverse=True)
+    # Top_k by combined score, highest first. nlargest keeps only k candidates in its heap and
+    # orders ties like sorted(..., reverse=True)[:top_k] would.
+    best = heapq.nlargest(top_k, combined, key=itemgetter(0))
 
-    # Take top_k, rebuild as QdrantHit list with distance = 1 - combined_score
+    # Rebuild as QdrantHit list with distance = 1 - combined_score
     # so downstream code (rerank, RetrievedDoc construction) sees lower=better.
     out: list[QdrantHit] = []
-    for final_score, cid in combined[:top_k]:
+    for final_score, cid in best:
         original = hit_by_id[cid]
         out.append(
             QdrantHit(
@@ -0,0 +1,108 @@
+# src/local_llm_bot/app/semantic_cache.py
+# Version: 1.0.1
+# Changelog: 1.0.1 — Unit vectors live in one float32 NumPy matrix (a row slot per entry) and lookup
+#   scores the partition's rows with a single matmul; the pure-Python cosine loop over up to
+#   512 x 768 floats ran under the lock on /ask's event-loop thread.
+# Changelog: 1.0.0 — Semantic answer cache for /ask. Exact-match caching (ollama_client v1.4.0)
+#   misses paraphrases; this keeps (unit query embedding, answer) pairs and serves a stored answer
+#   when a new query's cosine similarity to a cached one is >= CONFIG.rag.semantic_cache_threshold.
+#   Entries are partitioned by every knob that changes the answer (corpus, model, entity filter,
+#   scope, top_k, ...), so a paraphrase only ever matches within an identical request shape — a
+#   BNP query can never be answered from an HSBC entry. LRU + TTL eviction. OFF by default.
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import numpy as np
+
+
+def _unit(vec: list[float]) -> np.ndarray:
+    arr = np.asarray(vec, dtype=np.float32)
+    norm = float(np.linalg.norm(arr))
+    return arr / norm if norm else arr
+
+
+class SemanticCache:
+    """Cosine-similarity answer cache over L2-normalized query embeddings.
+
+    A brute-force inner-product scan (the IndexFlatIP approach) over at most `capacity` entries per
+    process — small enough that a vector index library buys nothing. Vectors are rows of one float32
+    matrix, so a lookup is a single matmul. Thread-safe; the lock is held only for the scan / insert,
+    never across embedding or generation calls.
+    """
+
+    def __init__(self, *, threshold: float, ttl_s: float, capacity: int = 512) -> None:
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.capacity = capacity
+        # id -> (partition, row of _vecs, value, inserted_at)
+        self._entries: OrderedDict[int, tuple[str, int, Any, float]] = OrderedDict()
+        self._vecs: np.ndarray | None = None  # (capacity, dim) float32, allocated on first add
+        self._free_rows: list[int] = []
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, *, partition: str, embedding: list[float]) -> Any | None:
+        """Return the cached value most similar to `embedding` within `partition`, or None."""
+        q = _unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            ids: list[int] = []
+            rows: list[int] = []
+            for entry_id, (part, row, _value, ts) in list(self._entries.items()):
+                if now - ts > self.ttl_s:
+                    self._drop(entry_id)
+                    continue
+                if part == partition:
+                    ids.append(entry_id)
+                    rows.append(row)
+            best_id = None
+            if rows and self._vecs is not None and self._vecs.shape[1] == q.shape[0]:
+                sims = self._vecs[rows] @ q
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    best_id = ids[best]
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][2]
+
+    def add(self, *, partition: str, embedding: list[float], value: Any) -> None:
+        if self.capacity <= 0:
+            return
+        vec = _unit(embedding)
+        with self._lock:
+            if self._vecs is None or self._vecs.shape[1] != vec.shape[0]:
+                # First add, or the embedding model changed dimension: start over.
+                self._entries.clear()
+                self._vecs = np.zeros((self.capacity, vec.shape[0]), dtype=np.float32)
+                self._free_rows = list(range(self.capacity - 1, -1, -1))
+            if not self._free_rows:
+                self._drop(next(iter(self._entries)))
+            row = self._free_rows.pop()
+            self._vecs[row] = vec
+            self._entries[self._next_id] = (partition, row, value, time.monotonic())
+            self._next_id += 1
+
+    def _drop(self, entry_id: int) -> None:
+        """Remove one entry and free its matrix row. Caller holds the lock."""
+        _part, row, _value, _ts = self._entries.pop(entry_id)
+        self._free_rows.append(row)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -7,10 +7,16 @@ def corpus_base_dir(repo_root: Path, corpus: str) -> Path:
     return repo_root / "data" / "corpora" / corpus
 
 
+# Base dirs already created by this process: corpus_paths runs on every query and endpoint
+# call, and only the first call per corpus needs the mkdir. Writers (ingest, corpus creation,
+# uploads) create their own directories, so a corpus deleted later is still recreated by them.
+_ensured: set[Path] = set()
+
+
 def corpus_paths(repo_root: Path, corpus: str) -> dict[str, Path]:
     """
     Return all data artifact paths for a named corpus.
-    Creates the base directory if needed.
+    Creates the base directory the first time it is asked for in this process.
 
     Path layout:
         data/corpora/<n>/
@@ -18,13 +24,16 @@ def corpus_paths(repo_root: Path, corpus: str) -> dict[str, Path]:
             trash/            ← deleted files (sibling of uploads, not inside it)
             index.jsonl       ← chunk metadata (JSONL — legacy, kept as audit log)
             manifest.jsonl    ← ingest manifest (JSONL — legacy, kept as audit log)
+            doc_chunk_map.jsonl ← doc_id → chunk_ids append log (last entry per doc wins)
             ingest_failures.jsonl
 
     trash/ is a sibling of uploads/, not a subdirectory.
     This ensures pipeline.py ingest (rooted at uploads/) never sees deleted files.
     """
     base = corpus_base_dir(repo_root, corpus)
-    base.mkdir(parents=True, exist_ok=True)
+    if base not in _ensured:
+        base.mkdir(parents=True, exist_ok=True)
+        _ensured.add(base)
 
     return {
         "base": base,
@@ -32,6 +41,7 @@ def corpus_paths(repo_root: Path, corpus: str) -> dict[str, Path]:
         "trash": base / "trash",  # sibling of uploads/ — never inside it
         "index": base / "index.jsonl",
         "manifest": base / "manifest.jsonl",
+        "docmap": base / "doc_chunk_map.jsonl",
         "failures": base / "ingest_failures.jsonl",
     }
 
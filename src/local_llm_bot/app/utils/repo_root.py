@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+from functools import cache
 from pathlib import Path
 
 
 def find_repo_root(start: Path) -> Path:
     """
     Walk up from `start` until we find pyproject.toml.
+
+    Memoized per start path (callers pass Path(__file__) on every stats/ingest call), so the
+    upward stat walk runs once per process. Relative starts are resolved first so a later
+    chdir cannot return a stale root.
     """
-    p = start.resolve()
+    key = str(start) if start.is_absolute() else str(start.resolve())
+    return _find_repo_root_cached(key)
+
+
+@cache
+def _find_repo_root_cached(start: str) -> Path:
+    p = Path(start).resolve()
     for _ in range(15):
         if (p / "pyproject.toml").exists():
             return p
@@ -4,16 +4,18 @@ from __future__ import annotations
 import os
 from collections.abc import Callable
 from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
 from typing import Any
 
 import chromadb
+import numpy as np
 
 from local_llm_bot.app.config import CONFIG
-from local_llm_bot.app.ollama_client import ollama_embed
+from local_llm_bot.app.ollama_client import embed_query_with_cache, ollama_embed_batches
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ChromaHit:
     chunk_id: str
     text: str
@@ -23,10 +25,40 @@ class ChromaHit:
 
 def get_client(persist_dir: Path) -> chromadb.ClientAPI:
     """
-    Create a persistent Chroma client rooted at persist_dir.
+    Persistent Chroma client rooted at persist_dir, created once per directory per process.
     """
-    persist_dir.mkdir(parents=True, exist_ok=True)
-    return chromadb.PersistentClient(path=str(persist_dir))
+    return _client_for(str(persist_dir))
+
+
+@cache
+def _client_for(persist_dir: str) -> chromadb.ClientAPI:
+    Path(persist_dir).mkdir(parents=True, exist_ok=True)
+    return chromadb.PersistentClient(path=persist_dir)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        v = int(os.getenv(name, ""))
+    except ValueError:
+        return default
+    return v if v > 0 else default
+
+
+def _hnsw_metadata() -> dict[str, Any]:
+    """HNSW settings for new collections (Chroma's default space is l2; AIStudio scores cosine).
+
+    Overridable per process: AISTUDIO_CHROMA_HNSW_M / _CONSTRUCTION_EF / _SEARCH_EF.
+    """
+    return {
+        "hnsw:space": "cosine",
+        "hnsw:M": _env_int("AISTUDIO_CHROMA_HNSW_M", 16),
+        "hnsw:construction_ef": _env_int("AISTUDIO_CHROMA_HNSW_CONSTRUCTION_EF", 200),
+        "hnsw:search_ef": _env_int("AISTUDIO_CHROMA_HNSW_SEARCH_EF", 64),
+    }
+
+
+# Opened collections by (client, name); clients are cached, so their ids are stable.
+_COLLECTIONS: dict[tuple[int, str], chromadb.Collection] = {}
 
 
 def get_or_create_collection(
@@ -35,19 +67,17 @@ def get_or_create_collection(
     name: str,
     metadata: dict[str, Any] | None = None,
 ) -> chromadb.Collection:
+    key = (id(client), name)
+    col = _COLLECTIONS.get(key)
+    if col is not None:
+        return col
     try:
-        return client.get_collection(name=name)
+        col = client.get_collection(name=name)
     except Exception:
-        if metadata is None:
-            # IMPORTANT: do NOT pass empty metadata
-            return client.create_collection(name=name)
-        return client.create_collection(name=name, metadata=metadata)
-
-
-def _batched[T](items: list[T], batch_size: int) -> list[list[T]]:
-    if batch_size <= 0:
-        return [items]
-    return [items[i : i + batch_size] for i in range(0, len(items), batch_size)]
+        # IMPORTANT: do NOT pass empty metadata
+        col = client.create_collection(name=name, metadata=metadata or _hnsw_metadata())
+    _COLLECTIONS[key] = col
+    return col
 
 
 def upsert_chunks(
@@ -64,8 +94,11 @@ def upsert_chunks(
     """
     Upsert chunk documents into Chroma using embeddings from Ollama.
 
-    - Embeds in batches (default CONFIG.vectorstore.embed_batch_size, else 32)
-    - Calls on_batch_done(n) after each batch (for progress bars)
+    - Embeds in batches (default CONFIG.vectorstore.embed_batch_size, else 32), up to
+      CONFIG.rag.embed_concurrency of them in flight
+    - Writes to Chroma in larger upserts of at least AISTUDIO_CHROMA_UPSERT_FLUSH (default
+      1024) chunks, so each SQLite commit and HNSW insert pass covers many embed batches
+    - Calls on_batch_done(n) after each embed batch (for progress bars)
     """
     if not (len(ids) == len(documents) == len(metadatas)):
         raise ValueError("ids, documents, and metadatas must be the same length")
@@ -88,21 +121,37 @@ def upsert_chunks(
     if bs <= 0:
         bs = DEFAULT_EMBED_BATCH_SIZE
 
-    # process in aligned batches
-    for idx_batch in _batched(list(range(len(ids))), bs):
-        b_ids = [ids[i] for i in idx_batch]
-        b_docs = [documents[i] for i in idx_batch]
-        b_metas = [metadatas[i] for i in idx_batch]
+    flush_at = _env_int("AISTUDIO_CHROMA_UPSERT_FLUSH", 1024)
 
-        # NOTE: ollama_embed must return list[list[float]] aligned with b_docs
-        b_embs = ollama_embed(model=embed_model, texts=b_docs)
-        if not isinstance(b_embs, list) or len(b_embs) != len(b_docs):
+    # process in aligned slices; later batches embed concurrently while earlier ones upsert
+    starts = range(0, len(ids), bs)
+    embedded = ollama_embed_batches(
+        model=embed_model, batches=(documents[i : i + bs] for i in starts)
+    )
+    # Embedded but not yet written: inputs [lo, hi) and their per-batch embedding arrays.
+    lo = 0
+    pending: list[np.ndarray] = []
+    for i, b_embs in zip(starts, embedded, strict=True):
+        b_docs = documents[i : i + bs]
+
+        # One float32 array aligned with b_docs; Chroma takes it without re-converting lists.
+        b_arr = np.ascontiguousarray(b_embs, dtype=np.float32)
+        if b_arr.ndim != 2 or b_arr.shape[0] != len(b_docs):
             raise ValueError("Embedding backend returned wrong shape")
-
-        col.upsert(ids=b_ids, documents=b_docs, metadatas=b_metas, embeddings=b_embs)
+        pending.append(b_arr)
+
+        hi = i + len(b_docs)
+        if hi - lo >= flush_at or hi == len(ids):
+            col.upsert(
+                ids=ids[lo:hi],
+                documents=documents[lo:hi],
+                metadatas=metadatas[lo:hi],
+                embeddings=pending[0] if len(pending) == 1 else np.concatenate(pending),
+            )
+            lo, pending = hi, []
 
         if on_batch_done is not None:
-            on_batch_done(len(b_ids))
+            on_batch_done(len(b_docs))
 
 
 def delete_chunks(*, persist_dir: Path, collection_name: str, ids: list[str]) -> None:
@@ -116,6 +165,14 @@ def delete_chunks(*, persist_dir: Path, collection_name: str, ids: list[str]) ->
     col.delete(ids=ids)
 
 
+# Fields query() asks Chroma for: CONFIG.chroma.query_include, fixed per process.
+# Important: Chroma "include" does NOT accept "ids" (ids are returned separately), so any
+# accidental "ids" is stripped.
+_QUERY_INCLUDE: tuple[str, ...] = tuple(
+    x for x in CONFIG.chroma.query_include or ("documents", "metadatas", "distances") if x != "ids"
+)
+
+
 def query(
     *,
     persist_dir: Path,
@@ -131,21 +188,12 @@ def query(
     client = get_client(persist_dir)
     col = get_or_create_collection(client=client, name=collection_name)
 
-    q_emb = ollama_embed(model=embed_model, texts=[query_text])[0]
-
-    # Important: Chroma "include" does NOT accept "ids" (ids are returned separately)
-    # Important: Chroma "include" does NOT accept "ids" (ids are returned separately)
-    include = getattr(CONFIG.rag, "chroma_query_include", None)
-    if not include:
-        include = ["documents", "metadatas", "distances"]
-
-    # Defensive: strip any accidental "ids"
-    include = [x for x in list(include) if x != "ids"]
+    q_emb = embed_query_with_cache(model=embed_model, text=query_text)
 
     res = col.query(
         query_embeddings=[q_emb],
         n_results=int(top_k),
-        include=list(include),
+        include=list(_QUERY_INCLUDE),
     )
 
     ids = (res.get("ids") or [[]])[0]
@@ -153,14 +201,13 @@ def query(
     metas = (res.get("metadatas") or [[]])[0]
     dists = (res.get("distances") or [[]])[0]
 
-    out: list[ChromaHit] = []
-    for cid, doc, meta, dist in zip(ids, docs, metas, dists, strict=False):
-        out.append(
-            ChromaHit(
-                chunk_id=str(cid),
-                text=str(doc),
-                metadata=dict(meta or {}),
-                distance=float(dist) if dist is not None else 0.0,
-            )
+    # Chroma returns fresh metadata dicts per query, so they are used as-is (no copy).
+    return [
+        ChromaHit(
+            chunk_id=str(cid),
+            text=str(doc),
+            metadata=meta or {},
+            distance=0.0 if dist is None else float(dist),
         )
-    return out
+        for cid, doc, meta, dist in zip(ids, docs, metas, dists, strict=False)
+    ]
@@ -1,5 +1,34 @@
 # src/local_llm_bot/app/vectorstore/qdrant_store.py
-# Version: 1.3.1
+# Version: 1.3.11
+# Changelog: 1.3.11 — stale_chunk_ids(collection_name, source_path, keep): the chunk_ids a
+#             file still has in the collection that its re-upserted version did not write.
+# Changelog: 1.3.10 — Points carry content_hash (blake2b of embed model + text). With
+#             upsert_chunks(skip_unchanged=True) each batch's stored points are retrieved
+#             first and chunks whose hash matches keep their stored vector; only the rest go
+#             to Ollama. Ingest sets it for files already in the collection, so re-ingesting a
+#             lightly edited file embeds only its changed chunks. Hits hide content_hash.
+# Changelog: 1.3.9 — QdrantHit is a slots dataclass (no per-hit __dict__).
+# Changelog: 1.3.8 — int8 vector queries oversample and rescore explicitly: query() passes
+#             QuantizationSearchParams(rescore=True, oversampling=AISTUDIO_VECTOR_OVERSAMPLING,
+#             default 2.0), so the int8 pass returns top_k * 2 candidates that Qdrant re-ranks on
+#             the full-precision vectors kept on disk. fp32 / fp16 queries are unchanged.
+# Changelog: 1.3.7 — get_client() returns one cached QdrantClient per process instead of a new
+#             client (and connection pool) per call, and _ensure_collection remembers the
+#             collections it has checked (_ENSURED), so queries and per-file upserts no longer
+#             pay get_collections + three create_payload_index round-trips each.
+# Changelog: 1.3.6 — upsert_chunks cuts its batches as slices of ids/documents/metadatas, handed
+#             to the embedder lazily, instead of building an index list and gathering by index.
+# Changelog: 1.3.5 — upsert_chunks embeds through ollama_client.ollama_embed_batches, keeping up
+#             to CONFIG.rag.embed_concurrency batches in flight while earlier ones are upserted.
+# Changelog: 1.3.4 — upsert_chunks accepts on_embedded(ids, documents, metadatas, embeddings),
+#             called per batch after Ollama embeds it — lets ingest mirror the same vectors into
+#             sqlite_vec_store without embedding twice.
+# Changelog: 1.3.3 — AISTUDIO_VECTOR_QUANT (fp32 | fp16 | int8, default fp32) selects the vector
+#             storage of newly created collections: fp16 stores half-precision vectors, int8
+#             adds Qdrant scalar quantization (originals kept on disk, int8 copy in RAM, rescored).
+#             Existing collections are untouched; re-ingest to change an existing one.
+# Changelog: 1.3.2 — query() embeds the query via ollama_client.embed_query_with_cache, so a
+#             repeated query text skips the Ollama embedding round-trip.
 # Changelog: 1.3.1 — AIStudio_891: index `firm` payload field (TEXT) in _ensure_text_index
 #             so _build_entity_filter's firm-match clause works — corpus-agnostic entity
 #             isolation keyed on the chunk's own entity, not source_path/filename. Pairs
@@ -40,24 +69,34 @@
 from __future__ import annotations
 
 import contextlib
+import hashlib
 import os
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
 from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
 from typing import Any
 
 from qdrant_client import QdrantClient
 from qdrant_client.models import (
+    Datatype,
     Distance,
     FieldCondition,
     Filter,
     MatchText,
+    MatchValue,
     PayloadSchemaType,
+    PayloadSelectorInclude,
     PointStruct,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
     VectorParams,
 )
 
-from local_llm_bot.app.ollama_client import ollama_embed
+from local_llm_bot.app.ollama_client import embed_query_with_cache, ollama_embed_batches
 
 # Qdrant runs locally on port 6333 by default
 QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
@@ -69,8 +108,15 @@ VECTOR_SIZE = int(os.getenv("AISTUDIO_VECTOR_SIZE", "768"))
 
 DEFAULT_EMBED_BATCH_SIZE = 32
 
+# Vector storage precision for new collections — fp32 (default), fp16 (half the vector bytes)
+# or int8 (scalar quantization, ~4x smaller in RAM; originals kept on disk for rescoring).
+VECTOR_QUANT = os.getenv("AISTUDIO_VECTOR_QUANT", "fp32").strip().lower()
+# int8 queries fetch top_k * VECTOR_OVERSAMPLING candidates on the quantized vectors, then
+# rescore them against the full-precision originals.
+VECTOR_OVERSAMPLING = float(os.getenv("AISTUDIO_VECTOR_OVERSAMPLING", "2.0"))
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class QdrantHit:
     """Mirrors ChromaHit exactly so rag_core.py needs no changes."""
 
@@ -80,25 +126,63 @@ class QdrantHit:
     distance: float
 
 
+@cache
 def get_client() -> QdrantClient:
-    """Return a Qdrant client connected to the local server."""
+    """Return the process's Qdrant client connected to the local server (one connection pool)."""
     return QdrantClient(host=QDRANT_HOST, port=QDRANT_PORT)
 
 
+# Collections this process has already created or checked, payload indexes included. Every
+# upsert and query calls _ensure_collection; once a name is here it costs no round-trips.
+# delete_collection removes the name again.
+_ENSURED: set[str] = set()
+
+
 def _ensure_collection(client: QdrantClient, collection_name: str) -> None:
     """Create collection if it doesn't exist. Also ensures text index on `text` payload field."""
+    if collection_name in _ENSURED:
+        return
     existing = [c.name for c in client.get_collections().collections]
     if collection_name not in existing:
         client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(
-                size=VECTOR_SIZE,
-                distance=Distance.COSINE,  # Cosine similarity — standard for text embeddings
-            ),
+            vectors_config=_vector_params(VECTOR_QUANT),
+            quantization_config=_quantization_config(VECTOR_QUANT),
         )
     # Ensure text index exists on every collection (idempotent — no-ops if already present).
     # This enables BM25-style full-text retrieval via query_bm25() alongside vector retrieval.
     _ensure_text_index(client, collection_name)
+    _ENSURED.add(collection_name)
+
+
+def _vector_params(quant: str) -> VectorParams:
+    """VectorParams for a new collection; fp16 switches the stored datatype to float16."""
+    return VectorParams(
+        size=VECTOR_SIZE,
+        distance=Distance.COSINE,  # Cosine similarity — standard for text embeddings
+        datatype=Datatype.FLOAT16 if quant == "fp16" else None,
+        on_disk=True if quant == "int8" else None,
+    )
+
+
+def _quantization_config(quant: str) -> ScalarQuantization | None:
+    """Scalar int8 quantization kept in RAM for int8; None (no quantization) otherwise."""
+    if quant != "int8":
+        return None
+    return ScalarQuantization(
+        scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+    )
+
+
+def _search_params(quant: str) -> SearchParams | None:
+    """Two-stage int8 search (oversample on int8, rescore on originals); None otherwise."""
+    if quant != "int8":
+        return None
+    return SearchParams(
+        quantization=QuantizationSearchParams(
+            rescore=True, oversampling=max(1.0, VECTOR_OVERSAMPLING)
+        )
+    )
 
 
 def _ensure_text_index(client: QdrantClient, collection_name: str) -> None:
@@ -147,10 +231,32 @@ def _ensure_text_index(client: QdrantClient, collection_name: str) -> None:
         )
 
 
-def _batched(items: list, batch_size: int) -> list[list]:
-    if batch_size <= 0:
-        return [items]
-    return [items[i : i + batch_size] for i in range(0, len(items), batch_size)]
+# Payload fields that are not chunk metadata (query hits expose the rest as .metadata).
+_NON_METADATA_KEYS = frozenset({"chunk_id", "text", "content_hash"})
+
+
+def _content_hash(embed_model: str, text: str) -> str:
+    """Identifies a chunk's vector: the same text under the same model embeds the same."""
+    return hashlib.blake2b(f"{embed_model}\0{text}".encode(), digest_size=16).hexdigest()
+
+
+def _stored_vectors(
+    client: QdrantClient, collection_name: str, ids: list[str], hashes: list[str]
+) -> dict[int, list[float]]:
+    """Positions in `ids` whose stored point has the same content_hash, with its vector."""
+    found = client.retrieve(
+        collection_name=collection_name,
+        ids=[_chunk_id_to_uint64(cid) for cid in ids],
+        with_payload=PayloadSelectorInclude(include=["content_hash"]),
+        with_vectors=True,
+    )
+    by_id = {p.id: p for p in found}
+    out: dict[int, list[float]] = {}
+    for pos, (cid, h) in enumerate(zip(ids, hashes, strict=True)):
+        p = by_id.get(_chunk_id_to_uint64(cid))
+        if p is not None and p.vector is not None and (p.payload or {}).get("content_hash") == h:
+            out[pos] = list(p.vector)
+    return out
 
 
 def _chunk_id_to_uint64(chunk_id: str) -> int:
@@ -159,8 +265,6 @@ def _chunk_id_to_uint64(chunk_id: str) -> int:
     We hash the string chunk_id to a stable uint64.
     Collision probability is negligible for corpus sizes we target.
     """
-    import hashlib
-
     h = hashlib.sha256(chunk_id.encode()).digest()
     return int.from_bytes(h[:8], "big")
 
@@ -175,10 +279,18 @@ def upsert_chunks(
     metadatas: list[dict[str, Any]],
     on_batch_done: Callable[[int], None] | None = None,
     batch_size: int | None = None,
+    on_embedded: Callable[[list[str], list[str], list[dict[str, Any]], list[list[float]]], None]
+    | None = None,
+    skip_unchanged: bool = False,
 ) -> None:
     """
     Upsert chunk documents into Qdrant using embeddings from Ollama.
     API-compatible with chroma_store.upsert_chunks.
+    on_embedded, when set, receives each batch's ids/documents/metadatas/embeddings after the
+    Qdrant write (ingest uses it to dual-write the sqlite-vec mirror).
+    Every point carries a content_hash of (embed_model, text). With skip_unchanged, each
+    batch's stored points are fetched first and a chunk whose hash matches reuses its stored
+    vector instead of being embedded again (ingest sets it for files already in the store).
     """
     if not (len(ids) == len(documents) == len(metadatas)):
         raise ValueError("ids, documents, and metadatas must be the same length")
@@ -198,14 +310,39 @@ def upsert_chunks(
     if bs <= 0:
         bs = DEFAULT_EMBED_BATCH_SIZE
 
-    for idx_batch in _batched(list(range(len(ids))), bs):
-        b_ids = [ids[i] for i in idx_batch]
-        b_docs = [documents[i] for i in idx_batch]
-        b_metas = [metadatas[i] for i in idx_batch]
+    # Later batches are embedded (ollama_embed_batches) while each finished one is upserted.
+    # Batches are slices of the inputs, cut only as the embedder takes them: no index lists, and
+    # just the in-flight batches' document lists exist at once.
+    starts = range(0, len(ids), bs)
+    hashes = [_content_hash(embed_model, doc) for doc in documents]
+    # Batch start -> {position in batch: stored vector} for chunks that need no embedding.
+    reused: dict[int, dict[int, list[float]]] = {}
+
+    def _to_embed() -> Iterator[list[str]]:
+        for i in starts:
+            b_docs = documents[i : i + bs]
+            if not skip_unchanged:
+                yield b_docs
+                continue
+            have = reused[i] = _stored_vectors(
+                client, collection_name, ids[i : i + bs], hashes[i : i + bs]
+            )
+            yield [doc for pos, doc in enumerate(b_docs) if pos not in have]
+
+    embedded = ollama_embed_batches(model=embed_model, batches=_to_embed())
+    for i, new_embs in zip(starts, embedded, strict=True):
+        b_ids = ids[i : i + bs]
+        b_docs = documents[i : i + bs]
+        b_metas = metadatas[i : i + bs]
+        have = reused.pop(i, {})
 
-        b_embs = ollama_embed(model=embed_model, texts=b_docs)
-        if not isinstance(b_embs, list) or len(b_embs) != len(b_docs):
+        if not isinstance(new_embs, list) or len(new_embs) != len(b_docs) - len(have):
             raise ValueError("Embedding backend returned wrong shape")
+        if have:
+            fresh = iter(new_embs)
+            b_embs = [have[pos] if pos in have else next(fresh) for pos in range(len(b_docs))]
+        else:
+            b_embs = new_embs
 
         points = [
             PointStruct(
@@ -214,14 +351,20 @@ def upsert_chunks(
                 payload={
                     "chunk_id": cid,
                     "text": doc,
+                    "content_hash": h,
                     **meta,  # source_path, page, chunk_index, etc.
                 },
             )
-            for cid, doc, emb, meta in zip(b_ids, b_docs, b_embs, b_metas, strict=False)
+            for cid, doc, h, emb, meta in zip(
+                b_ids, b_docs, hashes[i : i + bs], b_embs, b_metas, strict=False
+            )
         ]
 
         client.upsert(collection_name=collection_name, points=points)
 
+        if on_embedded is not None:
+            on_embedded(b_ids, b_docs, b_metas, b_embs)
+
         if on_batch_done is not None:
             on_batch_done(len(b_ids))
 
@@ -243,6 +386,33 @@ def delete_chunks(
     )
 
 
+def stale_chunk_ids(*, collection_name: str, source_path: str, keep: set[str]) -> list[str]:
+    """chunk_ids stored for `source_path` that are not in `keep`.
+
+    After a file is upserted again, these are the chunks its new version no longer has; an
+    unchanged id set yields []. One filtered scroll, chunk_id payload only.
+    """
+    client = get_client()
+    path_filter = Filter(must=[FieldCondition(key="source_path", match=MatchValue(value=source_path))])
+    stale: list[str] = []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=path_filter,
+            limit=1000,
+            offset=offset,
+            with_payload=PayloadSelectorInclude(include=["chunk_id"]),
+            with_vectors=False,
+        )
+        for p in points:
+            cid = (p.payload or {}).get("chunk_id")
+            if cid is not None and cid not in keep:
+                stale.append(str(cid))
+        if offset is None:
+            return stale
+
+
 def _build_entity_filter(entity_filter: list[str]) -> Filter:
     """
     AIStudio_798: Build a Qdrant OR filter matching source_path against any of the
@@ -283,7 +453,7 @@ def query(
     client = get_client()
     _ensure_collection(client, collection_name)
 
-    q_emb = ollama_embed(model=embed_model, texts=[query_text])[0]
+    q_emb = embed_query_with_cache(model=embed_model, text=query_text)
 
     # AIStudio_798: per-question entity_filter (OR over source_path substrings).
     # AIStudio_882: allowed_source_paths is the scope boundary — a second OR-clause ANDed
@@ -303,6 +473,7 @@ def query(
         limit=int(top_k),
         with_payload=True,
         query_filter=_query_filter,
+        search_params=_search_params(VECTOR_QUANT),
     ).points
 
     out: list[QdrantHit] = []
@@ -312,7 +483,7 @@ def query(
             QdrantHit(
                 chunk_id=str(payload.get("chunk_id", hit.id)),
                 text=str(payload.get("text", "")),
-                metadata={k: v for k, v in payload.items() if k not in ("chunk_id", "text")},
+                metadata={k: v for k, v in payload.items() if k not in _NON_METADATA_KEYS},
                 # Qdrant returns score = cosine similarity (higher = better)
                 # Convert to distance (lower = better) for API compatibility
                 distance=float(1.0 - hit.score),
@@ -411,7 +582,7 @@ def query_bm25(
             QdrantHit(
                 chunk_id=str(payload.get("chunk_id", hit.id)),
                 text=str(payload.get("text", "")),
-                metadata={k: v for k, v in payload.items() if k not in ("chunk_id", "text")},
+                metadata={k: v for k, v in payload.items() if k not in _NON_METADATA_KEYS},
                 distance=float(hit.score),  # Raw BM25 score — scoring.py handles normalization
             )
         )
@@ -421,6 +592,7 @@ def query_bm25(
 def delete_collection(*, collection_name: str) -> None:
     """Delete an entire Qdrant collection. Used by --force ingest to ensure clean state."""
     client = get_client()
+    _ENSURED.discard(collection_name)
     existing = [c.name for c in client.get_collections().collections]
     if collection_name in existing:
         client.delete_collection(collection_name=collection_name)
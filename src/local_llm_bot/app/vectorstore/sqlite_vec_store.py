@@ -0,0 +1,303 @@
+# src/local_llm_bot/app/vectorstore/sqlite_vec_store.py
+# Version: 1.0.5
+# Changelog: 1.0.5 — upsert_embeddings converts a batch's embeddings to one contiguous float32
+#             array (rejecting ragged batches) and writes each row's bytes, instead of a
+#             serialize_float32 struct.pack per vector.
+# Changelog: 1.0.4 — SqliteVecHit is a slots dataclass (no per-hit __dict__).
+# Changelog: 1.0.3 — upsert_chunks batches by slicing its inputs (lazily, as the embedder takes
+#             each batch) rather than through an index list.
+# Changelog: 1.0.2 — upsert_chunks embeds through ollama_client.ollama_embed_batches (up to
+#             CONFIG.rag.embed_concurrency batches in flight).
+# Changelog: 1.0.1 — Chunk metadata is encoded/decoded with orjson when installed (stdlib json
+#             otherwise): one call per chunk on the ingest mirror write and per hit on query.
+# Changelog: 1.0.0 — File-backed KNN backend on sqlite-vec's vec0 virtual table. One SQLite file
+#             per corpus (data/corpora/<n>/vectors.sqlite): `chunks` holds chunk_id/text/metadata,
+#             `vec_chunks` (vec0, cosine) holds the embeddings under the same rowid, and query()
+#             is a single indexed `MATCH ... AND k = ?` lookup — no server, no linear scan.
+#             Selected with AISTUDIO_VECTORSTORE=sqlite_vec; ingest dual-writes into it from the
+#             Qdrant upsert (qdrant_store.upsert_chunks on_embedded). Optional dependency: when
+#             sqlite-vec is missing or the interpreter cannot load extensions, available() is
+#             False and rag_core stays on Qdrant.
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from local_llm_bot.app.ollama_client import embed_query_with_cache, ollama_embed_batches
+from local_llm_bot.app.utils.corpus_paths import corpus_base_dir
+from local_llm_bot.app.utils.repo_root import find_repo_root
+
+try:
+    import sqlite_vec as _sqlite_vec
+except ImportError:  # optional backend — rag_core falls back to Qdrant
+    _sqlite_vec = None
+
+try:
+    import orjson as _orjson
+except ImportError:  # optional — stdlib json stores the same metadata (ASCII-escaped)
+    _orjson = None
+
+
+def _meta_dumps(meta: dict[str, Any]) -> str:
+    if _orjson is not None:
+        return _orjson.dumps(meta).decode("utf-8")
+    return json.dumps(meta)
+
+
+def _meta_loads(raw: str) -> dict[str, Any]:
+    return _orjson.loads(raw) if _orjson is not None else json.loads(raw)
+
+# Must match the embedding model (nomic-embed-text = 768); shared with qdrant_store.
+VECTOR_SIZE = int(os.getenv("AISTUDIO_VECTOR_SIZE", "768"))
+
+DEFAULT_EMBED_BATCH_SIZE = 32
+
+# vec0 has no substring filters, so a filtered query over-fetches and leaves the entity/scope
+# match to rag_core's post-filter backstop.
+_FILTER_OVERFETCH = 4
+
+_DB_FILENAME = "vectors.sqlite"
+_COLLECTION_PREFIX = "aistudio_"
+
+_LOCK = threading.Lock()
+_CONNECTIONS: dict[Path, sqlite3.Connection] = {}
+_AVAILABLE: bool | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class SqliteVecHit:
+    """Mirrors QdrantHit exactly so rag_core.py needs no changes."""
+
+    chunk_id: str
+    text: str
+    metadata: dict[str, Any]
+    distance: float
+
+
+def _load_extension(conn: sqlite3.Connection) -> None:
+    if _sqlite_vec is None:
+        raise RuntimeError("sqlite-vec is not installed")
+    conn.enable_load_extension(True)
+    try:
+        _sqlite_vec.load(conn)
+    finally:
+        conn.enable_load_extension(False)
+
+
+def available() -> bool:
+    """True when sqlite-vec is installed and this interpreter can load SQLite extensions."""
+    global _AVAILABLE
+    if _AVAILABLE is None:
+        try:
+            conn = sqlite3.connect(":memory:")
+            try:
+                _load_extension(conn)
+            finally:
+                conn.close()
+            _AVAILABLE = True
+        except Exception:  # noqa: BLE001 — missing package, or sqlite3 built without extensions
+            _AVAILABLE = False
+    return _AVAILABLE
+
+
+def db_path(collection_name: str) -> Path:
+    """SQLite file for a collection — lives in the corpus directory, next to index.jsonl."""
+    corpus = collection_name.removeprefix(_COLLECTION_PREFIX)
+    return corpus_base_dir(find_repo_root(Path(__file__)), corpus) / _DB_FILENAME
+
+
+def _connection(collection_name: str) -> sqlite3.Connection:
+    """Cached connection per collection file; callers hold _LOCK while using it."""
+    path = db_path(collection_name)
+    conn = _CONNECTIONS.get(path)
+    if conn is None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        _load_extension(conn)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "rowid INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE, "
+            "source_path TEXT, text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS chunks_source_path ON chunks(source_path)")
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS vec_chunks USING "
+            f"vec0(embedding float[{VECTOR_SIZE}] distance_metric=cosine)"
+        )
+        conn.commit()
+        _CONNECTIONS[path] = conn
+    return conn
+
+
+def upsert_embeddings(
+    *,
+    collection_name: str,
+    ids: list[str],
+    documents: list[str],
+    metadatas: list[dict[str, Any]],
+    embeddings: list[list[float]],
+) -> None:
+    """Write already-embedded chunks; replaces any existing row with the same chunk_id."""
+    if not (len(ids) == len(documents) == len(metadatas) == len(embeddings)):
+        raise ValueError("ids, documents, metadatas, and embeddings must be the same length")
+    if not ids:
+        return
+    # One float32 conversion for the batch (also checks every vector has the same width); each
+    # row's bytes are the blob vec0 takes, with no per-vector struct.pack.
+    vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if vectors.ndim != 2:
+        raise ValueError("embeddings must all have the same dimension")
+    with _LOCK:
+        conn = _connection(collection_name)
+        with conn:
+            for cid, doc, meta, vec in zip(ids, documents, metadatas, vectors, strict=True):
+                (rowid,) = conn.execute(
+                    "INSERT INTO chunks(chunk_id, source_path, text, metadata) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(chunk_id) DO UPDATE SET source_path = excluded.source_path, "
+                    "text = excluded.text, metadata = excluded.metadata RETURNING rowid",
+                    (cid, meta.get("source_path"), doc, _meta_dumps(meta)),
+                ).fetchone()
+                # vec0 has no UPSERT — replace the vector under the chunk's rowid.
+                conn.execute("DELETE FROM vec_chunks WHERE rowid = ?", (rowid,))
+                conn.execute(
+                    "INSERT INTO vec_chunks(rowid, embedding) VALUES (?, ?)",
+                    (rowid, vec.tobytes()),
+                )
+
+
+def upsert_chunks(
+    *,
+    persist_dir: Path,  # API compatibility with qdrant_store — not used
+    collection_name: str,
+    embed_model: str,
+    ids: list[str],
+    documents: list[str],
+    metadatas: list[dict[str, Any]],
+    on_batch_done: Callable[[int], None] | None = None,
+    batch_size: int | None = None,
+) -> None:
+    """
+    Embed and upsert chunk documents. API-compatible with qdrant_store.upsert_chunks.
+    """
+    if not (len(ids) == len(documents) == len(metadatas)):
+        raise ValueError("ids, documents, and metadatas must be the same length")
+    bs = int(batch_size) if batch_size else DEFAULT_EMBED_BATCH_SIZE
+    starts = range(0, len(ids), bs)
+    embedded = ollama_embed_batches(
+        model=embed_model, batches=(documents[i : i + bs] for i in starts)
+    )
+    for i, b_embs in zip(starts, embedded, strict=True):
+        b_docs = documents[i : i + bs]
+        if not isinstance(b_embs, list) or len(b_embs) != len(b_docs):
+            raise ValueError("Embedding backend returned wrong shape")
+        upsert_embeddings(
+            collection_name=collection_name,
+            ids=ids[i : i + bs],
+            documents=b_docs,
+            metadatas=metadatas[i : i + bs],
+            embeddings=b_embs,
+        )
+        if on_batch_done is not None:
+            on_batch_done(len(b_docs))
+
+
+def _delete_rowids(conn: sqlite3.Connection, rowids: list[int]) -> None:
+    for rowid in rowids:
+        conn.execute("DELETE FROM vec_chunks WHERE rowid = ?", (rowid,))
+        conn.execute("DELETE FROM chunks WHERE rowid = ?", (rowid,))
+
+
+def delete_chunks(
+    *,
+    persist_dir: Path | None = None,  # API compatibility — not used
+    collection_name: str,
+    ids: list[str],
+) -> None:
+    """Delete chunks by string chunk_id."""
+    if not ids:
+        return
+    with _LOCK:
+        conn = _connection(collection_name)
+        with conn:
+            rowids = [
+                r[0]
+                for cid in ids
+                for r in conn.execute("SELECT rowid FROM chunks WHERE chunk_id = ?", (cid,))
+            ]
+            _delete_rowids(conn, rowids)
+
+
+def delete_source_path(*, collection_name: str, source_path: str) -> int:
+    """Delete every chunk of one source file; returns the number removed."""
+    with _LOCK:
+        conn = _connection(collection_name)
+        with conn:
+            rowids = [
+                r[0]
+                for r in conn.execute(
+                    "SELECT rowid FROM chunks WHERE source_path = ?", (source_path,)
+                )
+            ]
+            _delete_rowids(conn, rowids)
+    return len(rowids)
+
+
+def query(
+    *,
+    persist_dir: Path | None = None,  # API compatibility — not used
+    collection_name: str,
+    query_text: str,
+    top_k: int,
+    embed_model: str,
+    entity_filter: list[str] | None = None,
+    allowed_source_paths: list[str] | None = None,
+) -> list[SqliteVecHit]:
+    """
+    KNN query via the vec0 index. Distance is cosine distance (lower = more similar),
+    the same scale qdrant_store.query returns.
+
+    entity_filter / allowed_source_paths only widen the candidate pool here (vec0 cannot
+    substring-match); rag_core's post-filter applies them.
+    """
+    q_emb = embed_query_with_cache(model=embed_model, text=query_text)
+    k = int(top_k)
+    if entity_filter or allowed_source_paths:
+        k *= _FILTER_OVERFETCH
+
+    with _LOCK:
+        conn = _connection(collection_name)
+        rows = conn.execute(
+            "WITH knn AS ("
+            "SELECT rowid, distance FROM vec_chunks WHERE embedding MATCH ? AND k = ?"
+            ") SELECT c.chunk_id, c.text, c.metadata, knn.distance "
+            "FROM knn JOIN chunks c ON c.rowid = knn.rowid ORDER BY knn.distance",
+            (_sqlite_vec.serialize_float32(q_emb), k),
+        ).fetchall()
+
+    return [
+        SqliteVecHit(
+            chunk_id=str(cid),
+            text=str(text),
+            metadata=_meta_loads(meta),
+            distance=float(dist),
+        )
+        for cid, text, meta, dist in rows
+    ]
+
+
+def delete_collection(*, collection_name: str) -> None:
+    """Drop a collection's SQLite file. Used by --force ingest to ensure clean state."""
+    path = db_path(collection_name)
+    with _LOCK:
+        conn = _CONNECTIONS.pop(path, None)
+        if conn is not None:
+            conn.close()
+        path.unlink(missing_ok=True)
@@ -6,7 +6,6 @@ import pytest
 from fastapi.testclient import TestClient
 
 os.environ["AISTUDIO_USE_CHROMA"] = "false"
-from local_llm_bot.app.api import app
 
 
 def _ollama_can_generate(model: str) -> bool:
@@ -52,15 +51,14 @@ def _ollama_has_model(model: str) -> bool:
 
 
 @pytest.mark.integration
-def test_health_integration() -> None:
-    client = TestClient(app)
+def test_health_integration(client: TestClient) -> None:
     r = client.get("/health")
     assert r.status_code == 200
     assert r.json() == {"status": "ok"}
 
 
 @pytest.mark.integration
-def test_ask_integration() -> None:
+def test_ask_integration(client: TestClient) -> None:
     # Skip if Ollama isn't available locally (so CI/other machines don't fail)
     if not _ollama_ready():
         pytest.skip("Ollama is not running on http://127.0.0.1:11434")
@@ -75,7 +73,6 @@ def test_ask_integration() -> None:
     if not _ollama_has_model(model):
         pytest.skip(f"Ollama model not available: {model}. Run: ollama pull {model}")
 
-    client = TestClient(app)
     r = client.post("/ask", json={"query": "Tell me about AIStudio"})
     assert r.status_code == 200
     data = r.json()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from local_llm_bot.app import chunk_cache, ollama_client, rag_core
+from local_llm_bot.app.chunk_cache import ChunkCache
+
+
+@pytest.mark.unit
+def test_embedding_roundtrip_is_keyed_by_model_and_text(tmp_path: Path) -> None:
+    cache = ChunkCache(tmp_path / "cache.sqlite")
+    cache.put_embedding(model="m", text="q", vec=[0.5, -1.0, 2.0])
+
+    assert cache.get_embedding(model="m", text="q") == [0.5, -1.0, 2.0]
+    assert cache.get_embedding(model="other", text="q") is None
+    assert cache.get_embedding(model="m", text="q2") is None
+
+
+@pytest.mark.unit
+def test_bm25_postings_roundtrip_and_hash_mismatch(tmp_path: Path) -> None:
+    cache = ChunkCache(tmp_path / "cache.sqlite")
+    postings = {
+        "alpha": (np.array([0, 3], dtype=np.int32), np.array([1.5, 0.25], dtype=np.float32)),
+        "beta": (np.array([2], dtype=np.int32), np.array([0.75], dtype=np.float32)),
+    }
+    cache.put_bm25_postings(corpus="c", content_hash=b"h1", postings=postings)
+
+    loaded = cache.get_bm25_postings(corpus="c", content_hash=b"h1")
+    assert loaded is not None and set(loaded) == {"alpha", "beta"}
+    for term, (pos, w) in postings.items():
+        np.testing.assert_array_equal(loaded[term][0], pos)
+        np.testing.assert_array_equal(loaded[term][1], w)
+    assert cache.get_bm25_postings(corpus="c", content_hash=b"h2") is None
+
+
+@pytest.fixture
+def persistent_cache(monkeypatch, tmp_path: Path) -> Path:
+    db = tmp_path / "cache.sqlite"
+    monkeypatch.setattr(rag_core.CONFIG.rag, "chunk_cache_path", str(db))
+    monkeypatch.setattr(chunk_cache, "_CACHE", None)
+    return db
+
+
+@pytest.mark.unit
+def test_embed_query_survives_a_cleared_lru(monkeypatch, persistent_cache: Path) -> None:
+    calls: list[list[str]] = []
+
+    def _fake_embed(*, model: str, texts: list[str]) -> list[list[float]]:
+        calls.append(texts)
+        return [[float(len(t))] for t in texts]
+
+    monkeypatch.setattr(ollama_client, "ollama_embed", _fake_embed)
+    ollama_client._EMBED_CACHE.clear()
+
+    assert ollama_client.embed_query_with_cache(model="m", text="abc") == [3.0]
+    ollama_client._EMBED_CACHE.clear()  # simulate a restart
+    assert ollama_client.embed_query_with_cache(model="m", text="abc") == [3.0]
+    assert calls == [["abc"]]
+
+
+@pytest.mark.unit
+def test_bm25_index_reloads_persisted_postings(monkeypatch, tmp_path: Path, persistent_cache: Path) -> None:
+    index = tmp_path / "index.jsonl"
+    index.write_text(
+        "\n".join(
+            json.dumps({"chunk_id": f"d{i}", "source_path": f"/d{i}", "text": t})
+            for i, t in enumerate(["revenue growth strong", "capital ratio revenue", "other"])
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(rag_core, "corpus_paths", lambda _r, _c: {"base": tmp_path, "index": index})
+    monkeypatch.setattr(rag_core, "_BM25_CACHE", {})
+
+    built = rag_core._bm25_index("c")
+    assert built is not None
+
+    rag_core._BM25_CACHE.clear()  # simulate a restart
+    monkeypatch.setattr(rag_core, "Counter", None)  # a rebuild would now fail
+    reloaded = rag_core._bm25_index("c")
+
+    assert reloaded is not None
+    assert set(reloaded.postings) == set(built.postings)
+    np.testing.assert_array_equal(reloaded.postings["revenue"][1], built.postings["revenue"][1])
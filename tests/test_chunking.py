@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from local_llm_bot.app.ingest.chunking import chunk_spans, chunk_text
+
+
+def _chunk_text_loop(text: str, chunk_size: int, overlap: int) -> list[str]:
+    """The original while-loop implementation, kept as the reference."""
+    text = text.strip()
+    chunks: list[str] = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_size)
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end == len(text):
+            break
+        start = end - overlap
+    return chunks
+
+
+@pytest.mark.unit
+def test_chunk_text_matches_reference_loop() -> None:
+    rng = random.Random(7)
+    alphabet = "abcde  \n"
+    for _ in range(300):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 400)))
+        chunk_size = rng.randint(1, 60)
+        overlap = rng.randint(0, chunk_size - 1)
+        assert chunk_text(text, chunk_size, overlap) == _chunk_text_loop(text, chunk_size, overlap)
+
+
+@pytest.mark.unit
+def test_chunk_text_has_no_trailing_duplicate_window() -> None:
+    # len 10, step 4: windows start at 0 and 4; the one at 4 already reaches the end.
+    assert chunk_text("abcdefghij", chunk_size=6, overlap=2) == ["abcdef", "efghij"]
+
+
+@pytest.mark.unit
+def test_chunk_text_rejects_bad_params() -> None:
+    with pytest.raises(ValueError):
+        chunk_text("abc", chunk_size=5, overlap=5)
+
+
+@pytest.mark.unit
+def test_chunk_spans_are_the_chunk_text_windows() -> None:
+    assert list(chunk_spans(10, chunk_size=6, overlap=2)) == [(0, 6), (4, 10)]
+    assert list(chunk_spans(0, chunk_size=6, overlap=2)) == []
+    text = "abcdefghijklmnopqrstuvwxyz"
+    assert [text[s:e] for s, e in chunk_spans(len(text), chunk_size=8, overlap=3)] == chunk_text(
+        text, 8, 3
+    )
+
+
+@pytest.mark.unit
+def test_chunk_text_strips_unicode_whitespace_like_str_strip() -> None:
+    text = "\u3000\xa0 \n" + "abcdefghij" * 5 + " \u2003\n\t"
+    assert chunk_text(text, 16, 4) == _chunk_text_loop(text, 16, 4)
+    assert chunk_text("\u3000 \n\xa0", 16, 4) == []
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import pytest
+
+from local_llm_bot.app.config import load_config_from_env
+
+
+@pytest.mark.unit
+def test_load_config_from_explicit_mapping() -> None:
+    cfg = load_config_from_env(
+        {
+            "AISTUDIO_VECTORSTORE": "Chroma",
+            "AISTUDIO_TOP_K": "9",
+            "AISTUDIO_HYBRID_ALPHA": "0.4",
+            "AISTUDIO_MAX_DISTANCE": "",
+            "AISTUDIO_OLLAMA_TIMEOUT_S": "42",
+        }
+    )
+    assert cfg.rag.vectorstore == "chroma" and cfg.rag.use_chroma is True
+    assert cfg.rag.top_k == 9
+    assert cfg.rag.hybrid_alpha == 0.4
+    assert cfg.rag.max_distance is None
+    assert cfg.ollama.request_timeout_s == 42.0
+
+
+@pytest.mark.unit
+def test_load_config_defaults_on_empty_env() -> None:
+    cfg = load_config_from_env({})
+    assert cfg.rag.vectorstore == "qdrant"
+    assert cfg.rag.chunk_cache_path is None
+    assert cfg.ingest.chunk_size == 1200
+
+
+@pytest.mark.unit
+def test_load_config_validates_env_values() -> None:
+    from pydantic import ValidationError
+
+    with pytest.raises(ValidationError):
+        load_config_from_env({"AISTUDIO_TOP_K": "80"})  # le=50
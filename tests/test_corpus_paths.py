@@ -2,6 +2,8 @@ from __future__ import annotations
 
 from pathlib import Path
 
+import pytest
+
 from local_llm_bot.app.utils.corpus_paths import corpus_paths
 
 
@@ -15,3 +17,31 @@ def test_corpus_paths_creates_structure(tmp_path: Path) -> None:
     assert "chroma" not in paths  # chroma folder removed — AIStudio uses Qdrant only
     assert not (paths["base"] / "chroma").exists()  # chroma dir must not be created
     assert str(paths["index"]).endswith("data/corpora/unit-test/index.jsonl")
+
+
+def test_find_repo_root_is_memoized(tmp_path: Path) -> None:
+    from local_llm_bot.app.utils.repo_root import find_repo_root
+
+    (tmp_path / "pyproject.toml").write_text("x", encoding="utf-8")
+    start = tmp_path / "src" / "pkg" / "mod.py"
+    assert find_repo_root(start) == tmp_path.resolve()
+
+    # Cached: the marker is gone, but the answer for the same start path is reused.
+    (tmp_path / "pyproject.toml").unlink()
+    assert find_repo_root(start) == tmp_path.resolve()
+
+
+def test_corpus_paths_creates_base_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[Path] = []
+    real_mkdir = Path.mkdir
+
+    def _mkdir(self: Path, *args, **kwargs) -> None:
+        calls.append(self)
+        real_mkdir(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "mkdir", _mkdir)
+    first = corpus_paths(tmp_path, "once")
+    assert first["base"] in calls
+    calls.clear()
+    assert corpus_paths(tmp_path, "once") == first
+    assert calls == []
@@ -35,3 +35,81 @@ def test_compute_jsonl_stats(tmp_path: Path) -> None:
     assert s.docs_unique == 1
     assert s.sources_unique == 1
     assert s.docmap_entries == 1
+
+
+def test_count_jsonl_skips_blank_lines_and_tracks_changes(tmp_path: Path) -> None:
+    from local_llm_bot.app import debug_stats
+
+    p = tmp_path / "manifest.jsonl"
+    p.write_bytes(b'{"a": 1}\n\n  \r\n{"b": 2}\n{"c": 3}')
+    assert debug_stats._count_jsonl(p) == 3
+
+    p.write_bytes(b'{"a": 1}\n')
+    assert debug_stats._count_jsonl(p) == 1
+    assert debug_stats._count_jsonl(tmp_path / "missing.jsonl") == 0
+
+
+def test_index_summary_scans_in_line_aligned_blocks(tmp_path: Path, monkeypatch) -> None:
+    from local_llm_bot.app import debug_stats
+
+    monkeypatch.setattr(debug_stats, "_BLOCK_BYTES", 16)
+    rows = [{"doc_id": f"d{i % 2}", "source_path": f"/x/{i % 3}", "text": "t" * i} for i in range(7)]
+    p = tmp_path / "index.jsonl"
+    p.write_text(
+        "\n".join(json.dumps(r) for r in rows) + "\n\nnot json\n",
+        encoding="utf-8",
+    )
+
+    blocks = list(debug_stats._iter_line_blocks(p))
+    assert b"".join(blocks) == p.read_bytes()
+    assert all(b.endswith(b"\n") for b in blocks)
+
+    s = debug_stats._summarize_index(p)
+    assert s.rows == 7
+    assert s.docs_unique == 2
+    assert s.source_counts == {"/x/0": 3, "/x/1": 2, "/x/2": 2}
+    assert debug_stats._count_jsonl(p) == 8
+
+
+def test_index_summary_skips_tombstoned_docs(tmp_path: Path) -> None:
+    from local_llm_bot.app import debug_stats
+    from local_llm_bot.app.ingest.index_jsonl import append_rows, mark_doc_deleted
+
+    p = tmp_path / "index.jsonl"
+    append_rows(p, [{"doc_id": "a", "source_path": "/a"}, {"doc_id": "b", "source_path": "/b"}])
+    assert debug_stats._summarize_index(p).rows == 2
+
+    mark_doc_deleted(p, "a")
+    s = debug_stats._summarize_index(p)
+    assert s.rows == 1
+    assert s.source_counts == {"/b": 1}
+
+
+def test_count_nonblank_lines_fast_path_agrees_with_strip() -> None:
+    from local_llm_bot.app import debug_stats
+
+    for data in (
+        b"",
+        b"{}\n",
+        b'{"a":1}\n{"b":2}',
+        b'{"a":1}\n\n{"b":2}\n',
+        b'{"a":1}\n   \n{"b":2}\n \t',
+        b'\n{"a":1}\n',
+        b'  {"a":1}\n',
+    ):
+        expected = sum(1 for line in data.split(b"\n") if line.strip())
+        assert debug_stats._count_nonblank_lines(data) == expected, data
+
+
+def test_docmap_log_removals_apply_to_legacy_map(tmp_path: Path) -> None:
+    from local_llm_bot.app import debug_stats
+    from local_llm_bot.app.ingest.index_jsonl import append_docmap_entry
+
+    (tmp_path / "doc_chunk_map.json").write_text(
+        json.dumps({"a": ["a::chunk-0"], "b": ["b::chunk-0"]}), encoding="utf-8"
+    )
+    log = tmp_path / "doc_chunk_map.jsonl"
+    append_docmap_entry(log, "a", [])
+    append_docmap_entry(log, "c", ["c::chunk-0"])
+
+    assert debug_stats._load_docmap(log) == {"b": ["b::chunk-0"], "c": ["c::chunk-0"]}
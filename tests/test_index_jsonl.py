@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from local_llm_bot.app.ingest import index_jsonl
+from local_llm_bot.app.ingest.index_jsonl import append_rows, read_jsonl
+
+ROWS = [
+    {"chunk_id": "a::chunk-0", "text": "Société Générale — 10-K", "page": 3},
+    {"chunk_id": "a::chunk-1", "text": "line\nbreak", "page": None},
+]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_append_rows_roundtrips_through_read_jsonl(monkeypatch, tmp_path: Path, use_orjson: bool) -> None:
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(index_jsonl, "_orjson", None)
+    path = tmp_path / "index.jsonl"
+
+    append_rows(path, ROWS[:1])
+    append_rows(path, ROWS[1:])
+    append_rows(path, [])
+
+    assert read_jsonl(path) == ROWS
+    assert path.read_bytes().count(b"\n") == 2
+    assert "Société".encode() in path.read_bytes()  # written as UTF-8, not \u-escaped
+
+
+def _rows(doc: str, n: int, tag: str) -> list[dict]:
+    return [{"chunk_id": f"{doc}::chunk-{i}", "doc_id": doc, "text": tag} for i in range(n)]
+
+
+@pytest.mark.unit
+def test_tombstone_hides_old_rows_but_keeps_reingested_ones(tmp_path: Path) -> None:
+    path = tmp_path / "index.jsonl"
+    append_rows(path, _rows("/a", 2, "old") + _rows("/b", 1, "b"))
+
+    index_jsonl.mark_doc_deleted(path, "/a")
+    append_rows(path, _rows("/a", 1, "new"))
+
+    assert [(r["doc_id"], r["text"]) for r in read_jsonl(path)] == [("/b", "b"), ("/a", "new")]
+
+
+@pytest.mark.unit
+def test_compact_index_respects_ratio_and_clears_tombstones(tmp_path: Path) -> None:
+    path = tmp_path / "index.jsonl"
+    append_rows(path, _rows("/a", 1, "old") + _rows("/b", 9, "b"))
+    index_jsonl.mark_doc_deleted(path, "/a")
+    live = read_jsonl(path)
+
+    assert index_jsonl.compact_index(path, min_dead_ratio=0.3) == 0  # 1 of 10 dead — keep
+    assert index_jsonl.tombstones_path(path).exists()
+
+    assert index_jsonl.compact_index(path) == 1
+    assert not index_jsonl.tombstones_path(path).exists()
+    assert read_jsonl(path) == live
+    assert path.read_bytes().count(b"\n") == 9
+
+
+@pytest.mark.unit
+def test_iter_jsonl_streams_rows_and_accepts_nan(tmp_path: Path) -> None:
+    path = tmp_path / "index.jsonl"
+    path.write_bytes(b'{"doc_id": "/a"}\n\nnot json\n{"doc_id": "/b", "score": NaN}\n')
+
+    rows = index_jsonl.iter_jsonl(path)
+    assert next(rows) == {"doc_id": "/a"}
+    assert next(rows)["doc_id"] == "/b"
+    assert list(rows) == []
+    assert list(index_jsonl.iter_jsonl(tmp_path / "missing.jsonl")) == []
+
+
+@pytest.mark.unit
+def test_iter_lines_reports_byte_offsets_and_unterminated_last_line(tmp_path: Path) -> None:
+    path = tmp_path / "index.jsonl"
+    path.write_bytes(b'{"n": 1}\n\n{"n": 2}\r\n{"n": 3}')
+
+    assert list(index_jsonl._iter_lines(path)) == [
+        (0, b'{"n": 1}\n', {"n": 1}),
+        (10, b'{"n": 2}\r\n', {"n": 2}),
+        (20, b'{"n": 3}', {"n": 3}),
+    ]
+    path.write_bytes(b"")
+    assert list(index_jsonl._iter_lines(path)) == []
+
+
+@pytest.mark.unit
+def test_docmap_log_last_entry_wins_and_compacts(tmp_path: Path) -> None:
+    path = tmp_path / "doc_chunk_map.jsonl"
+    index_jsonl.append_docmap_entry(path, "/a", ["/a::chunk-0"])
+    index_jsonl.append_docmap_entry(path, "/b", ["/b::chunk-0"])
+    index_jsonl.append_docmap_entry(path, "/a", ["/a::chunk-0", "/a::chunk-1"])
+    assert index_jsonl.compact_docmap(path) is False  # 3 lines, 2 docs
+
+    index_jsonl.append_docmap_entry(path, "/b", [])  # delete
+    index_jsonl.append_docmap_entry(path, "/a", ["/a::chunk-9"])
+    assert index_jsonl.load_docmap(path) == {"/a": ["/a::chunk-9"]}
+
+    assert index_jsonl.compact_docmap(path) is True
+    assert path.read_bytes().count(b"\n") == 1
+    assert index_jsonl.load_docmap(path) == {"/a": ["/a::chunk-9"]}
+
+
+@pytest.mark.unit
+def test_encode_doc_rows_merges_shared_fields(tmp_path: Path) -> None:
+    shared = {"doc_id": "/a", "source_path": "/a", "md5": "x", "firm": "Café"}
+    rows = [{"chunk_id": "/a::chunk-0", "text": 'say "hi"\n', "page": None}, {}]
+
+    data = index_jsonl.encode_doc_rows(shared, rows)
+    lines = [json.loads(line) for line in data.splitlines()]
+    assert lines == [{**rows[0], **shared}, shared]
+    assert index_jsonl.encode_doc_rows({}, rows[:1]) == index_jsonl.encode_rows(rows[:1])
+
+    path = tmp_path / "index.jsonl"
+    other = {"doc_id": "/b", "source_path": "/b", "md5": "y", "firm": ""}
+    index_jsonl.append_doc_rows(path, [(shared, rows[:1]), (other, [{"chunk_id": "/b::chunk-0"}])])
+    assert read_jsonl(path) == [{**rows[0], **shared}, {"chunk_id": "/b::chunk-0", **other}]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_encode_doc_rows_chunk_schema(monkeypatch, use_orjson: bool) -> None:
+    if not use_orjson:
+        monkeypatch.setattr(index_jsonl, "_orjson", None)
+    shared = {"doc_id": "/a", "source_path": "/a", "md5": "x", "firm": ""}
+    rows = [
+        {"chunk_id": "/a::page-3::chunk-0", "text": 'Café "q"\t\\ \u2028', "page": 3},
+        {"chunk_id": "/a::chunk-1", "text": "", "page": None},
+    ]
+
+    lines = index_jsonl.encode_doc_rows(shared, rows).splitlines()
+    assert [json.loads(line) for line in lines] == [{**r, **shared} for r in rows]
+
+
+@pytest.mark.unit
+def test_append_log_creates_on_first_write_and_syncs(tmp_path: Path) -> None:
+    path = tmp_path / "sub" / "index.jsonl"
+    log = index_jsonl.AppendLog(path)
+    log.write(b"")
+    log.sync_point()
+    assert not path.exists()
+
+    log.write(index_jsonl.encode_rows([{"doc_id": "/a"}]))
+    log.sync_point()
+    assert read_jsonl(path) == [{"doc_id": "/a"}]  # visible to readers before close()
+    log.write(index_jsonl.encode_rows([{"doc_id": "/b"}]))
+    log.close()
+    log.close()
+    assert read_jsonl(path) == [{"doc_id": "/a"}, {"doc_id": "/b"}]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_rewrite_excluding_doc_drops_only_that_doc(monkeypatch, tmp_path: Path, use_orjson: bool) -> None:
+    if not use_orjson:
+        monkeypatch.setattr(index_jsonl, "_orjson", None)
+    index = tmp_path / "index.jsonl"
+    append_rows(index, [{"doc_id": "/é/a", "chunk_id": "a0"}, {"doc_id": "b", "chunk_id": "b0"}])
+    with index.open("ab") as f:
+        f.write(b"not json\n\n")
+        # stdlib json's default \u-escaped form of the same doc_id
+        f.write(json.dumps({"doc_id": "/é/a", "chunk_id": "a1"}).encode("ascii") + b"\n")
+    # mentions the doc_id only inside the text
+    append_rows(index, [{"doc_id": "c", "chunk_id": "c0", "text": 'see "/é/a"'}])
+
+    index_jsonl.rewrite_excluding_doc(index, tmp_path / "index.jsonl.tmp", "/é/a")
+
+    assert [r["chunk_id"] for r in read_jsonl(index)] == ["b0", "c0"]
+    # Lines without the doc_id needle are copied verbatim, unparsed (the blank line is dropped).
+    assert index.read_bytes().count(b"\n") == 3
+    assert b"not json\n" in index.read_bytes()
+
+
+@pytest.mark.unit
+def test_read_jsonl_fields_matches_across_parallel_ranges(monkeypatch, tmp_path: Path) -> None:
+    path = tmp_path / "index.jsonl"
+    append_rows(path, _rows("/a", 5, "old"))
+    index_jsonl.mark_doc_deleted(path, "/a")
+    append_rows(path, _rows("/b", 7, "b") + [{"doc_id": "/c", "chunk_id": "c0"}])
+    with path.open("ab") as f:
+        f.write(b"\n[1, 2]\n{not json}\n")
+    append_rows(path, _rows("/a", 3, "new"))
+    fields = ("chunk_id", "text")
+    expected = [[str(r.get(k, "")) for r in read_jsonl(path) if isinstance(r, dict)] for k in fields]
+
+    assert index_jsonl.read_jsonl_fields(path, fields) == expected
+    # Force the process-pool path: ranges of a few rows each, split on line boundaries.
+    monkeypatch.setattr(index_jsonl, "_PARSE_RANGE_BYTES", 64)
+    monkeypatch.setattr(index_jsonl.os, "cpu_count", lambda: 4)
+    assert index_jsonl.read_jsonl_fields(path, fields, parallel=True) == expected
+    assert index_jsonl.read_jsonl_fields(path, fields) == expected
+    assert index_jsonl.read_jsonl_fields(tmp_path / "missing.jsonl", fields) == [[], []]
+
+
+@pytest.mark.unit
+def test_rewrite_excluding_doc_applies_and_clears_tombstones(tmp_path: Path) -> None:
+    path = tmp_path / "index.jsonl"
+    append_rows(path, _rows("/a", 2, "a") + _rows("/b", 2, "old"))
+    index_jsonl.mark_doc_deleted(path, "/b")
+    append_rows(path, _rows("/b", 1, "new"))
+
+    index_jsonl.rewrite_excluding_doc(path, tmp_path / "index.jsonl.tmp", "/a")
+
+    assert read_jsonl(path) == _rows("/b", 1, "new")
+    assert not index_jsonl.tombstones_path(path).exists()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from local_llm_bot.app import rag_core
+
+
+def _write_index(path: Path, texts: list[str]) -> None:
+    path.write_text(
+        "\n".join(
+            json.dumps(
+                {
+                    "chunk_id": f"doc{i}::chunk-0",
+                    "doc_id": f"doc{i}",
+                    "source_path": f"/tmp/doc{i}",
+                    "text": text,
+                }
+            )
+            for i, text in enumerate(texts)
+        )
+        + "\n",
+        encoding="utf-8",
+    )
+
+
+@pytest.fixture
+def lexical_corpus(monkeypatch, tmp_path: Path) -> Path:
+    index = tmp_path / "index.jsonl"
+
+    def _fake_corpus_paths(_repo_root: Path, corpus_name: str) -> dict[str, Path]:
+        return {"base": tmp_path, "index": index}
+
+    monkeypatch.setattr(rag_core, "corpus_paths", _fake_corpus_paths)
+    monkeypatch.setattr(rag_core, "_BM25_CACHE", {})
+    return index
+
+
+@pytest.mark.unit
+def test_bm25_ranks_rare_term_above_common(lexical_corpus: Path) -> None:
+    _write_index(
+        lexical_corpus,
+        [
+            "capital ratio capital ratio capital ratio",
+            "capital ratio for Bridgewater Associates",
+            "gardening tips",
+        ],
+    )
+
+    hits = rag_core._lexical_jsonl_retrieve(query="Bridgewater capital", top_k=5, corpus="t")
+
+    assert [h.id for h in hits] == ["doc1::chunk-0", "doc0::chunk-0"]
+    assert hits[0].score > hits[1].score
+
+
+@pytest.mark.unit
+def test_bm25_index_rebuilds_when_index_changes(lexical_corpus: Path) -> None:
+    _write_index(lexical_corpus, ["alpha bravo"])
+    assert rag_core._lexical_jsonl_retrieve(query="charlie", top_k=3, corpus="t") == []
+
+    _write_index(lexical_corpus, ["alpha bravo", "charlie delta echo"])
+    hits = rag_core._lexical_jsonl_retrieve(query="charlie", top_k=3, corpus="t")
+
+    assert [h.id for h in hits] == ["doc1::chunk-0"]
+
+
+@pytest.mark.unit
+def test_bm25_index_builds_once_under_concurrent_cold_queries(monkeypatch, lexical_corpus: Path) -> None:
+    _write_index(lexical_corpus, ["alpha bravo", "charlie delta echo"])
+    monkeypatch.setattr(rag_core, "get_chunk_cache", lambda: None)
+    reads: list[Path] = []
+    real_read = rag_core.read_jsonl_fields
+
+    def _slow_read(path, fields, **kw):
+        reads.append(path)
+        time.sleep(0.05)
+        return real_read(path, fields, **kw)
+
+    monkeypatch.setattr(rag_core, "read_jsonl_fields", _slow_read)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        built = list(pool.map(rag_core._bm25_index, ["t"] * 4))
+
+    assert len(reads) == 1
+    assert all(b is built[0] for b in built)
+
+
+@pytest.mark.unit
+def test_tokenize_keeps_whole_runs_of_three_or_more() -> None:
+    from local_llm_bot.app.rag_core import _tokenize
+
+    assert _tokenize("CET1 ratio: 13.1% vs Q4-2024, an uptick") == {"cet1", "ratio", "2024", "uptick"}
+
+
+@pytest.mark.unit
+def test_bm25_cache_keeps_most_recent_corpora(monkeypatch) -> None:
+    monkeypatch.setattr(rag_core, "_BM25_CACHE", {})
+    monkeypatch.setattr(rag_core, "_BM25_CACHE_MAX", 2)
+    idx = rag_core._Bm25Index(stamp=(0, 0, 0, 0), ids=[], texts=[], sources=[], postings={})
+
+    rag_core._remember_bm25("a", idx)
+    rag_core._remember_bm25("b", idx)
+    rag_core._remember_bm25("a", idx)  # a is now the most recent
+    rag_core._remember_bm25("c", idx)
+
+    assert list(rag_core._BM25_CACHE) == ["a", "c"]
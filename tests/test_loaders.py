@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+
+@pytest.mark.unit
+def test_is_supported_filename_matches_suffix_rules() -> None:
+    from pathlib import Path
+
+    from local_llm_bot.app.ingest.loaders import (
+        SUPPORTED_EXTS,
+        is_supported_filename,
+        should_skip_filename,
+    )
+
+    names = [
+        "report.PDF", "a.b.md", "notes.txt", "x.htm", "x.html", "x.XHTML", "~$lock.docx",
+        ".DS_Store", ".md", "archive.zip", "readme", "md", "deck.pptx", "sheet.xlsx.bak",
+    ]
+    for name in names:
+        expected = Path(name).suffix.lower() in SUPPORTED_EXTS and not should_skip_filename(name)
+        assert is_supported_filename(name) is expected, name
+
+
+@pytest.mark.unit
+def test_extract_xlsx_cell_cap_spans_sheets(tmp_path: Path) -> None:
+    openpyxl = pytest.importorskip("openpyxl")
+    from local_llm_bot.app.ingest.loaders import _extract_xlsx
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["a", None, " b "])
+    ws.append([1, 2.5, ""])
+    wb.create_sheet().append(["c", "d"])
+    path = tmp_path / "book.xlsx"
+    wb.save(path)
+
+    full = _extract_xlsx(path, max_cells=8)
+    assert (full.ok, full.text, full.reason) == (True, "a\nb\n1\n2.5\nc\nd", "")
+    capped = _extract_xlsx(path, max_cells=7)
+    assert (capped.text, capped.reason) == ("a\nb\n1\n2.5\nc", "partial:cell_cap")
+    exact = _extract_xlsx(path, max_cells=6)
+    assert (exact.text, exact.reason) == ("a\nb\n1\n2.5", "partial:cell_cap")
+
+
+def _minimal_pdf(pages: list[str]) -> bytes:
+    """A valid single-font PDF with one text line per page (empty string = blank page)."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", "", "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objs.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objs.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>"
+        )
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{off:010d} 00000 n \n".encode() for off in offsets)
+    out += f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+@pytest.mark.unit
+def test_pdfium_backend_matches_pdfplumber_page_markers(tmp_path: Path) -> None:
+    pytest.importorskip("pypdfium2")
+    pytest.importorskip("pdfplumber")
+    from local_llm_bot.app.ingest.loaders import _extract_pdf, _extract_pdf_pdfium
+
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(_minimal_pdf(["Hello page one", "", "Third page"]))
+
+    res = _extract_pdf_pdfium(path)
+    assert res is not None and res.ok
+    assert res.text == "[PAGE_1]\nHello page one\n\n[PAGE_3]\nThird page"
+    assert res.text == _extract_pdf(path).text
+
+    bad = tmp_path / "bad.pdf"
+    bad.write_bytes(b"not a pdf")
+    assert _extract_pdf_pdfium(bad).reason.startswith("parse_error:")
+
+
+@pytest.mark.unit
+def test_extract_docx_repeats_merged_cells_per_grid_column(tmp_path: Path) -> None:
+    docx = pytest.importorskip("docx")
+    from local_llm_bot.app.ingest.loaders import _extract_docx
+
+    d = docx.Document()
+    d.add_paragraph("  Intro  ")
+    d.add_paragraph("   ")
+    table = d.add_table(rows=2, cols=3)
+    table.cell(0, 0).merge(table.cell(0, 1)).text = "Span"
+    table.cell(0, 2).text = "C"
+    table.cell(1, 1).text = "x"
+    path = tmp_path / "doc.docx"
+    d.save(path)
+
+    res = _extract_docx(path)
+    assert (res.ok, res.text) == (True, "Intro\nSpan\nSpan\nC\nx")
+
+
+@pytest.mark.unit
+def test_extract_pptx_text_frames_and_tables(tmp_path: Path) -> None:
+    pptx = pytest.importorskip("pptx")
+    from pptx.util import Inches
+
+    from local_llm_bot.app.ingest.loaders import _extract_pptx
+
+    prs = pptx.Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    slide.shapes.add_textbox(Inches(1), Inches(1), Inches(2), Inches(1)).text_frame.text = " Title "
+    slide.shapes.add_textbox(Inches(1), Inches(2), Inches(2), Inches(1))
+    tbl = slide.shapes.add_table(1, 2, Inches(1), Inches(3), Inches(4), Inches(1)).table
+    tbl.cell(0, 1).text = "cell"
+    path = tmp_path / "deck.pptx"
+    prs.save(path)
+
+    res = _extract_pptx(path)
+    assert (res.ok, res.text) == (True, "Title\ncell")
+
+
+@pytest.mark.unit
+def test_extract_dispatch_covers_supported_exts(tmp_path: Path) -> None:
+    from local_llm_bot.app.ingest.loaders import _EXTRACTORS, SUPPORTED_EXTS, extract_text
+
+    assert set(_EXTRACTORS) == SUPPORTED_EXTS
+    note = tmp_path / "NOTE.MD"
+    note.write_text("# hi", encoding="utf-8")
+    assert extract_text(note).text == "# hi"
+    assert extract_text(tmp_path / "x.zip").reason == "unsupported_ext"
+
+
+@pytest.mark.unit
+def test_precheck_file_rejects_oversized_and_binary_files(tmp_path: Path) -> None:
+    from local_llm_bot.app.ingest.loaders import MAX_FILE_BYTES, precheck_file
+
+    text = tmp_path / "notes.txt"
+    text.write_text("plain text\n" * 100, encoding="utf-8")
+    assert precheck_file(text, text.stat().st_size) == ""
+
+    blob = tmp_path / "dump.txt"
+    blob.write_bytes(b"\x00\x01\x02\x00" * 1024)
+    assert precheck_file(blob, blob.stat().st_size) == "binary_content"
+
+    pdf = tmp_path / "huge.pdf"
+    assert precheck_file(pdf, MAX_FILE_BYTES[".pdf"]) == ""  # the cap itself is allowed
+    assert precheck_file(pdf, MAX_FILE_BYTES[".pdf"] + 1) == "too_large"
+
+
+@pytest.mark.unit
+def test_stream_office_readers_keep_document_order(tmp_path: Path) -> None:
+    docx = pytest.importorskip("docx")
+    pptx = pytest.importorskip("pptx")
+    from pptx.util import Inches
+
+    from local_llm_bot.app.ingest.loaders import _extract_docx_stream, _extract_pptx_stream
+
+    d = docx.Document()
+    d.add_paragraph("Intro")
+    d.add_table(rows=1, cols=2).cell(0, 1).text = "cell"
+    d.add_paragraph("Outro\twith tab")
+    d.save(tmp_path / "doc.docx")
+    res = _extract_docx_stream(tmp_path / "doc.docx")
+    assert (res.ok, res.text) == (True, "Intro\ncell\nOutro\twith tab")
+
+    prs = pptx.Presentation()
+    for title in ("First", "Second"):
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        box = slide.shapes.add_textbox(Inches(1), Inches(1), Inches(2), Inches(1))
+        box.text_frame.text = title
+    prs.save(tmp_path / "deck.pptx")
+    res = _extract_pptx_stream(tmp_path / "deck.pptx")
+    assert (res.ok, res.text) == (True, "First\nSecond")
+
+    (tmp_path / "bad.docx").write_bytes(b"not a zip")
+    assert _extract_docx_stream(tmp_path / "bad.docx").reason.startswith("parse_error:")
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import fnmatch
+from pathlib import Path
+
+import pytest
+
+from local_llm_bot.app.ingest.loaders import compile_exclude_matcher, is_excluded
+
+PATTERNS = ["*/.git/*", "*/node_modules/*", "*.tmp", "*/Library/Caches/*"]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/u/corpus/.git/HEAD",
+        "/u/corpus/app/node_modules/x/index.js",
+        "/u/corpus/notes.tmp",
+        "/u/Library/Caches/foo.pdf",
+        "/u/corpus/report.pdf",
+        "/u/corpus/gitlog.txt",
+    ],
+)
+def test_compiled_matcher_agrees_with_fnmatch(path: str) -> None:
+    expected = any(fnmatch.fnmatch(path, pat) for pat in PATTERNS)
+    assert compile_exclude_matcher(PATTERNS)(path) is expected
+    assert is_excluded(Path(path), PATTERNS) is expected
+
+
+@pytest.mark.unit
+def test_empty_pattern_list_excludes_nothing() -> None:
+    assert compile_exclude_matcher([])("/anything") is False
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    ("pattern", "path"),
+    [
+        ("*.tm[pq]", "/a/x.tmq"),
+        ("*.tm[!p]", "/a/x.tmp"),
+        ("*/a?c/*", "/r/abc/f"),
+        ("*[.]git*", "/r/.gitignore"),
+        ("*/we ird+(x)/*", "/r/we ird+(x)/f"),
+        ("*[abc", "/r/x[abc"),
+    ],
+)
+def test_hyperscan_glob_translation_matches_fnmatch(pattern: str, path: str) -> None:
+    import re
+
+    from local_llm_bot.app.ingest.loaders import _glob_to_hs
+
+    expected = fnmatch.fnmatch(path, pattern)
+    assert (re.match(_glob_to_hs(pattern).replace("\\z", r"\Z"), path, re.S) is not None) is expected
+
+
+@pytest.mark.unit
+def test_matcher_falls_back_to_regex_without_hyperscan(monkeypatch) -> None:
+    from local_llm_bot.app.ingest import loaders
+
+    monkeypatch.setattr(loaders, "_hs", None)
+    loaders._compile_exclude_hs_db.cache_clear()
+    try:
+        match = compile_exclude_matcher(PATTERNS)
+        assert match("/u/corpus/.git/HEAD") is True
+        assert match("/u/corpus/report.pdf") is False
+    finally:
+        loaders._compile_exclude_hs_db.cache_clear()
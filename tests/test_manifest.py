@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from local_llm_bot.app.ingest.manifest import (
+    ManifestEntry,
+    append_manifest_entries,
+    build_entry,
+    compact_manifest,
+    load_manifest_map,
+    should_skip,
+    write_manifest_entries,
+    write_manifest_entry,
+)
+
+
+@pytest.mark.unit
+def test_write_manifest_entries_merges_batch_in_one_rewrite(tmp_path: Path) -> None:
+    manifest = tmp_path / "manifest.jsonl"
+    write_manifest_entry(manifest, ManifestEntry(path="/a", mtime=1, size=10))
+
+    write_manifest_entries(
+        manifest,
+        [ManifestEntry(path="/a", mtime=2, size=20), ManifestEntry(path="/b", mtime=3, size=30)],
+    )
+    write_manifest_entries(manifest, [])
+
+    m = load_manifest_map(manifest)
+    assert m == {
+        "/a": ManifestEntry(path="/a", mtime=2, size=20),
+        "/b": ManifestEntry(path="/b", mtime=3, size=30),
+    }
+    assert manifest.read_text(encoding="utf-8").count("\n") == 2
+
+
+@pytest.mark.unit
+def test_append_manifest_entries_then_compact_keeps_newest(tmp_path: Path) -> None:
+    manifest = tmp_path / "manifest.jsonl"
+    append_manifest_entries(manifest, [ManifestEntry(path="/a", mtime=1, size=10)])
+    append_manifest_entries(
+        manifest,
+        [ManifestEntry(path="/a", mtime=2, size=20), ManifestEntry(path="/b", mtime=3, size=30)],
+    )
+    append_manifest_entries(manifest, [])
+    assert manifest.read_text(encoding="utf-8").count("\n") == 3
+
+    expected = {
+        "/a": ManifestEntry(path="/a", mtime=2, size=20),
+        "/b": ManifestEntry(path="/b", mtime=3, size=30),
+    }
+    assert load_manifest_map(manifest) == expected
+
+    assert compact_manifest(manifest) is True
+    assert manifest.read_text(encoding="utf-8").count("\n") == 2
+    assert load_manifest_map(manifest) == expected
+    assert compact_manifest(manifest) is False
+
+
+@pytest.mark.unit
+def test_entries_compare_exact_mtime_ns_and_legacy_seconds(tmp_path: Path) -> None:
+    src = tmp_path / "a.txt"
+    src.write_text("x", encoding="utf-8")
+    os.utime(src, ns=(1_700_000_000_250_000_000, 1_700_000_000_250_000_000))
+    manifest = tmp_path / "manifest.jsonl"
+    entry = build_entry(src)
+    assert (entry.mtime, entry.mtime_ns) == (1_700_000_000, 1_700_000_000_250_000_000)
+    legacy = ManifestEntry(path=entry.path, mtime=entry.mtime, size=entry.size)
+    append_manifest_entries(manifest, [entry])
+
+    loaded = load_manifest_map(manifest)
+    assert loaded == {entry.path: entry}
+    assert should_skip(source_path=src, manifest_map=loaded)
+
+    # Touched within the same second: whole-second legacy entries cannot tell, mtime_ns can.
+    os.utime(src, ns=(1_700_000_000_750_000_000, 1_700_000_000_750_000_000))
+    assert not should_skip(source_path=src, manifest_map=loaded)
+    assert should_skip(source_path=src, manifest_map={entry.path: legacy})
+
+
+@pytest.mark.unit
+def test_should_skip_and_build_entry_reuse_callers_stat(tmp_path: Path) -> None:
+    src = tmp_path / "a.txt"
+    src.write_text("x", encoding="utf-8")
+    st = os.stat(src)
+    abs_path = str(src.resolve())
+    entry = build_entry(src, abs_path=abs_path, st=st)
+    assert entry == build_entry(src)
+
+    # With both passed the file is never touched: a deleted file still compares by the given stat.
+    src.unlink()
+    assert should_skip(source_path=src, manifest_map={abs_path: entry}, abs_path=abs_path, st=st)
+    assert should_skip(source_path=src, manifest_map={abs_path: entry})  # vanished => skip
+
+
+@pytest.mark.unit
+def test_load_manifest_map_skips_corrupt_lines(tmp_path: Path) -> None:
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_bytes(
+        b'{"path": "/a", "mtime": 1, "size": 10}\r\n'
+        b"not json\n\n"
+        b'{"mtime": 5}\n'
+        b'["not", "an", "object"]\n'
+        b'{"path":"/b","mtime":2,"size":20,"mtime_ns":2000000001}'
+    )
+    assert load_manifest_map(manifest) == {
+        "/a": ManifestEntry(path="/a", mtime=1, size=10),
+        "/b": ManifestEntry(path="/b", mtime=2, size=20, mtime_ns=2_000_000_001),
+    }
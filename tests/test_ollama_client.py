@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+import sys
+import threading
+import time
+import types
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from local_llm_bot.app import ollama_client
+
+
+@pytest.mark.unit
+def test_embed_query_with_cache_embeds_once(monkeypatch) -> None:
+    calls: list[list[str]] = []
+
+    def _fake_embed(*, model: str, texts: list[str]) -> list[list[float]]:
+        calls.append(texts)
+        return [[float(len(t))] for t in texts]
+
+    monkeypatch.setattr(ollama_client, "ollama_embed", _fake_embed)
+    monkeypatch.setattr(ollama_client, "_EMBED_CACHE", ollama_client._Sha256LruCache(capacity=2))
+
+    assert ollama_client.embed_query_with_cache(model="m", text="abc") == [3.0]
+    assert ollama_client.embed_query_with_cache(model="m", text="abc") == [3.0]
+    assert calls == [["abc"]]
+
+    # Same text under another model is a distinct key.
+    ollama_client.embed_query_with_cache(model="other", text="abc")
+    assert len(calls) == 2
+
+    stats = ollama_client.cache_stats()["embeddings"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+@pytest.mark.unit
+def test_embed_query_with_cache_coalesces_concurrent_misses(monkeypatch) -> None:
+    calls: list[list[str]] = []
+    release = threading.Event()
+
+    def _fake_embed(*, model: str, texts: list[str]) -> list[list[float]]:
+        calls.append(texts)
+        release.wait(5)
+        return [[float(len(t))] for t in texts]
+
+    monkeypatch.setattr(ollama_client, "ollama_embed", _fake_embed)
+    monkeypatch.setattr(ollama_client, "_EMBED_CACHE", ollama_client._Sha256LruCache(capacity=2))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(ollama_client.embed_query_with_cache, model="m", text="abc") for _ in range(4)]
+        while not calls or len(ollama_client._EMBED_INFLIGHT) != 1:
+            time.sleep(0.01)
+        time.sleep(0.05)  # let the other callers reach the in-flight entry
+        release.set()
+        results = [f.result() for f in futures]
+
+    assert results == [[3.0]] * 4
+    assert calls == [["abc"]]
+    assert ollama_client._EMBED_INFLIGHT == {}
+
+
+@pytest.mark.unit
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache = ollama_client._Sha256LruCache(capacity=2)
+    a, b, c = (cache.key(x) for x in "abc")
+    cache.put(a, 1)
+    cache.put(b, 2)
+    assert cache.get(a) == 1  # a is now most recent
+    cache.put(c, 3)
+
+    assert cache.get(b) is None
+    assert cache.get(a) == 1
+    assert cache.get(c) == 3
+
+
+@pytest.mark.unit
+def test_prime_query_embeddings_embeds_uncached_in_one_call(monkeypatch) -> None:
+    calls: list[list[str]] = []
+
+    def _fake_embed(*, model: str, texts: list[str]) -> list[list[float]]:
+        calls.append(texts)
+        return [[float(len(t))] for t in texts]
+
+    monkeypatch.setattr(ollama_client, "ollama_embed", _fake_embed)
+    monkeypatch.setattr(ollama_client, "_EMBED_CACHE", ollama_client._Sha256LruCache(capacity=8))
+
+    ollama_client.embed_query_with_cache(model="m", text="a")
+    ollama_client.prime_query_embeddings(model="m", texts=["a", "bb", "ccc", "bb"])
+
+    assert calls == [["a"], ["bb", "ccc"]]
+    assert ollama_client.embed_query_with_cache(model="m", text="ccc") == [3.0]
+    assert len(calls) == 2
+
+
+@pytest.mark.unit
+def test_ollama_generate_accumulates_streamed_chunks(monkeypatch) -> None:
+    seen: dict[str, object] = {}
+
+    def _fake_generate(**kwargs):
+        seen.update(kwargs)
+        yield {"response": "Hello", "done": False}
+        yield {"response": ", world ", "done": False}
+        yield {"response": "", "done": True}
+        yield {"response": "ignored", "done": False}
+
+    fake_client = types.SimpleNamespace(generate=_fake_generate)
+    fake_ollama = types.SimpleNamespace(Client=lambda timeout=None, **_kw: fake_client, generate=_fake_generate)
+    monkeypatch.setitem(sys.modules, "ollama", fake_ollama)
+    monkeypatch.setattr(ollama_client, "_SYNC_CLIENTS", {})
+
+    text = ollama_client.ollama_generate(model="m", prompt="p", timeout=5.0)
+
+    assert text == "Hello, world"
+    assert seen["stream"] is True
+
+
+@pytest.mark.unit
+def test_sync_client_is_reused_per_timeout(monkeypatch) -> None:
+    created: list[float] = []
+
+    def _client(timeout=None, **_kw):
+        created.append(timeout)
+        return object()
+
+    monkeypatch.setitem(sys.modules, "ollama", types.SimpleNamespace(Client=_client))
+    monkeypatch.setattr(ollama_client, "_SYNC_CLIENTS", {})
+
+    first = ollama_client._sync_client(30.0)
+    assert ollama_client._sync_client(30.0) is first
+    assert ollama_client._sync_client(60.0) is not first
+    assert created == [30.0, 60.0]
+
+
+@pytest.mark.unit
+def test_pooled_clients_keep_idle_connections(monkeypatch) -> None:
+    seen: dict[str, object] = {}
+
+    def _client(timeout=None, **kw):
+        seen.update(kw)
+        return object()
+
+    monkeypatch.setitem(sys.modules, "ollama", types.SimpleNamespace(Client=_client))
+    monkeypatch.setattr(ollama_client, "_SYNC_CLIENTS", {})
+
+    ollama_client._sync_client(30.0)
+    assert seen["limits"].keepalive_expiry == ollama_client._KEEPALIVE_EXPIRY_S
+
+
+@pytest.mark.unit
+def test_ollama_warmup_sends_empty_prompt_with_keep_alive(monkeypatch) -> None:
+    seen: dict[str, object] = {}
+
+    class _FakeAsyncClient:
+        def __init__(self, timeout=None, **_kw) -> None:
+            pass
+
+        async def generate(self, **kwargs):
+            seen.update(kwargs)
+            return {"done": True}
+
+    monkeypatch.setitem(sys.modules, "ollama", types.SimpleNamespace(AsyncClient=_FakeAsyncClient))
+    monkeypatch.setattr(ollama_client, "_ASYNC_CLIENTS", weakref.WeakKeyDictionary())
+
+    asyncio.run(ollama_client.ollama_warmup(model="m", timeout=5.0))
+
+    assert seen == {"model": "m", "prompt": "", "keep_alive": "10m"}
+
+
+@pytest.mark.unit
+def test_async_clients_are_per_loop_and_released_with_it(monkeypatch) -> None:
+    class _FakeAsyncClient:
+        def __init__(self, timeout=None, **_kw) -> None:
+            self.timeout = timeout
+
+    monkeypatch.setitem(sys.modules, "ollama", types.SimpleNamespace(AsyncClient=_FakeAsyncClient))
+    monkeypatch.setattr(ollama_client, "_ASYNC_CLIENTS", weakref.WeakKeyDictionary())
+
+    async def _pair():
+        return ollama_client._async_client(30), ollama_client._async_client(30.0)
+
+    a, b = asyncio.run(_pair())
+    assert a is b and a.timeout == 30.0
+    c, _ = asyncio.run(_pair())
+    assert c is not a
+    gc.collect()
+    assert len(ollama_client._ASYNC_CLIENTS) == 0
+
+
+@pytest.mark.unit
+def test_ollama_embed_batches_and_preserves_order(monkeypatch) -> None:
+    batches: list[list[str]] = []
+
+    def _embed(*, model: str, input: list[str]):
+        batches.append(list(input))
+        return {"embeddings": [[float(len(t))] for t in input]}
+
+    fake = types.SimpleNamespace(embed=_embed)
+    monkeypatch.setitem(sys.modules, "ollama", fake)
+    monkeypatch.setattr(ollama_client, "_sync_client", lambda _timeout: fake)
+    monkeypatch.setattr(ollama_client, "_LEGACY_EMBED", False)
+
+    out = ollama_client.ollama_embed(model="m", texts=["a", "bb", "ccc", "dddd", "e"], batch_size=2)
+
+    assert out == [[1.0], [2.0], [3.0], [4.0], [1.0]]
+    assert batches == [["a", "bb"], ["ccc", "dddd"], ["e"]]
+
+
+@pytest.mark.unit
+def test_ollama_embed_uses_pooled_client_with_timeout(monkeypatch) -> None:
+    timeouts: list[float] = []
+
+    class _FakeClient:
+        def __init__(self, timeout=None, **_kw) -> None:
+            timeouts.append(timeout)
+
+        def embed(self, *, model: str, input: list[str]):
+            return {"embeddings": [[1.0] for _ in input]}
+
+    monkeypatch.setitem(sys.modules, "ollama", types.SimpleNamespace(Client=_FakeClient))
+    monkeypatch.setattr(ollama_client, "_SYNC_CLIENTS", {})
+    monkeypatch.setattr(ollama_client, "_LEGACY_EMBED", False)
+
+    ollama_client.ollama_embed(model="m", texts=["a"], timeout=7.0)
+    ollama_client.ollama_embed(model="m", texts=["b"], timeout=7.0)
+    assert timeouts == [7.0]
+
+
+@pytest.mark.unit
+def test_ollama_embed_falls_back_to_per_text_endpoint_on_404(monkeypatch) -> None:
+    class _ResponseError(Exception):
+        status_code = 404
+
+    def _embed(**_kw):
+        raise _ResponseError("404 page not found")
+
+    prompts: list[str] = []
+
+    def _embeddings(*, model: str, prompt: str):
+        prompts.append(prompt)
+        return {"embedding": [float(len(prompt))]}
+
+    fake = types.SimpleNamespace(embed=_embed, embeddings=_embeddings)
+    monkeypatch.setitem(sys.modules, "ollama", fake)
+    monkeypatch.setattr(ollama_client, "_sync_client", lambda _timeout: fake)
+    monkeypatch.setattr(ollama_client, "_LEGACY_EMBED", False)
+
+    assert ollama_client.ollama_embed(model="m", texts=["a", "bb"]) == [[1.0], [2.0]]
+    assert ollama_client._LEGACY_EMBED is True
+    assert ollama_client.ollama_embed(model="m", texts=["ccc"]) == [[3.0]]
+    assert prompts == ["a", "bb", "ccc"]
+
+
+@pytest.mark.unit
+def test_ollama_embed_halves_batches_the_server_cannot_take(monkeypatch) -> None:
+    class _ResponseError(Exception):
+        status_code = 500
+
+    sizes: list[int] = []
+
+    def _embed(*, model: str, input: list[str]):
+        sizes.append(len(input))
+        if len(input) > 2:
+            raise _ResponseError("out of memory")
+        return {"embeddings": [[float(t)] for t in input]}
+
+    fake = types.SimpleNamespace(embed=_embed)
+    monkeypatch.setitem(sys.modules, "ollama", fake)
+    monkeypatch.setattr(ollama_client, "_sync_client", lambda _timeout: fake)
+    monkeypatch.setattr(ollama_client, "_LEGACY_EMBED", False)
+    monkeypatch.setattr(ollama_client, "_EMBED_BATCH_LIMIT", {})
+
+    texts = [str(i) for i in range(7)]
+    assert ollama_client.ollama_embed(model="m", texts=texts, batch_size=8) == [
+        [float(i)] for i in range(7)
+    ]
+    assert sizes == [7, 4, 2, 2, 2, 1]
+    assert ollama_client._EMBED_BATCH_LIMIT == {"m": 2}
+
+    # The cap carries over: the next call starts at the size that last went through.
+    sizes.clear()
+    ollama_client.ollama_embed(model="m", texts=texts[:3], batch_size=8)
+    assert sizes == [2, 1]
+
+
+@pytest.mark.unit
+def test_ollama_embed_batches_overlaps_requests_and_keeps_order(monkeypatch) -> None:
+    import threading
+    import time
+
+    lock = threading.Lock()
+    active = peak = 0
+
+    def _fake_embed(*, model: str, texts: list[str]) -> list[list[float]]:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        # Earlier batches finish last: results must still come back in batch order.
+        time.sleep(0.02 * (3 - int(texts[0])))
+        with lock:
+            active -= 1
+        return [[float(t)] for t in texts]
+
+    monkeypatch.setattr(ollama_client, "ollama_embed", _fake_embed)
+    batches = [["0"], ["1", "1"], ["2"]]
+
+    out = list(ollama_client.ollama_embed_batches(model="m", batches=batches, concurrency=3))
+    assert out == [[[0.0]], [[1.0], [1.0]], [[2.0]]]
+    assert peak > 1
+
+    serial = list(ollama_client.ollama_embed_batches(model="m", batches=batches, concurrency=1))
+    assert serial == out
+
+
+@pytest.mark.unit
+def test_ollama_embed_batches_reuses_one_pool_per_concurrency(monkeypatch) -> None:
+    monkeypatch.setattr(ollama_client, "_EMBED_POOLS", {})
+    monkeypatch.setattr(
+        ollama_client, "ollama_embed", lambda *, model, texts: [[float(t)] for t in texts]
+    )
+
+    for _ in range(3):
+        assert list(ollama_client.ollama_embed_batches(model="m", batches=[["1"]], concurrency=2)) == [
+            [[1.0]]
+        ]
+    assert list(ollama_client._EMBED_POOLS) == [2]
+    ollama_client._EMBED_POOLS[2].shutdown()
@@ -0,0 +1,440 @@
+"""
+Unit tests for ingest/pipeline.py: file discovery, parallel extraction, the JSONL record
+writer and the ingest_corpus() run loop (upsert coalescing, skips, dedup, logs).
+
+No external services required — Qdrant and extraction are mocked.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+# ---------------------------------------------------------------------------
+# Parallel extraction: prefetcher returns the same documents as inline loading
+# ---------------------------------------------------------------------------
+
+
+def test_extract_prefetcher_matches_inline_load(tmp_path) -> None:
+    """Pooled and serial prefetchers both yield load_document()'s result, in any ask order."""
+    from local_llm_bot.app.ingest.loaders import load_document
+    from local_llm_bot.app.ingest.pipeline import _ExtractPrefetcher, _md5_of_file
+
+    files = []
+    for i in range(5):
+        f = tmp_path / f"doc{i}.txt"
+        f.write_text(f"document number {i}", encoding="utf-8")
+        files.append(f)
+
+    for workers in (1, 2):
+        pf = _ExtractPrefetcher(files[:4], workers)
+        try:
+            # files[4] was never submitted; files[2] is asked before files[1].
+            for f in (files[0], files[2], files[1], files[4], files[3]):
+                assert pf.load(f) == (load_document(f), _md5_of_file(f))
+        finally:
+            pf.close()
+
+    # A known resolved path is used as the doc_id as-is.
+    pf = _ExtractPrefetcher(files[:2], 1, doc_ids={files[0]: "/resolved/doc0.txt"})
+    try:
+        assert pf.load(files[0])[0].doc_id == "/resolved/doc0.txt"
+        assert pf.load(files[1])[0].doc_id == str(files[1].resolve())
+    finally:
+        pf.close()
+
+
+def test_extract_prefetcher_batches_small_files(tmp_path, monkeypatch) -> None:
+    """Consecutive small files share a pool task; a large file is a task of its own."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from local_llm_bot.app.ingest import pipeline
+    from local_llm_bot.app.ingest.loaders import load_document
+
+    tasks: list[list[str]] = []
+
+    class _CountingPool(ThreadPoolExecutor):
+        def submit(self, fn, items, *args):
+            tasks.append([p.name for p, _ in items])
+            return super().submit(fn, items, *args)
+
+    monkeypatch.setattr(pipeline, "ProcessPoolExecutor", _CountingPool)
+    monkeypatch.setattr(pipeline, "_EXTRACT_TASK_FILES", 3)
+
+    files = []
+    for i in range(6):
+        f = tmp_path / f"doc{i}.txt"
+        f.write_text(f"document number {i}", encoding="utf-8")
+        files.append(f)
+    sizes = {f: 10 for f in files}
+    sizes[files[3]] = pipeline._EXTRACT_SMALL_FILE_BYTES
+
+    pf = pipeline._ExtractPrefetcher(files, 2, sizes=sizes)
+    try:
+        for f in files:
+            assert pf.load(f)[0] == load_document(f)
+    finally:
+        pf.close()
+
+    assert tasks == [["doc0.txt", "doc1.txt", "doc2.txt"], ["doc3.txt"], ["doc4.txt", "doc5.txt"]]
+
+
+def test_extract_prefetcher_fails_only_the_raising_file_of_a_group(tmp_path, monkeypatch) -> None:
+    """An exception from one file of a grouped task is raised for that file alone."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from local_llm_bot.app.ingest import pipeline
+    from local_llm_bot.app.ingest.loaders import load_document
+
+    real = pipeline._extract_document
+
+    def _extract(path, cache_path=None, doc_id=None):
+        if path.name == "doc1.txt":
+            raise OSError("unreadable")
+        return real(path, cache_path, doc_id)
+
+    monkeypatch.setattr(pipeline, "_extract_document", _extract)
+    monkeypatch.setattr(pipeline, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(pipeline, "_EXTRACT_TASK_FILES", 3)
+
+    files = []
+    for i in range(3):
+        f = tmp_path / f"doc{i}.txt"
+        f.write_text(f"document number {i}", encoding="utf-8")
+        files.append(f)
+
+    pf = pipeline._ExtractPrefetcher(files, 2, sizes={f: 10 for f in files})
+    try:
+        assert pf.load(files[0])[0] == load_document(files[0])
+        with pytest.raises(OSError, match="unreadable"):
+            pf.load(files[1])
+        assert pf.load(files[2])[0] == load_document(files[2])
+    finally:
+        pf.close()
+
+
+def test_iter_files_skips_trash_and_reports_sizes(tmp_path) -> None:
+    """Discovery yields a DirEntry per nested file and never descends into trash/."""
+    from pathlib import Path
+
+    from local_llm_bot.app.ingest.pipeline import _iter_files
+
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "trash").mkdir()
+    (tmp_path / "a.txt").write_bytes(b"abc")
+    (tmp_path / "sub" / "b.txt").write_bytes(b"12345")
+    (tmp_path / "trash" / "c.txt").write_bytes(b"x")
+
+    found = {
+        Path(e.path).relative_to(tmp_path).as_posix(): e.stat().st_size
+        for e in _iter_files(tmp_path)
+    }
+    assert found == {"a.txt": 3, "sub/b.txt": 5}
+
+
+def test_iter_files_skips_unreadable_directories(tmp_path, monkeypatch) -> None:
+    """A subdirectory that cannot be listed is skipped; the rest of the walk continues."""
+    import os
+    from pathlib import Path
+
+    from local_llm_bot.app.ingest import pipeline
+
+    (tmp_path / "locked").mkdir()
+    (tmp_path / "locked" / "x.txt").write_bytes(b"x")
+    (tmp_path / "a.txt").write_bytes(b"abc")
+    real_scandir = os.scandir
+
+    def _scandir(path):
+        if Path(path).name == "locked":
+            raise PermissionError(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(pipeline._os, "scandir", _scandir)
+
+    assert [e.name for e in pipeline._iter_files(tmp_path)] == ["a.txt"]
+
+
+@pytest.fixture
+def ingest_env(tmp_path, monkeypatch) -> list[dict]:
+    """
+    ingest_corpus() harness: repo root at tmp_path, nothing in Qdrant yet, extraction inline.
+    Returns the kwargs of every _store.upsert_chunks call; tests override only what they vary.
+    """
+    from local_llm_bot.app.ingest import pipeline
+
+    upserts: list[dict] = []
+    monkeypatch.setattr(pipeline, "_repo_root", lambda: tmp_path)
+    monkeypatch.setattr(pipeline, "_load_qdrant_source_paths", lambda _c: set())
+    monkeypatch.setattr(pipeline._store, "upsert_chunks", lambda **kw: upserts.append(kw))
+    monkeypatch.setattr(pipeline, "_EXTRACT_WORKERS", 1)
+    return upserts
+
+
+def _upserted_paths(upserts: list[dict]) -> list[str]:
+    """source_path of every upserted chunk, in upsert order."""
+    return [m["source_path"] for kw in upserts for m in kw["metadatas"]]
+
+
+def test_small_files_share_one_upsert(tmp_path, monkeypatch, ingest_env) -> None:
+    """Files below the coalesce threshold are upserted together and indexed only afterwards."""
+    from local_llm_bot.app.ingest import pipeline
+    from local_llm_bot.app.ingest.index_jsonl import read_jsonl
+
+    monkeypatch.setattr(pipeline, "_UPSERT_COALESCE_CHUNKS", 10)
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(3):
+        (docs / f"d{i}.txt").write_text(f"small document {i}", encoding="utf-8")
+
+    result = pipeline.ingest_corpus(root=docs, corpus="coalesce_test")
+
+    assert len(ingest_env) == 1 and len(set(_upserted_paths(ingest_env))) == 3
+    assert result.files_processed == 3
+    index = tmp_path / "data" / "corpora" / "coalesce_test" / "index.jsonl"
+    assert len(read_jsonl(index)) == 3
+
+
+def test_already_indexed_files_are_skipped(tmp_path, monkeypatch, ingest_env) -> None:
+    """A file whose resolved path is already in Qdrant is skipped without being upserted."""
+    from local_llm_bot.app.ingest import pipeline
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(2):
+        (docs / f"d{i}.txt").write_text(f"small document {i}", encoding="utf-8")
+    indexed = str((docs / "d0.txt").resolve())
+
+    monkeypatch.setattr(pipeline, "_load_qdrant_source_paths", lambda _c: {indexed})
+
+    result = pipeline.ingest_corpus(root=docs, corpus="skip_test")
+
+    assert result.files_skipped_unchanged == 1
+    assert _upserted_paths(ingest_env) == [str((docs / "d1.txt").resolve())]
+
+
+def test_relative_root_stores_resolved_nested_paths(tmp_path, monkeypatch, ingest_env) -> None:
+    """A relative ingest root still yields absolute source paths for files in subdirectories."""
+    from local_llm_bot.app.ingest import pipeline
+
+    (tmp_path / "docs" / "sub").mkdir(parents=True)
+    (tmp_path / "docs" / "top.txt").write_text("top level note", encoding="utf-8")
+    (tmp_path / "docs" / "sub" / "deep.txt").write_text("nested note", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+    pipeline.ingest_corpus(root=Path("docs"), corpus="relroot_test")
+
+    assert sorted(set(_upserted_paths(ingest_env))) == sorted(
+        str((tmp_path / "docs" / rel).resolve()) for rel in ("top.txt", "sub/deep.txt")
+    )
+
+
+def test_identical_copies_are_aliased(tmp_path, ingest_env) -> None:
+    """A copy with the same bytes gets the same chunk text and is aliased in the manifest."""
+    from local_llm_bot.app.ingest import pipeline
+    from local_llm_bot.app.ingest.manifest import load_manifest_map
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.txt").write_text("the same quarterly report", encoding="utf-8")
+    (docs / "b.txt").write_text("the same quarterly report", encoding="utf-8")
+    (docs / "c.txt").write_text("a different memo", encoding="utf-8")
+
+    result = pipeline.ingest_corpus(root=docs, corpus="dedup_test")
+
+    a, b, c = (str((docs / n).resolve()) for n in ("a.txt", "b.txt", "c.txt"))
+    upserted = [
+        (m["source_path"], d)
+        for kw in ingest_env
+        for m, d in zip(kw["metadatas"], kw["documents"], strict=True)
+    ]
+    assert result.files_deduped == 1
+    # Every copy is still stored under its own path, with the same chunk text.
+    assert dict(upserted)[a] == dict(upserted)[b]
+    assert {p for p, _ in upserted} == {a, b, c}
+    manifest = load_manifest_map(tmp_path / "data" / "corpora" / "dedup_test" / "manifest.jsonl")
+    assert manifest[b].alias_of == a
+    assert manifest[a].alias_of is None and manifest[c].alias_of is None
+
+
+def test_record_writer_batches_in_order_and_reraises_on_close() -> None:
+    """_RecordWriter writes queued files in order, in batches, and close() surfaces a failure."""
+    from local_llm_bot.app.ingest import pipeline
+
+    batches: list[list[str]] = []
+    writer = pipeline._RecordWriter(
+        lambda docs: batches.append([p for p, _, _ in docs]), flush_rows=2, flush_secs=60
+    )
+    for name in ("a", "b", "c"):
+        writer.put(name, {}, [{"chunk_id": f"{name}::chunk-0"}])
+    writer.close()
+    assert [p for batch in batches for p in batch] == ["a", "b", "c"]
+    assert batches[0] == ["a", "b"]
+
+    def _fail(_docs) -> None:
+        raise OSError("disk full")
+
+    writer = pipeline._RecordWriter(_fail)
+    writer.put("a", {}, [])
+    try:
+        writer.close()
+    except OSError as e:
+        assert str(e) == "disk full"
+    else:
+        raise AssertionError("close() should re-raise the write error")
+
+
+def test_binary_text_file_is_reported_not_extracted(tmp_path, monkeypatch, ingest_env) -> None:
+    """A .txt that precheck_file rejects is a failure row; the extractor never sees it."""
+    import json
+
+    from local_llm_bot.app.ingest import pipeline
+
+    extracted: list[str] = []
+    real_extract = pipeline._extract_document
+
+    def _spy(path, cache_path=None, doc_id=None):
+        extracted.append(path.name)
+        return real_extract(path, cache_path, doc_id)
+
+    monkeypatch.setattr(pipeline, "_extract_document", _spy)
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "good.txt").write_text("a real document", encoding="utf-8")
+    (docs / "blob.txt").write_bytes(b"\x00" * 4096)
+
+    result = pipeline.ingest_corpus(root=docs, corpus="precheck_test")
+
+    assert extracted == ["good.txt"]
+    assert result.files_failed == 1
+    failures = tmp_path / "data" / "corpora" / "precheck_test" / "ingest_failures.jsonl"
+    rows = [json.loads(line) for line in failures.read_text(encoding="utf-8").splitlines()]
+    assert [(r["source_path"].endswith("blob.txt"), r["reason"]) for r in rows] == [
+        (True, "binary_content")
+    ]
+
+
+def test_manifest_and_failures_are_appended_through_one_handle(tmp_path, monkeypatch, ingest_env) -> None:
+    """Each artifact is opened once per run; manifest checkpoints fsync without reopening."""
+    import json
+
+    from local_llm_bot.app.ingest import index_jsonl, pipeline
+    from local_llm_bot.app.ingest.manifest import load_manifest_map
+
+    opened: list[str] = []
+    real_open = Path.open
+
+    def _spy_open(self, mode="r", *a, **kw):
+        if mode == "ab":
+            opened.append(self.name)
+        return real_open(self, mode, *a, **kw)
+
+    monkeypatch.setattr(index_jsonl.Path, "open", _spy_open)
+    monkeypatch.setattr(pipeline, "_MANIFEST_CHECKPOINT_EVERY", 1)
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for name in ("a", "b", "c"):
+        (docs / f"{name}.txt").write_text(f"document {name}", encoding="utf-8")
+    for name in ("x", "y"):
+        (docs / f"{name}.txt").write_bytes(b"\x00" * 4096)
+
+    result = pipeline.ingest_corpus(root=docs, corpus="handles_test")
+
+    corpus_dir = tmp_path / "data" / "corpora" / "handles_test"
+    assert result.files_failed == 2
+    assert len(load_manifest_map(corpus_dir / "manifest.jsonl")) == 3
+    failures = (corpus_dir / "ingest_failures.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["reason"] for line in failures] == ["binary_content"] * 2
+    assert opened.count("manifest.jsonl") == 1
+    assert opened.count("ingest_failures.jsonl") == 1
+
+
+def test_run_that_stores_nothing_skips_log_compaction(tmp_path, monkeypatch, ingest_env) -> None:
+    """compact_manifest only re-reads the manifest after a run that appended to it."""
+    from local_llm_bot.app.ingest import pipeline
+
+    compacted: list[str] = []
+    monkeypatch.setattr(pipeline, "compact_manifest", lambda p: compacted.append(p.name))
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "a.txt").write_text("a stored document", encoding="utf-8")
+
+    pipeline.ingest_corpus(root=docs, corpus="compact_test")
+    assert compacted == ["manifest.jsonl"]
+    assert not (tmp_path / "data" / "corpora" / "compact_test" / "doc_chunk_map.jsonl").exists()
+
+    compacted.clear()
+    indexed = {str((docs / "a.txt").resolve())}
+    monkeypatch.setattr(pipeline, "_load_qdrant_source_paths", lambda _c: indexed)
+    pipeline.ingest_corpus(root=docs, corpus="compact_test")
+    assert compacted == []
+
+
+def test_workers_argument_overrides_extract_pool_size(tmp_path, monkeypatch, ingest_env) -> None:
+    """ingest_corpus(workers=1) extracts inline even when _EXTRACT_WORKERS asks for a pool."""
+    from local_llm_bot.app.ingest import pipeline
+
+    def _no_pool(*_a, **_kw):
+        raise AssertionError("workers=1 must not start a process pool")
+
+    monkeypatch.setattr(pipeline, "_EXTRACT_WORKERS", 8)
+    monkeypatch.setattr(pipeline, "ProcessPoolExecutor", _no_pool)
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(3):
+        (docs / f"d{i}.txt").write_text(f"small document {i}", encoding="utf-8")
+
+    result = pipeline.ingest_corpus(root=docs, corpus="jobs_test", workers=1)
+
+    assert result.files_processed == 3
+
+
+def test_extract_cache_reuses_text_for_unchanged_bytes(tmp_path, monkeypatch) -> None:
+    """A cached file is served from the extraction cache keyed by MD5, without re-parsing."""
+    from local_llm_bot.app.ingest import pipeline
+
+    cache_path = str(tmp_path / "extract.sqlite")
+    doc_path = tmp_path / "a.txt"
+    doc_path.write_text("quarterly revenue grew", encoding="utf-8")
+
+    first, md5 = pipeline._extract_document(doc_path, cache_path)
+    assert first is not None and md5 == pipeline._md5_of_file(doc_path)
+
+    def _no_parse(_p):
+        raise AssertionError("unchanged bytes must be served from the cache")
+
+    monkeypatch.setattr(pipeline, "load_document", _no_parse)
+    cached, cached_md5 = pipeline._extract_document(doc_path, cache_path)
+    assert cached == first and cached_md5 == md5
+
+    doc_path.write_text("quarterly revenue fell", encoding="utf-8")
+    monkeypatch.undo()
+    changed, changed_md5 = pipeline._extract_document(doc_path, cache_path)
+    assert changed is not None and changed.text != first.text and changed_md5 != md5
+
+
+def test_source_paths_match_resolve_through_symlinks(tmp_path, ingest_env) -> None:
+    """Root-relative abs paths equal Path.resolve(), for a symlinked root and a symlinked file."""
+    from local_llm_bot.app.ingest import pipeline
+    from local_llm_bot.app.ingest.manifest import load_manifest_map
+
+    real = tmp_path / "real"
+    (real / "sub").mkdir(parents=True)
+    (real / "sub" / "a.txt").write_text("alpha document", encoding="utf-8")
+    target = tmp_path / "elsewhere.txt"
+    target.write_text("beta document", encoding="utf-8")
+    (real / "b.txt").symlink_to(target)
+    link_root = tmp_path / "link_root"
+    link_root.symlink_to(real, target_is_directory=True)
+
+    pipeline.ingest_corpus(root=link_root, corpus="symlink_test")
+
+    expected = {str((real / "sub" / "a.txt").resolve()), str(target.resolve())}
+    assert set(_upserted_paths(ingest_env)) == expected
+    manifest = tmp_path / "data" / "corpora" / "symlink_test" / "manifest.jsonl"
+    assert set(load_manifest_map(manifest)) == expected
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import pytest
+from qdrant_client.models import Datatype, ScalarType
+
+from local_llm_bot.app.vectorstore import qdrant_store
+
+
+@pytest.mark.unit
+def test_fp32_is_the_unquantized_default() -> None:
+    params = qdrant_store._vector_params("fp32")
+    assert params.datatype is None
+    assert params.on_disk is None
+    assert qdrant_store._quantization_config("fp32") is None
+
+
+@pytest.mark.unit
+def test_fp16_stores_half_precision_vectors() -> None:
+    assert qdrant_store._vector_params("fp16").datatype == Datatype.FLOAT16
+    assert qdrant_store._quantization_config("fp16") is None
+
+
+@pytest.mark.unit
+def test_int8_keeps_originals_on_disk_and_quantized_copy_in_ram() -> None:
+    assert qdrant_store._vector_params("int8").on_disk is True
+    quant = qdrant_store._quantization_config("int8")
+    assert quant is not None
+    assert quant.scalar.type == ScalarType.INT8
+    assert quant.scalar.always_ram is True
+
+
+@pytest.mark.unit
+def test_only_int8_queries_oversample_and_rescore() -> None:
+    assert qdrant_store._search_params("fp32") is None
+    assert qdrant_store._search_params("fp16") is None
+    params = qdrant_store._search_params("int8")
+    assert params.quantization.rescore is True
+    assert params.quantization.oversampling == qdrant_store.VECTOR_OVERSAMPLING
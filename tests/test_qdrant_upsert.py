@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from local_llm_bot.app.vectorstore import qdrant_store
+
+
+class _FakeClient:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def upsert(self, *, collection_name: str, points: list) -> None:
+        self.batches.append([p.payload["chunk_id"] for p in points])
+
+
+@pytest.mark.unit
+def test_upsert_chunks_sends_aligned_slices(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = _FakeClient()
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: client)
+    monkeypatch.setattr(qdrant_store, "_ensure_collection", lambda c, name: None)
+    monkeypatch.setattr(
+        qdrant_store,
+        "ollama_embed_batches",
+        lambda *, model, batches: ([[float(len(t))] for t in b] for b in batches),
+    )
+    seen = []
+    ids = [f"c{i}" for i in range(7)]
+    docs = ["x" * i for i in range(7)]
+    metas = [{"doc_id": f"d{i}"} for i in range(7)]
+    qdrant_store.upsert_chunks(
+        persist_dir=None,
+        collection_name="t",
+        embed_model="m",
+        ids=ids,
+        documents=docs,
+        metadatas=metas,
+        batch_size=3,
+        on_embedded=lambda i, d, m, e: seen.append((i, d, m, e)),
+    )
+    assert client.batches == [["c0", "c1", "c2"], ["c3", "c4", "c5"], ["c6"]]
+    for b_ids, b_docs, b_metas, b_embs in seen:
+        assert [int(cid[1:]) for cid in b_ids] == [len(d) for d in b_docs]
+        assert [m["doc_id"][1:] for m in b_metas] == [cid[1:] for cid in b_ids]
+        assert b_embs == [[float(len(d))] for d in b_docs]
+
+
+class _CollectionsClient:
+    def __init__(self) -> None:
+        self.names: set[str] = set()
+        self.listings = 0
+
+    def get_collections(self):
+        self.listings += 1
+        return SimpleNamespace(collections=[SimpleNamespace(name=n) for n in self.names])
+
+    def create_collection(self, *, collection_name: str, **_kw) -> None:
+        self.names.add(collection_name)
+
+    def create_payload_index(self, **_kw) -> None:
+        pass
+
+    def delete_collection(self, *, collection_name: str) -> None:
+        self.names.discard(collection_name)
+
+
+@pytest.mark.unit
+def test_ensure_collection_checks_each_collection_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = _CollectionsClient()
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: client)
+    monkeypatch.setattr(qdrant_store, "_ENSURED", set())
+
+    qdrant_store._ensure_collection(client, "t")
+    qdrant_store._ensure_collection(client, "t")
+    assert client.listings == 1 and client.names == {"t"}
+
+    # A dropped collection is re-created on next use.
+    qdrant_store.delete_collection(collection_name="t")
+    qdrant_store._ensure_collection(client, "t")
+    assert client.names == {"t"}
+    assert client.listings == 3
+
+
+@pytest.mark.unit
+@pytest.mark.filterwarnings("ignore:Payload indexes have no effect")
+def test_skip_unchanged_reuses_stored_vectors(monkeypatch: pytest.MonkeyPatch) -> None:
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: client)
+    monkeypatch.setattr(qdrant_store, "_ENSURED", set())
+    monkeypatch.setattr(qdrant_store, "VECTOR_SIZE", 2)
+    embedded: list[str] = []
+
+    def _embed_batches(*, model, batches):
+        for b in batches:
+            embedded.extend(b)
+            # Unit vectors: a cosine collection stores vectors normalized.
+            yield [[math.cos(len(t)), math.sin(len(t))] for t in b]
+
+    monkeypatch.setattr(qdrant_store, "ollama_embed_batches", _embed_batches)
+
+    def _upsert(docs: list[str], **kw) -> list[list[float]]:
+        seen: list[list[float]] = []
+        qdrant_store.upsert_chunks(
+            persist_dir=None,
+            collection_name="t",
+            embed_model="m",
+            ids=[f"c{i}" for i in range(len(docs))],
+            documents=docs,
+            metadatas=[{"doc_id": "d"} for _ in docs],
+            batch_size=2,
+            on_embedded=lambda i, d, m, e: seen.extend(e),
+            **kw,
+        )
+        return seen
+
+    _upsert(["a", "bb", "ccc"])
+    embedded.clear()
+    vectors = _upsert(["a", "changed", "ccc"], skip_unchanged=True)
+    assert embedded == ["changed"]
+    expected = [[math.cos(n), math.sin(n)] for n in (1, 7, 3)]
+    assert [pytest.approx(v, abs=1e-6) for v in expected] == vectors
+
+
+@pytest.mark.unit
+@pytest.mark.filterwarnings("ignore:Payload indexes have no effect")
+def test_stale_chunk_ids_are_the_ids_a_file_no_longer_has(monkeypatch: pytest.MonkeyPatch) -> None:
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_store, "get_client", lambda: client)
+    monkeypatch.setattr(qdrant_store, "_ENSURED", set())
+    monkeypatch.setattr(qdrant_store, "VECTOR_SIZE", 2)
+    monkeypatch.setattr(
+        qdrant_store,
+        "ollama_embed_batches",
+        lambda *, model, batches: ([[1.0, 0.0] for _ in b] for b in batches),
+    )
+    ids = ["f::chunk-0", "f::chunk-1", "f::chunk-2", "g::chunk-0"]
+    qdrant_store.upsert_chunks(
+        persist_dir=None,
+        collection_name="t",
+        embed_model="m",
+        ids=ids,
+        documents=["a", "b", "c", "d"],
+        metadatas=[{"source_path": s} for s in ("f", "f", "f", "g")],
+    )
+
+    keep = {"f::chunk-0", "f::chunk-1"}
+    assert qdrant_store.stale_chunk_ids(collection_name="t", source_path="f", keep=keep) == [
+        "f::chunk-2"
+    ]
+    assert qdrant_store.stale_chunk_ids(collection_name="t", source_path="g", keep={"g::chunk-0"}) == []
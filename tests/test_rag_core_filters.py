@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+import pytest
+
+from local_llm_bot.app import rag_core
+
+
+def _hit(source_path: str, firm: str = "") -> SimpleNamespace:
+    return SimpleNamespace(metadata={"source_path": source_path, "firm": firm})
+
+
+@pytest.mark.unit
+def test_filter_hits_by_tokens_matches_source_path_or_firm() -> None:
+    hits = [
+        _hit("/c/T_Rowe_Price_10K_2024.htm", firm="PRICE_T_ROWE_GROUP_INC"),
+        _hit("/c/HSBC_2024.xhtml", firm="HSBC_HOLDINGS_PLC"),
+        _hit("/c/BNP_Paribas_2024.xhtml"),
+    ]
+
+    kept = rag_core._filter_hits_by_tokens(hits, ["PRICE_T_ROWE_GROUP_INC", "BNP_Paribas"])
+
+    assert kept == [hits[0], hits[2]]
+    # Parity with the single-token predicate the Qdrant-side filter mirrors.
+    for h in hits:
+        expected = any(
+            rag_core._entity_token_matches(t, h.metadata["source_path"], h.metadata["firm"])
+            for t in ["PRICE_T_ROWE_GROUP_INC", "BNP_Paribas"]
+        )
+        assert (h in kept) is expected
+
+
+@pytest.mark.unit
+def test_filter_hits_by_tokens_empty_tokens_drop_everything() -> None:
+    assert rag_core._filter_hits_by_tokens([_hit("/c/a.pdf")], ["", "--"]) == []
+
+
+@pytest.mark.unit
+def test_detect_entities_uses_precompiled_word_bounded_pattern(monkeypatch) -> None:
+    morgan = {"canonical": "Morgan Stanley", "scope_name": "Morgan Stanley", "aliases": {"ms", "morgan"}}
+    bnp = {"canonical": "BNP", "scope_name": "", "aliases": {"bnp paribas", "société générale"}}
+    for entity in (morgan, bnp):
+        entity["match_re"] = rag_core._entity_match_re(entity)
+    monkeypatch.setitem(rag_core._KS_CACHE, "kb_test", [morgan, bnp])
+
+    # Short aliases ("ms") never match; "morgan" must not match inside "jpmorgan".
+    assert rag_core._detect_entities("MS and JPMorgan results", "kb_test") == []
+    assert rag_core._detect_entities("Morgan's CET1", "kb_test") == [morgan]
+    # Accent- and case-insensitive on both sides; records without a compiled pattern still work.
+    del bnp["match_re"]
+    assert rag_core._detect_entities("SOCIETE GENERALE capital", "kb_test") == [bnp]
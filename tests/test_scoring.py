@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import pytest
+
+from local_llm_bot.app.scoring import combine_hybrid
+from local_llm_bot.app.vectorstore.qdrant_store import QdrantHit
+
+
+def _hit(cid: str, distance: float) -> QdrantHit:
+    return QdrantHit(chunk_id=cid, text=cid, metadata={}, distance=distance)
+
+
+@pytest.mark.unit
+def test_combine_hybrid_returns_top_k_by_combined_score() -> None:
+    vector = [_hit(f"v{i}", 0.1 * i) for i in range(8)]  # v0 closest
+    bm25 = [_hit("v7", 20.0), _hit("b1", 10.0), _hit("b2", 0.0)]
+
+    out = combine_hybrid(vector_hits=vector, bm25_hits=bm25, alpha=0.5, top_k=3)
+
+    # v7: 0.5*0 + 0.5*1 = 0.5; v0: 0.5*1 = 0.5; b1: 0.25; v1: 0.5*(6/7) ≈ 0.43
+    assert [h.chunk_id for h in out][:2] in (["v7", "v0"], ["v0", "v7"])
+    assert out[2].chunk_id == "v1"
+    assert [round(h.distance, 6) for h in out] == [0.5, 0.5, round(1 - 0.5 * 6 / 7, 6)]
+    assert combine_hybrid(vector_hits=vector, bm25_hits=bm25, alpha=0.5, top_k=0) == []
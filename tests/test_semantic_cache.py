@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import pytest
+
+from local_llm_bot.app.semantic_cache import SemanticCache
+
+
+@pytest.mark.unit
+def test_semantic_cache_hits_near_duplicate_within_partition() -> None:
+    cache = SemanticCache(threshold=0.85, ttl_s=300.0)
+    cache.add(partition="p1", embedding=[1.0, 0.0, 0.0], value="answer")
+
+    assert cache.lookup(partition="p1", embedding=[0.95, 0.1, 0.0]) == "answer"
+    assert cache.lookup(partition="p1", embedding=[0.0, 1.0, 0.0]) is None
+    # Same vector, different request shape (e.g. another entity filter) never matches.
+    assert cache.lookup(partition="p2", embedding=[1.0, 0.0, 0.0]) is None
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.unit
+def test_semantic_cache_expires_and_evicts() -> None:
+    cache = SemanticCache(threshold=0.5, ttl_s=0.0)
+    cache.add(partition="p", embedding=[1.0, 0.0], value="stale")
+    assert cache.lookup(partition="p", embedding=[1.0, 0.0]) is None
+    assert cache.stats()["size"] == 0
+
+    cache = SemanticCache(threshold=0.99, ttl_s=300.0, capacity=1)
+    cache.add(partition="p", embedding=[1.0, 0.0], value="a")
+    cache.add(partition="p", embedding=[0.0, 1.0], value="b")
+    assert cache.lookup(partition="p", embedding=[1.0, 0.0]) is None
+    assert cache.lookup(partition="p", embedding=[0.0, 1.0]) == "b"
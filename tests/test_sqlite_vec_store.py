@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from local_llm_bot.app.vectorstore import sqlite_vec_store
+
+pytestmark = pytest.mark.skipif(
+    not sqlite_vec_store.available(),
+    reason="sqlite-vec not installed or sqlite3 cannot load extensions",
+)
+
+
+@pytest.fixture
+def store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(sqlite_vec_store, "VECTOR_SIZE", 3)
+    monkeypatch.setattr(sqlite_vec_store, "_CONNECTIONS", {})
+    monkeypatch.setattr(sqlite_vec_store, "db_path", lambda name: tmp_path / f"{name}.sqlite")
+    monkeypatch.setattr(
+        sqlite_vec_store, "embed_query_with_cache", lambda *, model, text: [1.0, 0.0, 0.0]
+    )
+    sqlite_vec_store.upsert_embeddings(
+        collection_name="aistudio_t",
+        ids=["a", "b", "c"],
+        documents=["alpha", "beta", "gamma"],
+        metadatas=[{"source_path": "/x/a.pdf"}, {"source_path": "/x/b.pdf"}, {}],
+        embeddings=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.7, 0.7, 0.0]],
+    )
+    return sqlite_vec_store
+
+
+def _query(store, k: int = 3) -> list[str]:
+    hits = store.query(collection_name="aistudio_t", query_text="q", top_k=k, embed_model="m")
+    return [h.chunk_id for h in hits]
+
+
+@pytest.mark.unit
+def test_query_orders_by_cosine_distance(store) -> None:
+    hits = store.query(collection_name="aistudio_t", query_text="q", top_k=2, embed_model="m")
+    assert [h.chunk_id for h in hits] == ["a", "c"]
+    assert hits[0].distance == pytest.approx(0.0, abs=1e-6)
+    assert hits[0].metadata == {"source_path": "/x/a.pdf"}
+
+
+@pytest.mark.unit
+def test_upsert_replaces_existing_chunk(store) -> None:
+    store.upsert_embeddings(
+        collection_name="aistudio_t",
+        ids=["b"],
+        documents=["beta v2"],
+        metadatas=[{}],
+        embeddings=[[1.0, 0.1, 0.0]],
+    )
+    assert _query(store)[:2] in (["a", "b"], ["b", "a"])
+
+
+@pytest.mark.unit
+def test_delete_source_path_and_collection(store) -> None:
+    assert store.delete_source_path(collection_name="aistudio_t", source_path="/x/a.pdf") == 1
+    assert "a" not in _query(store)
+    store.delete_collection(collection_name="aistudio_t")
+    assert not store.db_path("aistudio_t").exists()